@@ -0,0 +1,469 @@
+"""
+AIMD 自适应并发限制器（替代固定的 asyncio.Semaphore(CONCURRENT_LIMIT)）
+
+- 成功且延迟平稳：窗口加性增长（每满一个窗口 +1）
+- 429 / 5xx / 网络失败 / 延迟明显抬升：窗口乘性回退
+- 其余 4xx（400 / 401 / 413 …）是请求本身的问题：窗口不动，也不计入延迟样本
+- 遵守 Retry-After 与 X-RateLimit-* 响应头：在重置时间前暂停派发新请求
+- snapshot() 导出当前窗口、在途数和排队深度
+- 多个运行共用一个限制器时按运行（调度流）公平排队：先按优先级（交互式先于批量），
+  同优先级内按加权起始时间公平排队（SFQ），一个运行的突发请求不会饿死其他运行；
+  flow_snapshot(run_id) 导出该运行的排队等待统计
+- 同一个运行内部再按请求类别派发（默认 审核 > 修改 > 首稿，Config.LLM_REQUEST_PRIORITIES）：
+  快完成的篇目先拿到名额，整批不会等到最后才一起出稿；排队超过 aging 秒数的请求逐级提升，不会饿死
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import re
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+from config import config
+
+
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_FULL_RE = re.compile(r"(?:\d+(?:\.\d+)?(?:ms|h|m|s))+")
+
+
+def _parse_seconds(value: str) -> Optional[float]:
+    """解析 Retry-After / X-RateLimit-Reset：秒数、'1s' / '500ms' / '6m0s'、HTTP 日期或 epoch 时间戳"""
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        # 大于 1e9 视为 epoch 时间戳
+        return max(0.0, seconds - time.time()) if seconds > 1e9 else max(0.0, seconds)
+
+    if _DURATION_FULL_RE.fullmatch(value):
+        return sum(float(number) * _DURATION_UNITS[unit] for number, unit in _DURATION_RE.findall(value))
+
+    try:
+        reset_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, reset_at.timestamp() - time.time())
+
+
+# 当前上下文所属的调度流：(flow_id, priority, weight)；asyncio.gather 创建的任务会继承
+_current_flow: contextvars.ContextVar = contextvars.ContextVar("llm_flow", default=None)
+_DEFAULT_FLOW = ("default", 0, 1.0)
+# 当前上下文里 LLM 请求的类别（review / revision / draft），决定运行内部的派发顺序
+_current_request_class: contextvars.ContextVar = contextvars.ContextVar("llm_request_class", default=None)
+
+
+@contextlib.contextmanager
+def flow_scope(flow_id: str, priority: int = 0, weight: float = 1.0):
+    """
+    把当前上下文里的 LLM 请求归到一个调度流（通常是一次运行）
+
+    Args:
+        priority: 数值越小越先派发（交互式 0，批量 1）
+        weight: 同优先级内分到的名额比例
+    """
+    token = _current_flow.set((flow_id, priority, weight))
+    try:
+        yield
+    finally:
+        _current_flow.reset(token)
+
+
+@contextlib.contextmanager
+def request_class_scope(request_class: str):
+    """标注当前上下文里 LLM 请求的类别，如 request_class_scope("review")"""
+    token = _current_request_class.set(request_class)
+    try:
+        yield
+    finally:
+        _current_request_class.reset(token)
+
+
+def current_request_class() -> Optional[str]:
+    return _current_request_class.get()
+
+
+class _WaitStats:
+    """排队等待累计：请求数 / 总等待 / 最长等待"""
+
+    def __init__(self):
+        self.requests = 0
+        self.waited = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited: float) -> None:
+        self.waited += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "queue_wait_seconds": round(self.waited, 3),
+            "avg_queue_wait_ms": round(self.waited / self.requests * 1000, 1) if self.requests else 0.0,
+            "max_queue_wait_ms": round(self.max_wait * 1000, 1),
+        }
+
+
+class _Waiter:
+    __slots__ = ("future", "rank", "request_class", "enqueued_at")
+
+    def __init__(self, future: asyncio.Future, rank: int, request_class: str, enqueued_at: float):
+        self.future = future
+        self.rank = rank
+        self.request_class = request_class
+        self.enqueued_at = enqueued_at
+
+
+class _Flow:
+    """一个调度流的排队状态与等待统计；排队请求按类别分 FIFO 队列"""
+
+    def __init__(self, flow_id: str, priority: int, weight: float):
+        self.flow_id = flow_id
+        self.priority = priority
+        self.weight = max(float(weight), 1e-6)
+        self.last_finish = 0.0
+        self.queued = 0
+        self.waiting: Dict[int, deque] = {}
+        self.total = _WaitStats()
+        self.by_class: Dict[str, _WaitStats] = {}
+
+    @property
+    def requests(self) -> int:
+        return self.total.requests
+
+    def class_stats(self, request_class: str) -> _WaitStats:
+        stats = self.by_class.get(request_class)
+        if stats is None:
+            stats = self.by_class[request_class] = _WaitStats()
+        return stats
+
+    def snapshot(self) -> Dict[str, float]:
+        result = {"priority": self.priority, "weight": self.weight, "queued": self.queued}
+        result.update(self.total.snapshot())
+        result["by_class"] = {name: stats.snapshot() for name, stats in self.by_class.items()}
+        return result
+
+
+class _Lease:
+    """一次请求占用的名额；拿到响应头后调用 observe 上报状态码与限流头"""
+
+    def __init__(self, started: float):
+        self.started = started
+        self.status: Optional[int] = None
+        self.headers: Optional[Mapping[str, str]] = None
+        self.latency: Optional[float] = None
+
+    def observe(self, status: int, headers: Optional[Mapping[str, str]] = None) -> None:
+        self.status = status
+        self.headers = headers
+        self.latency = time.monotonic() - self.started
+
+
+class AdaptiveLimiter:
+    """AIMD 并发窗口 + 按调度流公平排队的等待队列"""
+
+    def __init__(
+        self,
+        initial_limit: int = config.CONCURRENT_LIMIT,
+        min_limit: int = config.CONCURRENT_MIN,
+        max_limit: int = config.CONCURRENT_MAX,
+        decrease_factor: float = config.LIMITER_DECREASE_FACTOR,
+        latency_tolerance: float = config.LIMITER_LATENCY_TOLERANCE,
+        request_priorities: Optional[Mapping[str, int]] = None,
+        aging_seconds: float = config.LLM_PRIORITY_AGING_SECONDS,
+    ):
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.window = float(min(max(int(initial_limit), self.min_limit), self.max_limit))
+        self.decrease_factor = float(decrease_factor)
+        self.latency_tolerance = float(latency_tolerance)
+        self.in_flight = 0
+        # 请求类别 → 运行内派发次序（越小越先）；未登记的类别排在最后
+        self.request_priorities = dict(config.LLM_REQUEST_PRIORITIES if request_priorities is None else request_priorities)
+        self.aging_seconds = float(aging_seconds)
+        # 派发票堆：(priority, start_tag, seq, flow)，决定下一个名额给哪个运行；
+        # 具体给该运行里的哪个请求由 _next_waiter 按类别挑。被取消的请求惰性跳过
+        self._waiters: list = []
+        self._queued = 0
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._flows: Dict[str, _Flow] = {}
+        self._blocked_until = 0.0
+        self._wake_handle = None
+        self._latency_ewma: Optional[float] = None
+        self._baseline_latency: Optional[float] = None
+        self._latency_samples = 0
+        self._last_decrease = 0.0
+        self.stats: Dict[str, int] = {
+            "acquired": 0,
+            "successes": 0,
+            "throttled": 0,
+            "server_errors": 0,
+            "client_errors": 0,
+            "failures": 0,
+            "latency_backoffs": 0,
+            "increases": 0,
+            "decreases": 0,
+            "aged_promotions": 0,
+        }
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self.window))
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < self.limit and time.monotonic() >= self._blocked_until
+
+    def _current_flow(self) -> _Flow:
+        flow_id, priority, weight = _current_flow.get() or _DEFAULT_FLOW
+        flow = self._flows.get(flow_id)
+        if flow is None:
+            flow = self._flows[flow_id] = _Flow(flow_id, priority, weight)
+        else:
+            flow.priority, flow.weight = priority, max(float(weight), 1e-6)
+        return flow
+
+    def _start_tag(self, flow: _Flow) -> float:
+        """SFQ：起始标签 = max(虚拟时间, 该流上一个请求的结束标签)，每个请求按 1/weight 推进"""
+        start = max(self._virtual_time, flow.last_finish)
+        flow.last_finish = start + 1.0 / flow.weight
+        return start
+
+    def _rank(self, request_class: str) -> int:
+        if request_class in self.request_priorities:
+            return self.request_priorities[request_class]
+        return max(self.request_priorities.values(), default=0) + 1
+
+    def _next_waiter(self, flow: _Flow) -> Optional[_Waiter]:
+        """
+        该运行里下一个该派发的请求：各类别队首比较 有效次序 = 类别次序 - 已等待秒数 / aging_seconds，
+        次序相同按类别优先；没有存活的排队请求时返回 None
+        """
+        now = time.monotonic()
+        best, best_key, top_rank = None, None, None
+        for rank, queue in flow.waiting.items():
+            while queue and queue[0].future.done():
+                queue.popleft()
+            if not queue:
+                continue
+            head = queue[0]
+            aged = (now - head.enqueued_at) / self.aging_seconds if self.aging_seconds > 0 else 0.0
+            key = (rank - int(aged), rank)
+            if best_key is None or key < best_key:
+                best, best_key = head, key
+            top_rank = rank if top_rank is None else min(top_rank, rank)
+        if best is None:
+            return None
+        flow.waiting[best.rank].popleft()
+        if best.rank > top_rank:
+            self.stats["aged_promotions"] += 1
+        return best
+
+    async def acquire(self, request_class: Optional[str] = None) -> None:
+        """
+        申请一个名额
+
+        Args:
+            request_class: 请求类别（review / revision / draft），不传时取 request_class_scope 标注的类别
+        """
+        flow = self._current_flow()
+        request_class = request_class or _current_request_class.get() or "default"
+        class_stats = flow.class_stats(request_class)
+        flow.total.requests += 1
+        class_stats.requests += 1
+        start = self._start_tag(flow)
+        if not self._queued and self._has_capacity():
+            self._virtual_time = max(self._virtual_time, start)
+            self.in_flight += 1
+            self.stats["acquired"] += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        rank = self._rank(request_class)
+        flow.waiting.setdefault(rank, deque()).append(_Waiter(waiter, rank, request_class, time.monotonic()))
+        heapq.heappush(self._waiters, (flow.priority, start, next(self._seq), flow))
+        self._queued += 1
+        flow.queued += 1
+        self._schedule_wake()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 名额已分配但调用方被取消：归还名额
+                self.in_flight -= 1
+                self._wake()
+            else:
+                # 条目留在队列里，派发时跳过（多出来的派发票弹出时找不到请求，直接丢弃）
+                self._queued -= 1
+                flow.queued -= 1
+            raise
+        self.stats["acquired"] += 1
+
+    def _wake(self) -> None:
+        self._wake_handle = None
+        while self._waiters and self._has_capacity():
+            _, start, _, flow = heapq.heappop(self._waiters)
+            waiter = self._next_waiter(flow)
+            if waiter is None:
+                continue
+            self._queued -= 1
+            flow.queued -= 1
+            self._virtual_time = max(self._virtual_time, start)
+            waited = time.monotonic() - waiter.enqueued_at
+            flow.total.record(waited)
+            flow.class_stats(waiter.request_class).record(waited)
+            self.in_flight += 1
+            waiter.future.set_result(None)
+        self._schedule_wake()
+
+    def _schedule_wake(self) -> None:
+        """处于 Retry-After 暂停期时，到点后再唤醒排队者"""
+        if not self._queued or self._wake_handle is not None:
+            return
+        delay = self._blocked_until - time.monotonic()
+        if delay > 0:
+            self._wake_handle = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _block_for(self, seconds: Optional[float]) -> None:
+        if seconds is None or seconds <= 0:
+            return
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        if self._wake_handle is not None:
+            self._wake_handle.cancel()
+            self._wake_handle = None
+
+    def _apply_rate_limit_headers(self, headers: Mapping[str, str]) -> None:
+        lowered = {str(k).lower(): v for k, v in headers.items()}
+        if "retry-after" in lowered:
+            self._block_for(_parse_seconds(lowered["retry-after"]))
+        remaining = lowered.get("x-ratelimit-remaining-requests", lowered.get("x-ratelimit-remaining"))
+        if remaining is None:
+            return
+        try:
+            exhausted = float(remaining) <= 0
+        except ValueError:
+            return
+        if exhausted:
+            reset = lowered.get("x-ratelimit-reset-requests", lowered.get("x-ratelimit-reset"))
+            self._block_for(_parse_seconds(reset) if reset else None)
+
+    def _increase(self) -> None:
+        if self.window < self.max_limit:
+            self.window = min(float(self.max_limit), self.window + 1.0 / self.window)
+            self.stats["increases"] += 1
+
+    def _decrease(self) -> None:
+        # 同一个 RTT 内的多次拥塞信号只回退一次，避免窗口被瞬间打到底
+        now = time.monotonic()
+        cooldown = max(self._latency_ewma or 0.0, 0.05)
+        if now - self._last_decrease < cooldown:
+            return
+        self._last_decrease = now
+        self.window = max(float(self.min_limit), self.window * self.decrease_factor)
+        self.stats["decreases"] += 1
+
+    def _latency_rising(self, latency: float) -> bool:
+        """短期 EWMA 明显高于长期 EWMA（基线）即视为延迟抬升"""
+        self._latency_samples += 1
+        if self._latency_ewma is None:
+            self._latency_ewma = latency
+            self._baseline_latency = latency
+            return False
+        self._latency_ewma = 0.8 * self._latency_ewma + 0.2 * latency
+        self._baseline_latency = 0.95 * self._baseline_latency + 0.05 * latency
+        if self._latency_samples < 10:
+            return False
+        return self._latency_ewma > self._baseline_latency * self.latency_tolerance
+
+    def release(
+        self,
+        status: Optional[int] = None,
+        latency: Optional[float] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        failed: bool = False,
+    ) -> None:
+        """归还名额并按结果调整窗口"""
+        window_was_full = self.in_flight >= self.limit or bool(self._queued)
+        self.in_flight -= 1
+        if headers:
+            self._apply_rate_limit_headers(headers)
+
+        if status == 429:
+            self.stats["throttled"] += 1
+            self._decrease()
+        elif status is not None and status >= 500:
+            self.stats["server_errors"] += 1
+            self._decrease()
+        elif status is not None and status >= 400:
+            # 400 / 401 / 413 等是请求本身的问题，和服务端负载无关：不扩窗，也不计入延迟基线
+            self.stats["client_errors"] += 1
+        elif failed:
+            self.stats["failures"] += 1
+            self._decrease()
+        elif status is not None:
+            self.stats["successes"] += 1
+            if latency is not None and self._latency_rising(latency):
+                self.stats["latency_backoffs"] += 1
+                self._decrease()
+            elif window_was_full:
+                # 只有窗口真的被用满时才扩张，需求不足时不盲目放大
+                self._increase()
+        self._wake()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, request_class: Optional[str] = None):
+        """占用一个名额：async with limiter.slot() as lease: ...; lease.observe(status, headers)"""
+        await self.acquire(request_class)
+        lease = _Lease(time.monotonic())
+        failed = False
+        try:
+            yield lease
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
+        except Exception:
+            failed = lease.status is None
+            raise
+        finally:
+            self.release(status=lease.status, latency=lease.latency, headers=lease.headers, failed=failed)
+
+    def flow_snapshot(self, flow_id: str) -> Optional[Dict[str, float]]:
+        """单个调度流（运行）的排队等待统计"""
+        flow = self._flows.get(flow_id)
+        return flow.snapshot() if flow is not None else None
+
+    def close_flow(self, flow_id: str) -> Optional[Dict[str, float]]:
+        """运行结束后移除调度流，返回最终统计（仍有排队请求时保留）"""
+        flow = self._flows.get(flow_id)
+        if flow is None:
+            return None
+        if not flow.queued:
+            del self._flows[flow_id]
+        return flow.snapshot()
+
+    def snapshot(self) -> Dict[str, float]:
+        """导出当前状态（写入运行元数据 / 监控用）"""
+        result = {
+            "window": round(self.window, 2),
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "flows": len(self._flows),
+            "blocked_for": round(max(0.0, self._blocked_until - time.monotonic()), 3),
+            "latency_ewma_ms": round((self._latency_ewma or 0.0) * 1000, 1),
+            "baseline_latency_ms": round((self._baseline_latency or 0.0) * 1000, 1),
+        }
+        result.update(self.stats)
+        return result
@@ -0,0 +1,345 @@
+"""
+批量任务：一张表里的多行需求（车型 / 平台 / 数量 / 方向）在同一个进程里跑完
+
+- 一个事件循环、一个 LLM 连接池、一个全局自适应并发限制器贯穿所有行；
+  同时在跑的行数由 --parallel（Config.BATCH_MAX_PARALLEL_JOBS）控制
+- 每行独立产出 Excel（<输出目录>/<任务编号>/），全部结束后写一份批量汇总表
+- 每行的运行编号和结果摘要记入 RunStore；重跑同一张表时跳过已完成的行，
+  中断的行按检查点续跑
+
+支持的任务表：
+- .csv / .jsonl：列名 车型 / 平台 / 数量 / 方向（可选 编号、原始需求文档）
+- .xlsx：首个工作表带上述表头时按行读取；否则按执行表的工作表名解析，
+  如 “0212-AIGC-HR-V【关联荣放】-50条-刘海龙” → HRV / 抖音 / 50篇 / 关联荣放
+
+运行：
+    python batch_runner.py jobs.csv
+    python batch_runner.py "26-2月-【东风本田】-AIGC内容执行 (1).xlsx" --dry-run
+    python batch_runner.py jobs.jsonl --parallel 2 --output-dir 04-产出仓库/批量
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+import zipfile
+from datetime import datetime
+from typing import Dict, List, Optional
+from xml.etree import ElementTree
+
+from config import config
+from llm_client import close_llm_client
+from run_store import get_run_store, new_run_id
+import swarm_with_llm as swarm
+
+
+# 表头别名 → 标准字段
+_COLUMN_ALIASES = {
+    "编号": ("编号", "任务编号", "job_id", "id"),
+    "车型": ("车型", "car_model", "model"),
+    "平台": ("平台", "投放平台", "发布平台", "platform"),
+    "数量": ("数量", "篇数", "count"),
+    "方向": ("方向", "内容方向", "direction"),
+    "原始需求文档": ("原始需求文档", "brief"),
+}
+
+_CAR_MODEL_ALIASES = {"HR-V": "HRV"}
+
+# 执行表工作表名：日期-类型-车型【方向】-N条/篇-负责人（个别表顺序不同，三段分开匹配）
+_SHEET_CAR_PATTERN = re.compile(r"(?:^|-)(?P<car>[^-【】]+(?:-V)?)【(?P<direction>[^】]+)】")
+_SHEET_KIND_PATTERN = re.compile(r"AIGC脚本|AIGC|头条稿件|达人口播")
+_SHEET_COUNT_PATTERN = re.compile(r"(?P<count>\d+(?:\+\d+)*)(?:条|篇)")
+_KIND_PLATFORMS = {"头条稿件": "今日头条"}
+
+
+def _normalize_job(raw: Dict) -> Optional[Dict]:
+    """按别名取出标准字段；缺车型的行（空行 / 说明行）返回 None"""
+    job = {}
+    for field, aliases in _COLUMN_ALIASES.items():
+        for alias in aliases:
+            value = raw.get(alias)
+            if value not in (None, ""):
+                job[field] = str(value).strip() if field != "数量" else value
+                break
+    if not job.get("车型"):
+        return None
+    job["车型"] = _CAR_MODEL_ALIASES.get(job["车型"], job["车型"])
+    job["平台"] = job.get("平台") or "抖音"
+    job["数量"] = int(float(job.get("数量") or 5))
+    job["方向"] = job.get("方向") or config.SCENE_RAG_DEFAULT_SCENE
+    return job
+
+
+def parse_sheet_title(title: str) -> Optional[Dict]:
+    """从执行表的工作表名解析出一行任务；解析不了返回 None"""
+    car_match = _SHEET_CAR_PATTERN.search(title)
+    kind_match = _SHEET_KIND_PATTERN.search(title)
+    if not car_match or not kind_match:
+        return None
+    count_match = _SHEET_COUNT_PATTERN.search(title, car_match.end())
+    if not count_match:
+        return None
+    return _normalize_job({
+        "车型": car_match.group("car").strip(),
+        "平台": _KIND_PLATFORMS.get(kind_match.group(0), "抖音"),
+        "数量": sum(int(n) for n in count_match.group("count").split("+")),
+        "方向": car_match.group("direction"),
+    })
+
+
+def _xlsx_sheet_titles(path: str) -> List[str]:
+    """直接读 workbook.xml 取工作表名（不解析样式，兼容 openpyxl 打不开的表）"""
+    namespace = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    return [sheet.get("name") for sheet in root.iterfind("main:sheets/main:sheet", namespace)]
+
+
+def _xlsx_rows(path: str) -> Optional[List[Dict]]:
+    """首个工作表带“车型”表头时按行读取；打不开或没有表头返回 None"""
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(path, read_only=True, data_only=True)
+    except Exception:
+        return None
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header or "车型" not in header:
+            return None
+        keys = [str(cell).strip() if cell is not None else "" for cell in header]
+        return [dict(zip(keys, row)) for row in rows]
+    finally:
+        workbook.close()
+
+
+def _assign_job_ids(jobs: List[Dict]) -> List[Dict]:
+    """没有显式编号的行按内容哈希编号（调整行序后重跑仍能对上进度），重复行追加序号"""
+    seen = {}
+    for job in jobs:
+        if not job.get("编号"):
+            digest = hashlib.sha1(json.dumps(
+                [job["车型"], job["平台"], job["数量"], job["方向"], job.get("原始需求文档", "")],
+                ensure_ascii=False,
+            ).encode("utf-8")).hexdigest()[:8]
+            job["编号"] = f"{job['车型']}-{job['平台']}-{digest}"
+        seen[job["编号"]] = seen.get(job["编号"], 0) + 1
+        if seen[job["编号"]] > 1:
+            job["编号"] = f"{job['编号']}-{seen[job['编号']]}"
+    return jobs
+
+
+def load_jobs(path: str) -> List[Dict]:
+    """
+    读取任务表，返回 [{编号, 车型, 平台, 数量, 方向, (原始需求文档), (来源)}]
+    不支持的车型（如“品牌”类工作表）会被跳过并打印提示
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            raw_jobs = list(csv.DictReader(f))
+    elif extension == ".jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            raw_jobs = [json.loads(line) for line in f if line.strip()]
+    elif extension == ".xlsx":
+        raw_jobs = _xlsx_rows(path)
+        if raw_jobs is None:
+            raw_jobs = []
+            for title in _xlsx_sheet_titles(path):
+                job = parse_sheet_title(title)
+                if job is None:
+                    print(f"  [批量] 跳过无法解析的工作表：{title}")
+                    continue
+                raw_jobs.append(dict(job, 来源=title))
+    else:
+        raise ValueError(f"不支持的任务表格式：{extension}（支持 .xlsx / .csv / .jsonl）")
+
+    jobs = []
+    for raw in raw_jobs:
+        job = _normalize_job(raw)
+        if job is None:
+            continue
+        if job["车型"] not in config.SUPPORTED_CAR_MODELS:
+            print(f"  [批量] 跳过不支持的车型：{job['车型']}（{raw.get('来源', job)}）")
+            continue
+        if raw.get("来源"):
+            job["来源"] = raw["来源"]
+        jobs.append(job)
+    return _assign_job_ids(jobs)
+
+
+def default_batch_id(path: str) -> str:
+    """同一张任务表（按绝对路径）默认沿用同一个批次号，重跑时接上进度"""
+    return hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:12]
+
+
+def build_initial_state(job: Dict, output_dir: str) -> Dict:
+    """一行任务对应的初始 Shared Context（批量模式不做交互确认）"""
+    user_input = {field: job[field] for field in ("车型", "平台", "数量", "方向")}
+    if job.get("原始需求文档"):
+        user_input["原始需求文档"] = job["原始需求文档"]
+    return {
+        "user_input": user_input,
+        "customer_brief": {},
+        "planner_brief": {},
+        "contents": [],
+        "review_results": [],
+        "final_output": "",
+        "current_attempt": 1,
+        "need_manual_review": [],
+        "skip_confirmations": True,
+        # 批量行在全局调度器里让位于交互式运行（Config.SCHEDULER_RUN_CLASSES）
+        "metadata": {"output_dir": os.path.join(output_dir, job["编号"]), "run_class": "batch"},
+    }
+
+
+def summarize_run(job: Dict, run_id: str, result: Dict, seconds: float) -> Dict:
+    """单行结果摘要（写入 RunStore，重跑时直接进汇总表）"""
+    reviews = result.get("review_results", [])
+    usage_total = result.get("metadata", {}).get("token_usage", {}).get("total", {})
+    return {
+        "编号": job["编号"],
+        "来源": job.get("来源", ""),
+        "车型": job["车型"],
+        "平台": job["平台"],
+        "数量": job["数量"],
+        "方向": job["方向"],
+        "运行编号": run_id,
+        "通过篇数": sum(1 for r in reviews if r["passed"]),
+        "人工介入": len(result.get("need_manual_review", [])),
+        "轮次": result.get("current_attempt", 1),
+        "LLM调用": usage_total.get("calls", 0),
+        "费用(元)": round(usage_total.get("cost", 0.0), 4),
+        "耗时(s)": round(seconds, 1),
+        "产出文件": result.get("final_output", ""),
+    }
+
+
+async def run_job(job: Dict, batch_id: str, output_dir: str, previous: Optional[Dict]) -> Dict:
+    """跑一行任务：有中断记录时先按检查点续跑，续不上再重新开始"""
+    store = get_run_store()
+    started = time.perf_counter()
+    result = None
+    run_id = previous["run_id"] if previous else ""
+    if run_id:
+        try:
+            print(f"[批量] {job['编号']}：从运行 {run_id} 的断点继续")
+            result = await swarm.arun_swarm(None, close_client=False, run_id=run_id)
+        except ValueError:
+            result = None
+    if result is None:
+        run_id = new_run_id()
+        print(f"[批量] {job['编号']}：开始（{job['车型']} / {job['平台']} / {job['数量']}篇 / {job['方向']}）")
+        if store is not None:
+            store.save_batch_job(batch_id, job["编号"], run_id, "running")
+        result = await swarm.arun_swarm(build_initial_state(job, output_dir), close_client=False, run_id=run_id)
+
+    summary = summarize_run(job, run_id, result, time.perf_counter() - started)
+    if store is not None:
+        store.save_batch_job(batch_id, job["编号"], run_id, "finished", summary)
+    print(f"[批量] {job['编号']}：完成，通过 {summary['通过篇数']}/{job['数量']} 篇")
+    return summary
+
+
+async def run_batch(jobs: List[Dict], batch_id: str, output_dir: str, parallel: int = config.BATCH_MAX_PARALLEL_JOBS) -> List[Dict]:
+    """
+    在当前事件循环上跑完所有任务行，返回按任务表顺序排列的摘要；
+    已完成的行直接取回摘要，失败的行记为 failed（下次重跑时重新执行）
+    """
+    store = get_run_store()
+    progress = store.load_batch_jobs(batch_id) if store is not None else {}
+    semaphore = asyncio.Semaphore(max(1, parallel))
+
+    async def run_one(job: Dict) -> Dict:
+        previous = progress.get(job["编号"])
+        if previous and previous["status"] == "finished":
+            print(f"[批量] {job['编号']}：已完成，跳过")
+            return dict(previous["summary"], 状态="已完成（跳过）")
+        async with semaphore:
+            try:
+                summary = await run_job(job, batch_id, output_dir, previous)
+            except Exception as e:
+                print(f"[批量] {job['编号']}：失败 {e}")
+                if store is not None:
+                    # 保留本次的运行编号，下次重跑先按检查点续跑
+                    run_id = store.load_batch_jobs(batch_id).get(job["编号"], {}).get("run_id", "")
+                    store.save_batch_job(batch_id, job["编号"], run_id, "failed", {"错误": str(e)})
+                return {"编号": job["编号"], "来源": job.get("来源", ""), "车型": job["车型"], "平台": job["平台"],
+                        "数量": job["数量"], "方向": job["方向"], "状态": f"失败：{e}"}
+        return dict(summary, 状态="完成")
+
+    return list(await asyncio.gather(*[run_one(job) for job in jobs]))
+
+
+_SUMMARY_COLUMNS = ["编号", "来源", "车型", "平台", "数量", "方向", "状态", "通过篇数", "人工介入",
+                    "轮次", "LLM调用", "费用(元)", "耗时(s)", "产出文件", "运行编号"]
+
+
+def write_batch_summary(summaries: List[Dict], output_dir: str) -> str:
+    """批量汇总表：每行一个任务 + 合计"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "批量汇总"
+    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+    for col_idx, column in enumerate(_SUMMARY_COLUMNS, 1):
+        cell = ws.cell(row=1, column=col_idx, value=column)
+        cell.fill = header_fill
+        cell.font = header_font
+    for row_idx, summary in enumerate(summaries, 2):
+        for col_idx, column in enumerate(_SUMMARY_COLUMNS, 1):
+            ws.cell(row=row_idx, column=col_idx, value=summary.get(column, ""))
+
+    total_row = len(summaries) + 2
+    ws.cell(row=total_row, column=1, value="合计").font = Font(bold=True)
+    for column in ("数量", "通过篇数", "人工介入", "LLM调用", "费用(元)"):
+        col_idx = _SUMMARY_COLUMNS.index(column) + 1
+        value = sum(summary.get(column, 0) or 0 for summary in summaries)
+        ws.cell(row=total_row, column=col_idx, value=round(value, 4) if column == "费用(元)" else value)
+
+    for column, width in (("A", 28), ("B", 40), ("F", 16), ("G", 16), ("N", 50), ("O", 24)):
+        ws.column_dimensions[column].width = width
+
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"批量汇总_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
+    wb.save(path)
+    return path
+
+
+async def amain(args) -> str:
+    jobs = load_jobs(args.jobs)
+    print(f"[批量] 共 {len(jobs)} 行任务，{sum(job['数量'] for job in jobs)} 篇")
+    if args.dry_run:
+        for job in jobs:
+            print(f"  {job['编号']}  {job['车型']} / {job['平台']} / {job['数量']}篇 / {job['方向']}")
+        return ""
+    if get_run_store() is None:
+        print("[批量] 未开启 Config.CHECKPOINT_ENABLED，进度不会保存，重跑会重新执行所有行")
+
+    batch_id = args.batch_id or default_batch_id(args.jobs)
+    print(f"[批量] 批次号：{batch_id}")
+    try:
+        summaries = await run_batch(jobs, batch_id, args.output_dir, args.parallel)
+    finally:
+        await close_llm_client()
+    summary_path = write_batch_summary(summaries, args.output_dir)
+    print(f"[批量] 汇总表：{summary_path}")
+    return summary_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量任务：一张表里的多行需求共用一个调度器跑完")
+    parser.add_argument("jobs", help="任务表（.xlsx / .csv / .jsonl）")
+    parser.add_argument("--output-dir", default=os.path.join(config.OUTPUT_DIR, "批量任务"))
+    parser.add_argument("--parallel", type=int, default=config.BATCH_MAX_PARALLEL_JOBS, help="同时在跑的任务行数")
+    parser.add_argument("--batch-id", help="批次号（默认按任务表路径生成，重跑同一张表时接上进度）")
+    parser.add_argument("--dry-run", action="store_true", help="只解析并列出任务，不调用 LLM")
+    asyncio.run(amain(parser.parse_args()))
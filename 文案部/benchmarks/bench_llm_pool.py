@@ -0,0 +1,111 @@
+"""
+基准：共享连接池 vs 每次请求新建 ClientSession
+
+在本地起一个 OpenAI 兼容的替身服务（benchmarks/fake_llm_server.py），
+模拟 50 篇文章的一轮运行（每篇 1 次 Writer 生成 + 1 次审核），
+统计服务端观察到的 TCP 建连次数（即节省下来的握手次数）。
+
+运行：
+    python benchmarks/bench_llm_pool.py [--articles 50] [--latency 0.02]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiohttp
+
+import llm_cache
+import llm_client
+import swarm_with_llm as swarm
+from fake_llm_server import FakeLLMServer
+
+# 统计的是真实发出的请求，关闭响应缓存
+llm_cache.set_llm_cache(None)
+
+
+async def _run_article(api_url: str, article_id: int):
+    assignment = {"persona": "宝妈", "selling_point": "空间"}
+    draft = await swarm.call_deepseek_api_async(f"第{article_id}篇初稿", "k", api_url)
+    await swarm.evaluate_content_ai_flavor_async(draft, assignment, "k", api_url)
+
+
+async def _run_phase(api_url: str, articles: int) -> float:
+    swarm._api_limiter = None
+    started = time.perf_counter()
+    await asyncio.gather(*(_run_article(api_url, i) for i in range(articles)))
+    return time.perf_counter() - started
+
+
+async def main(articles: int, latency: float):
+    server = FakeLLMServer(latency=latency, latency_dist="fixed")
+    api_url = await server.start()
+    peers = server.peers
+    try:
+        # 基线：复刻旧实现，每次请求新建一个 ClientSession（即一次新握手）
+        llm_client.set_llm_client(
+            llm_client.LLMClient(session_factory=lambda: _OneShotSession())
+        )
+        peers.clear()
+        baseline_seconds = await _run_phase(api_url, articles)
+        baseline_connections = len(peers)
+
+        # 共享连接池
+        pooled = llm_client.LLMClient()
+        llm_client.set_llm_client(pooled)
+        peers.clear()
+        pooled_seconds = await _run_phase(api_url, articles)
+        pooled_connections = len(peers)
+        await llm_client.close_llm_client()
+    finally:
+        llm_client.set_llm_client(None)
+        await server.stop()
+
+    requests_total = articles * 2
+    print(f"文章数: {articles}  LLM 请求数: {requests_total}  单次延迟: {latency * 1000:.0f}ms")
+    print(f"{'模式':<12}{'TCP 建连':>10}{'耗时(s)':>10}")
+    print(f"{'每次新建':<12}{baseline_connections:>10}{baseline_seconds:>10.3f}")
+    print(f"{'共享连接池':<12}{pooled_connections:>10}{pooled_seconds:>10.3f}")
+    print(f"节省握手次数: {baseline_connections - pooled_connections}")
+    print(f"连接池统计: {pooled.stats}")
+
+
+class _OneShotSession:
+    """每次 post 都新建并关闭一个 ClientSession，模拟改造前的行为"""
+
+    closed = False
+
+    def post(self, url, **kwargs):
+        return _OneShotRequest(url, kwargs)
+
+    async def close(self):
+        self.closed = True
+
+
+class _OneShotRequest:
+    def __init__(self, url, kwargs):
+        self._url = url
+        self._kwargs = kwargs
+        self._session = None
+        self._response_cm = None
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession()
+        self._response_cm = self._session.post(self._url, **self._kwargs)
+        return await self._response_cm.__aenter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._response_cm.__aexit__(exc_type, exc, tb)
+        await self._session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--articles", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(main(args.articles, args.latency))
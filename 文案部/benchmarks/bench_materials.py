@@ -0,0 +1,179 @@
+"""
+基准：单篇首稿 prompt 组装耗时（MaterialLibrary 内存索引 vs 每篇重新读取素材库）
+
+prepare_writer_request 每篇查一次口吻 / 场景 / 爆款样本并抽样拼 prompt：
+- 改动前：每篇重新打开三份 markdown，逐个 find 分节标记、逐行切分本节（与旧 load_*_samples 同算法）
+- 新建库：新建 MaterialLibrary 后的第一篇（文件内容来自进程级 material_cache，只重建样本索引）
+- 热索引：进程级 MaterialLibrary，只 stat 文件确认 mtime 未变，查询为字典查找
+
+另测整份解析随素材库规模的扩展性：把口吻样本库复制成 N 个人设分节，
+改动前逐个标记 find 分节 + 逐节逐行归类（O(标记数 × 文件长度)），
+markdown_sections 一遍扫描出标题树。
+
+运行：
+    python benchmarks/bench_materials.py [--articles 200] [--repeat 5] [--sections 4,400,4000]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import material_library
+import markdown_sections
+import swarm_with_llm as swarm
+
+_PERSONAS = list(material_library.PERSONA_MARKERS)
+_SCENES = list(material_library.SCENE_MARKERS)
+
+
+def _briefs(articles: int):
+    customer_brief = {"车型": "CR-V", "平台": "抖音", "数量": articles, "方向": _SCENES[0], "调性": "真实口语化"}
+    assignments = [
+        {"id": i + 1, "persona": _PERSONAS[i % len(_PERSONAS)], "selling_point": "空间", "scene": _SCENES[0]}
+        for i in range(articles)
+    ]
+    return customer_brief, assignments
+
+
+def _legacy_section(path: str, markers: dict, key: str) -> str:
+    """旧 load_*_samples 的做法：整份读入，按标记 find 出本节"""
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    start = content.find(markers[key])
+    if start == -1:
+        return ""
+    end = len(content)
+    for other, marker in markers.items():
+        pos = content.find(marker, start + 1) if other != key else -1
+        if pos != -1:
+            end = min(end, pos)
+    return content[start:end]
+
+
+def _legacy_subsections(text: str, subsections) -> dict:
+    """改动前的逐行归类：每行比对所有 **小节名**"""
+    samples = {name: [] for name in subsections}
+    current = None
+    for line in text.split("\n"):
+        header = next((name for name in subsections if f"**{name}**" in line), None)
+        if header:
+            current = header
+            continue
+        item = markdown_sections.quoted_item(line)
+        if current and item is not None:
+            samples[current].append(item)
+    return samples
+
+
+def _legacy_quoted_items(text: str) -> list:
+    return [item for item in map(markdown_sections.quoted_item, text.split("\n")) if item is not None]
+
+
+class _LegacyLibrary(material_library.MaterialLibrary):
+    """每次查询都重新读文件、只解析用到的那一节（改动前每篇的开销）"""
+
+    def persona_samples(self, persona):
+        path = self._resolve(material_library.PERSONA_FILE)
+        text = _legacy_section(path, material_library.PERSONA_MARKERS, persona)
+        return _legacy_subsections(text, material_library.PERSONA_SUBSECTIONS)
+
+    def scene_samples(self, scene_type):
+        path = self._resolve(material_library.SCENE_FILE)
+        text = _legacy_section(path, material_library.SCENE_MARKERS, scene_type)
+        return _legacy_subsections(text, material_library.SCENE_SUBSECTIONS)
+
+    def few_shot_samples(self, platform):
+        path = self._resolve(material_library.FEW_SHOT_FILE)
+        return _legacy_quoted_items(_legacy_section(path, material_library.PLATFORM_MARKERS, platform))
+
+
+def _legacy_parse_persona_library(content: str, markers: dict) -> dict:
+    """改动前的整份解析：每个标记 find 一遍全文，再对每节逐行匹配 **小节名**"""
+    positions = {key: content.find(marker) for key, marker in markers.items()}
+    starts = sorted(pos for pos in positions.values() if pos != -1)
+    library = {}
+    for key, start in positions.items():
+        if start == -1:
+            continue
+        end = next((pos for pos in starts if pos > start), len(content))
+        library[key] = _legacy_subsections(content[start:end], material_library.PERSONA_SUBSECTIONS)
+    return library
+
+
+def _scaled_persona_library(sections: int):
+    """口吻样本库的人设分节复制到 N 节，返回 (全文, 标记)"""
+    path = os.path.join(material_library.MATERIAL_DIR, material_library.PERSONA_FILE)
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    bodies = [
+        content[content.find(marker) + len(marker):]
+        for marker in material_library.PERSONA_MARKERS.values()
+    ]
+    bodies = [body[: body.find("\n## ")] for body in bodies]
+    markers = {f"人设{i}": f"## {i + 1}、人设{i}口吻" for i in range(sections)}
+    parts = [f"{marker}{bodies[i % len(bodies)]}\n" for i, marker in enumerate(markers.values())]
+    return "# 口吻样本库\n\n" + "".join(parts), markers
+
+
+def _parse_scaling(section_counts, repeat: int):
+    print("整份解析（口吻样本库扩成 N 个人设分节）")
+    for sections in section_counts:
+        content, markers = _scaled_persona_library(sections)
+        started = time.perf_counter()
+        legacy = _legacy_parse_persona_library(content, markers)
+        legacy_ms = (time.perf_counter() - started) * 1000
+        tokenize_ms = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            document = markdown_sections._tokenize(content)
+            indexed = {
+                key: material_library._pick_blocks(document.find(marker), material_library.PERSONA_SUBSECTIONS)
+                for key, marker in markers.items()
+            }
+            tokenize_ms.append((time.perf_counter() - started) * 1000)
+        after = statistics.median(tokenize_ms)
+        same = "一致" if legacy == indexed else "不一致"
+        print(f"  {sections:>5} 节 {len(content) / 1024:>8.0f} KB：改动前 {legacy_ms:9.1f} ms，"
+              f"一遍扫描 {after:7.1f} ms（{legacy_ms / after:6.1f}x，结果{same}）")
+
+
+def _per_article_us(articles: int, library_factory, fresh_each_article: bool = False) -> float:
+    customer_brief, assignments = _briefs(articles)
+    material_library.set_material_library(library_factory())
+    detail_samples = swarm.load_writer_detail_samples()
+    started = time.perf_counter()
+    for assignment in assignments:
+        if fresh_each_article:
+            material_library.set_material_library(library_factory())
+        swarm.prepare_writer_request(customer_brief, assignment, detail_samples)
+    return (time.perf_counter() - started) / articles * 1_000_000
+
+
+def main(articles: int, repeat: int, section_counts):
+    Library = material_library.MaterialLibrary
+    _per_article_us(1, Library)
+    legacy = statistics.median(_per_article_us(articles, _LegacyLibrary) for _ in range(repeat))
+    cold = statistics.median(_per_article_us(articles, Library, fresh_each_article=True) for _ in range(repeat))
+    warm = statistics.median(_per_article_us(articles, Library) for _ in range(repeat))
+    parses = material_library.get_material_library().stats["parses"]
+
+    print(f"单篇 prompt 组装（{articles} 篇，{repeat} 次取中位数，素材目录 {material_library.MATERIAL_DIR}）")
+    print(f"  改动前（每篇重读 + 分节扫描）：{legacy:8.1f} µs / 篇")
+    print(f"  新建库（新库的第一篇）       ：{cold:8.1f} µs / 篇（一次性）")
+    print(f"  MaterialLibrary 热索引       ：{warm:8.1f} µs / 篇（{legacy / warm:.1f}x，{articles} 篇共解析 {parses} 次）")
+    _parse_scaling(section_counts, repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--sections", type=lambda s: [int(x) for x in s.split(",")], default=[4, 400, 4000])
+    args = parser.parse_args()
+    main(args.articles, args.repeat, args.sections)
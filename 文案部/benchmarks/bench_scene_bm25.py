@@ -0,0 +1,105 @@
+"""
+基准：场景检索引擎随场景库规模的扩展性（overlap vs 字符 n-gram BM25）
+
+- overlap：逐场景关键词子串重合，查询成本随场景数线性增长
+- bm25：建一次 场景 × n-gram 稀疏权重矩阵；单条查询把命中 n-gram 的倒排行用 bincount 累加，
+  retrieve_many 每批算一次稀疏乘积 Q @ M.T（只有和查询共享 n-gram 的场景才有分数），
+  再按行 partition 取 top-k。没装 numpy/scipy 时走纯 Python 倒排表
+
+场景库是合成的：每节一个 "## 1、xxx场景" 标题，正文是真实场景库里随机抽的句子片段
+（常见 n-gram 在各节反复出现，倒排表够长），再嵌入 3 个该节独有的随机短语；
+查询 = 一段真实句子开头 + 其中一个独有短语，顺带统计 top-1 命中率。
+
+运行：
+    python benchmarks/bench_scene_bm25.py [--sizes 100,1000,10000] [--queries 500]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from scene_rag import SceneRetriever, _load_numpy
+
+LIBRARY = "02-参考学习/03-Writer材料/内容变量库/场景切入库.md"
+
+
+def _corpus():
+    with open(LIBRARY, "r", encoding="utf-8") as f:
+        text = f.read()
+    runs = [run for run in re.findall(r"[\u4e00-\u9fff]+", text) if len(run) >= 4]
+    return runs, sorted({ch for run in runs for ch in run})
+
+
+def _synthetic_library(size: int, seed: int = 0):
+    """返回 (markdown 文本, [(查询, 期望场景名)])"""
+    rnd = random.Random(seed)
+    runs, alphabet = _corpus()
+    word = lambda n: "".join(rnd.choice(alphabet) for _ in range(n))
+    parts, probes = ["# 合成场景库\n"], []
+    for idx in range(size):
+        name = f"{idx:05d}号{word(2)}"
+        phrases = [word(4) for _ in range(3)]
+        body = [rnd.choice(runs) for _ in range(12)]
+        for phrase in phrases:
+            body.insert(rnd.randrange(len(body)), phrase)
+        parts.append(f"## {idx + 1}、{name}场景\n\n" + "，".join(body) + "。\n")
+        probes.append((rnd.choice(runs)[:8] + rnd.choice(phrases), name))
+    return "\n".join(parts), probes
+
+
+def _measure(retriever: SceneRetriever, probes, batch: bool):
+    queries = [q for q, _ in probes]
+    started = time.perf_counter()
+    if batch:
+        results = retriever.retrieve_many(queries)
+    else:
+        results = [retriever.retrieve(q) for q in queries]
+    elapsed = time.perf_counter() - started
+    hits = sum(1 for r, (_, name) in zip(results, probes) if r["scene_type"] == name)
+    return elapsed / len(queries) * 1e6, hits / len(queries)
+
+
+def main(sizes, query_count):
+    has_numpy = _load_numpy()[0] is not None
+    configs = [("overlap", {}, False)]
+    if has_numpy:
+        configs += [("bm25", {}, False), ("bm25", {}, True)]
+    configs += [("bm25", {"use_numpy": False}, False)]
+
+    print(f"numpy/scipy：{'可用' if has_numpy else '未安装（仅纯 Python 路径）'}")
+    print(f"{'场景数':>8}  {'引擎':<22}{'建索引(ms)':>12}{'µs/查询':>12}{'top-1 命中':>12}")
+    for size in sizes:
+        text, probes = _synthetic_library(size)
+        probes = random.Random(1).sample(probes, min(query_count, len(probes)))
+        with tempfile.NamedTemporaryFile("w", suffix=".md", encoding="utf-8", delete=False) as f:
+            f.write(text)
+            path = f.name
+        try:
+            for engine, options, batch in configs:
+                label = engine
+                if engine == "bm25":
+                    label += " scipy" if options.get("use_numpy", True) else " 纯Python"
+                    label += " 批量" if batch else " 逐条"
+                started = time.perf_counter()
+                retriever = SceneRetriever(path, min_score=0.0, default_scene="-", engine=engine, **options)
+                build_ms = (time.perf_counter() - started) * 1000
+                per_query, hit_rate = _measure(retriever, probes, batch)
+                print(f"{size:>8}  {label:<22}{build_ms:>12.1f}{per_query:>12.1f}{hit_rate:>11.1%}")
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda s: [int(x) for x in s.split(",")], default=[100, 1000, 10000])
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+    main(args.sizes, args.queries)
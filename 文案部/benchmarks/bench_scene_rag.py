@@ -0,0 +1,115 @@
+"""
+基准：SceneRetriever.retrieve 吞吐（预建倒排索引 vs 每次查询重新切词 + 嵌套子串比对）
+
+- 改动前：每次查询对每个场景重新跑 _scene_term_set（正则切整节 + 去重），
+  再做 查询词 × 场景词 的双层子串循环
+- 索引：__init__ 里一次建好场景词表和子串倒排索引，查询只切查询本身再查字典
+
+查询取自场景库原文片段与常见需求描述，两种实现逐条核对结果一致。
+
+运行：
+    python benchmarks/bench_scene_rag.py [--queries 1000,100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from scene_rag import SceneRetriever
+
+LIBRARY = "02-参考学习/03-Writer材料/内容变量库/场景切入库.md"
+_SEED_QUERIES = [
+    "过年回家满载而归",
+    "周末带娃去郊外露营",
+    "早高峰通勤堵车太闹心",
+    "接爸妈去医院复查",
+    "孩子放暑假想去海边",
+    "火星基地能源补给站",
+]
+
+
+class _LegacyRetriever(SceneRetriever):
+    """改动前的 retrieve：每次查询现算场景词表，双层循环比对"""
+
+    def retrieve(self, scene_text):
+        query = (scene_text or "").strip()
+        if not query:
+            return self._fallback("empty_input")
+        if not self._scene_sections:
+            return self._fallback("library_unavailable", query)
+        query_terms = self.engine.extract_terms(query)
+        if not query_terms:
+            return self._fallback("query_unusable", query)
+
+        ranking = []
+        for scene_name, section_text in self._scene_sections.items():
+            scene_terms = self.engine._scene_term_set(scene_name, section_text)
+            matched = []
+            for q in query_terms:
+                for st in scene_terms:
+                    if q in st or st in q:
+                        matched.append(st)
+                        break
+            score = (len(matched) + (1 if scene_name in query else 0)) / (len(query_terms) + 1)
+            ranking.append({"scene_type": scene_name, "score": round(score, 4), "matched": matched})
+        ranking.sort(key=lambda item: item["score"], reverse=True)
+        best = ranking[0]
+        evidence = [f"{item['scene_type']}:{item['score']:.4f}" for item in ranking[: self.top_k]]
+        if best["score"] < self.min_score:
+            return {"scene_type": self.default_scene, "keywords": best["matched"][: self.top_k],
+                    "evidence": evidence + ["below_threshold"], "score": float(best["score"]), "fallback_used": True}
+        return {"scene_type": best["scene_type"], "keywords": best["matched"][: self.top_k],
+                "evidence": evidence, "score": float(best["score"]), "fallback_used": False}
+
+
+def _queries(count: int):
+    with open(LIBRARY, "r", encoding="utf-8") as f:
+        text = f.read()
+    rnd = random.Random(0)
+    queries = []
+    while len(queries) < count:
+        if rnd.random() < 0.5:
+            queries.append(rnd.choice(_SEED_QUERIES))
+        else:
+            start = rnd.randrange(len(text))
+            queries.append(text[start:start + rnd.randint(4, 30)])
+    return queries
+
+
+def _throughput(retriever: SceneRetriever, queries) -> float:
+    started = time.perf_counter()
+    for query in queries:
+        retriever.retrieve(query)
+    return time.perf_counter() - started
+
+
+def main(counts):
+    started = time.perf_counter()
+    indexed = SceneRetriever(LIBRARY)
+    build_ms = (time.perf_counter() - started) * 1000
+    legacy = _LegacyRetriever(LIBRARY)
+
+    check = _queries(2000)
+    mismatches = sum(1 for q in check if legacy.retrieve(q) != indexed.retrieve(q))
+    print(f"建索引 {build_ms:.1f} ms，词表 {sum(len(t) for t in indexed.engine._scene_terms.values())} 项，"
+          f"子串键 {len(indexed.engine._containing_positions)} 个；抽查 {len(check)} 条结果不一致 {mismatches} 条")
+
+    print(f"{'查询数':>8}{'改动前(s)':>12}{'索引(s)':>10}{'改动前 µs/次':>14}{'索引 µs/次':>12}{'加速':>8}")
+    for count in counts:
+        queries = _queries(count)
+        before = _throughput(legacy, queries)
+        after = _throughput(indexed, queries)
+        print(f"{count:>8}{before:>12.3f}{after:>10.3f}{before / count * 1e6:>14.1f}{after / count * 1e6:>12.1f}{before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=lambda s: [int(x) for x in s.split(",")], default=[1000, 100000])
+    args = parser.parse_args()
+    main(args.queries)
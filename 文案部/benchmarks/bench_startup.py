@@ -0,0 +1,114 @@
+"""
+基准：冷启动耗时（重依赖懒加载 + 编译图缓存）
+
+每项都在全新的子进程里测，避免 sys.modules 缓存干扰：
+- import swarm_with_llm：只导入模块（langgraph / aiohttp / openpyxl / tenacity 均未加载）
+- 旧版等价：导入模块前先导入 langgraph.graph / aiohttp / openpyxl / tenacity（即改动前 import 时的开销）
+- 首次建图：import + 第一次 create_swarm()（此时才导入 langgraph 并编译）
+- 缓存建图：同一进程里第二次 create_swarm() / 挂检查点的 create_swarm(checkpointer)
+- Web UI 首屏：装了 streamlit 时用 AppTest 跑一遍 web_ui.py（到第一次渲染完成）
+
+运行：
+    python benchmarks/bench_startup.py [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT_ONLY = """
+import time
+started = time.perf_counter()
+import swarm_with_llm
+print(time.perf_counter() - started)
+"""
+
+_IMPORT_EAGER = """
+import time
+started = time.perf_counter()
+import langgraph.graph, aiohttp, openpyxl, openpyxl.styles, tenacity
+import swarm_with_llm
+print(time.perf_counter() - started)
+"""
+
+_FIRST_GRAPH = """
+import json, time
+started = time.perf_counter()
+import swarm_with_llm
+swarm_with_llm.create_swarm()
+first = time.perf_counter() - started
+
+started = time.perf_counter()
+swarm_with_llm.create_swarm()
+cached = time.perf_counter() - started
+
+from langgraph.checkpoint.memory import InMemorySaver
+saver = InMemorySaver()
+started = time.perf_counter()
+swarm_with_llm.create_swarm(saver)
+with_checkpointer = time.perf_counter() - started
+
+started = time.perf_counter()
+swarm_with_llm._build_swarm_graph().compile(checkpointer=saver)
+recompile = time.perf_counter() - started
+print(json.dumps([first, cached, with_checkpointer, recompile]))
+"""
+
+_FIRST_RENDER = """
+import time
+from streamlit.testing.v1 import AppTest
+started = time.perf_counter()
+AppTest.from_file("web_ui.py", default_timeout=60).run()
+print(time.perf_counter() - started)
+"""
+
+
+def _run(snippet: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", snippet], cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def _median(snippet: str, repeat: int) -> float:
+    return statistics.median(float(_run(snippet)) for _ in range(repeat))
+
+
+def main(repeat: int):
+    # 先跑一次，让 .pyc 都已生成，之后测到的是稳态冷启动
+    _run(_IMPORT_EAGER)
+
+    import_only = _median(_IMPORT_ONLY, repeat)
+    import_eager = _median(_IMPORT_EAGER, repeat)
+    graph_runs = [json.loads(_run(_FIRST_GRAPH)) for _ in range(repeat)]
+    first, cached, with_checkpointer, recompile = (
+        statistics.median(run[i] for run in graph_runs) for i in range(4)
+    )
+
+    print(f"冷启动（子进程，{repeat} 次取中位数）")
+    print(f"  import swarm_with_llm        ：{import_only * 1000:8.1f} ms")
+    print(f"  旧版等价（预先导入重依赖）   ：{import_eager * 1000:8.1f} ms")
+    print(f"  import + 首次 create_swarm() ：{first * 1000:8.1f} ms")
+    print(f"  缓存的 create_swarm()        ：{cached * 1000:8.3f} ms")
+    print(f"  缓存 + 挂检查点              ：{with_checkpointer * 1000:8.3f} ms")
+    print(f"  重新编译（改动前每次运行）   ：{recompile * 1000:8.3f} ms")
+
+    try:
+        import streamlit  # noqa: F401
+    except ImportError:
+        print("  Web UI 首屏                  ：未安装 streamlit，跳过")
+        return
+    first_render = _median(_FIRST_RENDER, repeat)
+    print(f"  Web UI 首屏（AppTest）       ：{first_render * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.repeat)
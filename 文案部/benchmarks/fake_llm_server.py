@@ -0,0 +1,308 @@
+"""
+本地 OpenAI 兼容替身服务（/v1/chat/completions）
+
+不调用真实 API 就能压测整个 swarm：
+- 延迟分布：fixed / uniform / exponential / lognormal（--latency 为均值 / 中位数）
+- 按比例注入 500 错误与 429 限流（带 Retry-After）
+- 支持 stream: true 的 SSE 输出，include_usage 时最后补一个 usage 块
+- 按 prompt 识别请求类型，返回 Writer 正文 / 单篇审核 JSON / 批量审核 JSON 数组
+- usage 里模拟 DeepSeek 前缀缓存：与历史请求相同的前缀（按 64 字对齐）计入 prompt_cache_hit_tokens
+
+既可以在基准脚本里 async with FakeLLMServer(...) 嵌入使用，也可以单独起服务：
+    python benchmarks/fake_llm_server.py --port 8000 --latency 0.3 --rate-limit-rate 0.05
+    DEEPSEEK_API_URL=http://127.0.0.1:8000/v1/chat/completions python swarm_with_llm.py
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from typing import Dict, Optional
+
+from aiohttp import web
+
+
+# 替身正文：不含禁用词、不含参数词，能通过审核者的硬性检查
+_WRITER_SENTENCES = [
+    "周末带爸妈去郊外转了一圈，后排坐得宽宽松松。",
+    "后备箱塞进了折叠车和两箱水果，盖子一关刚刚好。",
+    "高速上跟车很稳，老人家一路都没喊晕车。",
+    "油耗比预想的低，来回一趟加油站都没进。",
+    "孩子在后排睡了一路，座椅放倒就是小床。",
+    "停车场车位窄，倒车影像看得清清楚楚。",
+    "这台车不张扬，但每个细节都在替你省心。",
+    "精打细算的人选车，看的就是这种实打实的体验。",
+]
+
+_PREFIX_BLOCK = 64
+_TOKENS_PER_CHAR = 0.6
+
+
+class FakeLLMServer:
+    """可配置延迟 / 错误率 / 限流率的替身服务"""
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        latency_dist: str = "lognormal",
+        latency_sigma: float = 0.5,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 0.5,
+        review_pass_rate: float = 1.0,
+        writer_chars: int = 280,
+        writer_chars_jitter: int = 0,
+        stream_chunk_chars: int = 8,
+        stream_chunk_delay: float = 0.002,
+        seed: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.latency_dist = latency_dist
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.review_pass_rate = review_pass_rate
+        self.writer_chars = writer_chars
+        self.writer_chars_jitter = writer_chars_jitter
+        self.stream_chunk_chars = stream_chunk_chars
+        self.stream_chunk_delay = stream_chunk_delay
+        self.host = host
+        self.port = port
+        self._random = random.Random(seed)
+        self._seen_prefixes = set()
+        self._runner = None
+        self.url = None
+        self.peers = set()
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "writer": 0,
+            "review": 0,
+            "batch_review": 0,
+            "streamed": 0,
+            "errors": 0,
+            "throttled": 0,
+            "in_flight": 0,
+            "max_in_flight": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+    async def start(self) -> str:
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_post("/v1/chat/completions", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        self.url = f"http://{self.host}:{self.port}/v1/chat/completions"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "FakeLLMServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.stop()
+
+    def reset_stats(self) -> None:
+        for key in self.stats:
+            self.stats[key] = 0
+        self.peers.clear()
+
+    # ------------------------------------------------------------------
+    # 模拟行为
+    # ------------------------------------------------------------------
+    def _sample_latency(self) -> float:
+        if self.latency <= 0:
+            return 0.0
+        if self.latency_dist == "fixed":
+            return self.latency
+        if self.latency_dist == "uniform":
+            return self._random.uniform(0, 2 * self.latency)
+        if self.latency_dist == "exponential":
+            return self._random.expovariate(1.0 / self.latency)
+        # lognormal：latency 为中位数，sigma 控制长尾
+        return self._random.lognormvariate(0.0, self.latency_sigma) * self.latency
+
+    def _prefix_cache_hit(self, prompt: str) -> int:
+        """返回与历史请求相同的最长前缀字数（按块对齐），并记录本次前缀"""
+        hit_chars = 0
+        digest = hashlib.sha1()
+        for end in range(_PREFIX_BLOCK, len(prompt) + 1, _PREFIX_BLOCK):
+            digest.update(prompt[end - _PREFIX_BLOCK:end].encode("utf-8"))
+            key = digest.hexdigest()
+            if key in self._seen_prefixes:
+                hit_chars = end
+            else:
+                self._seen_prefixes.add(key)
+        return hit_chars
+
+    def _usage(self, prompt: str, completion: str) -> Dict:
+        prompt_tokens = int(len(prompt) * _TOKENS_PER_CHAR)
+        hit_tokens = min(prompt_tokens, int(self._prefix_cache_hit(prompt) * _TOKENS_PER_CHAR))
+        completion_tokens = int(len(completion) * _TOKENS_PER_CHAR)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_cache_hit_tokens": hit_tokens,
+            "prompt_cache_miss_tokens": prompt_tokens - hit_tokens,
+        }
+
+    def _verdict(self) -> Dict:
+        if self._random.random() < self.review_pass_rate:
+            return {"passed": True, "score": 8, "issues": [], "suggestions": []}
+        return {
+            "passed": False,
+            "score": 5,
+            "issues": ["替身审核：缺少具体配置数据支撑"],
+            "suggestions": ["补充 1-2 个真实配置参数"],
+        }
+
+    def _writer_text(self) -> str:
+        start = self._random.randrange(len(_WRITER_SENTENCES))
+        # 字数在 writer_chars ± writer_chars_jitter 内均匀抖动，模拟真实 Writer 的字数失控
+        chars = self.writer_chars + self._random.randint(-self.writer_chars_jitter, self.writer_chars_jitter)
+        text = ""
+        index = start
+        while len(text) < chars:
+            text += _WRITER_SENTENCES[index % len(_WRITER_SENTENCES)]
+            index += 1
+        return text[:chars]
+
+    def _reply(self, prompt: str) -> str:
+        batch_ids = re.findall(r"=== 篇(\d+) ===", prompt)
+        if batch_ids:
+            self.stats["batch_review"] += 1
+            return json.dumps(
+                [dict(self._verdict(), id=int(article_id)) for article_id in batch_ids],
+                ensure_ascii=False,
+            )
+        if "反AI八股文" in prompt:
+            self.stats["review"] += 1
+            return json.dumps(self._verdict(), ensure_ascii=False)
+        self.stats["writer"] += 1
+        return self._writer_text()
+
+    # ------------------------------------------------------------------
+    # HTTP 处理
+    # ------------------------------------------------------------------
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        self.peers.add(request.transport.get_extra_info("peername"))
+        self.stats["requests"] += 1
+        self.stats["in_flight"] += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+        try:
+            body = await request.json()
+            await asyncio.sleep(self._sample_latency())
+
+            roll = self._random.random()
+            if roll < self.rate_limit_rate:
+                self.stats["throttled"] += 1
+                return web.json_response(
+                    {"error": {"message": "rate limited", "type": "rate_limit_error"}},
+                    status=429,
+                    headers={"Retry-After": f"{self.retry_after:g}"},
+                )
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return web.json_response({"error": {"message": "upstream error"}}, status=500)
+
+            prompt = body["messages"][-1]["content"]
+            content = self._reply(prompt)
+            usage = self._usage(prompt, content)
+            if body.get("stream"):
+                return await self._stream(request, body, content, usage)
+            return web.json_response({
+                "id": f"fake-{self.stats['requests']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+        finally:
+            self.stats["in_flight"] -= 1
+
+    async def _stream(self, request: web.Request, body: Dict, content: str, usage: Dict) -> web.StreamResponse:
+        self.stats["streamed"] += 1
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        try:
+            await response.prepare(request)
+            for start in range(0, len(content), self.stream_chunk_chars):
+                event = {"choices": [{"index": 0, "delta": {"content": content[start:start + self.stream_chunk_chars]}}]}
+                await response.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                if self.stream_chunk_delay:
+                    await asyncio.sleep(self.stream_chunk_delay)
+            if body.get("stream_options", {}).get("include_usage"):
+                await response.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+            await response.write(b"data: [DONE]\n\n")
+        except ConnectionResetError:
+            # 客户端提前中止（超长截断）；取消（服务关闭）照常向上抛
+            pass
+        return response
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    """替身服务的通用命令行参数（基准脚本复用）"""
+    parser.add_argument("--latency", type=float, default=0.05, help="单次请求延迟（秒，均值 / 中位数）")
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "exponential", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal 长尾参数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 错误比例")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="429 限流比例")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="429 响应的 Retry-After 秒数")
+    parser.add_argument("--review-pass-rate", type=float, default=1.0, help="审核通过比例")
+    parser.add_argument("--writer-chars", type=int, default=280, help="Writer 正文字数")
+    parser.add_argument("--writer-chars-jitter", type=int, default=0, help="Writer 字数随机抖动幅度（±字）")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def server_from_args(args: argparse.Namespace, **kwargs) -> FakeLLMServer:
+    return FakeLLMServer(
+        latency=args.latency,
+        latency_dist=args.latency_dist,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        review_pass_rate=args.review_pass_rate,
+        writer_chars=args.writer_chars,
+        writer_chars_jitter=args.writer_chars_jitter,
+        seed=args.seed,
+        **kwargs,
+    )
+
+
+async def _serve_forever(server: FakeLLMServer) -> None:
+    async with server:
+        print(f"替身服务已启动：{server.url}")
+        try:
+            while True:
+                await asyncio.sleep(3600)
+        finally:
+            print(f"统计：{server.stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_server_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve_forever(server_from_args(args, host=args.host, port=args.port)))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,202 @@
+"""
+端到端压测：完整的 create_swarm() 图 + 本地替身服务
+
+对 1 / 10 / 100 / 500 篇分别跑一遍完整流程（客户经理 → 策划者 → Writer → 审核者 → 修改循环 → 输出），
+统计：
+- 总耗时（wall time）
+- 单篇完成延迟 p50 / p95（从运行开始到该篇最后一次 LLM 响应）
+- 每篇 LLM 请求数（替身服务实际收到的请求，含重试）
+- 峰值内存（tracemalloc 峰值 + 进程 RSS 峰值）
+
+运行：
+    python benchmarks/load_swarm.py
+    python benchmarks/load_swarm.py --articles 1,10,100 --latency 0.2 --rate-limit-rate 0.05 --review-pass-rate 0.7
+    python benchmarks/load_swarm.py --pipeline --articles 100 --latency-sigma 1.0
+    python benchmarks/load_swarm.py --pipeline --articles 50 --concurrency 8 --review-pass-rate 0.5 [--flat-priority]
+    python benchmarks/load_swarm.py --pipeline --articles 50 --writer-chars-jitter 80 --review-pass-rate 0.7 --candidates 3
+    python benchmarks/load_swarm.py --json baseline.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_cache
+import llm_client
+import run_store
+import swarm_with_llm as swarm
+import usage_tracker
+from config import config
+from fake_llm_server import add_server_arguments, server_from_args
+
+
+def _percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(pct) - 1]
+
+
+def _initial_state(articles: int, platform: str) -> dict:
+    return {
+        "user_input": {"车型": "CR-V", "平台": platform, "数量": articles, "方向": "春节返乡"},
+        "customer_brief": {},
+        "planner_brief": {},
+        "contents": [],
+        "review_results": [],
+        "final_output": "",
+        "current_attempt": 1,
+        "need_manual_review": [],
+        "skip_confirmations": True,
+        "metadata": {},
+    }
+
+
+class _ArticleClock:
+    """记录每篇最后一次 LLM 响应的时间（单篇请求靠 usage_scope，批量审核按批内篇号）"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.done = {}
+
+    def mark(self, article_id) -> None:
+        if article_id is not None:
+            self.done[article_id] = time.perf_counter() - self.started
+
+    def install(self, stack: contextlib.ExitStack) -> None:
+        original_record = swarm.record_usage
+        original_batch = swarm.evaluate_contents_batch_async
+
+        def record_usage(usage, estimated=False):
+            original_record(usage, estimated=estimated)
+            self.mark(usage_tracker.current_scope().get("article_id"))
+
+        async def evaluate_contents_batch_async(items, api_key, api_url):
+            reviews = await original_batch(items, api_key, api_url)
+            for item in items:
+                self.mark(item["id"])
+            return reviews
+
+        stack.callback(setattr, swarm, "record_usage", original_record)
+        stack.callback(setattr, swarm, "evaluate_contents_batch_async", original_batch)
+        swarm.record_usage = record_usage
+        swarm.evaluate_contents_batch_async = evaluate_contents_batch_async
+
+
+async def run_once(server, articles: int, platform: str, quiet: bool = True) -> dict:
+    server.reset_stats()
+    swarm._api_limiter = None
+    clock = _ArticleClock()
+    tracemalloc.start()
+    with contextlib.ExitStack() as stack:
+        clock.install(stack)
+        if quiet:
+            stack.enter_context(contextlib.redirect_stdout(open(os.devnull, "w")))
+        clock.started = time.perf_counter()
+        result = await swarm.arun_swarm(_initial_state(articles, platform), close_client=False)
+        wall = time.perf_counter() - clock.started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = sorted(clock.done.values())
+    passed = sum(1 for r in result.get("review_results", []) if r["passed"])
+    usage_total = result.get("metadata", {}).get("token_usage", {}).get("total", {})
+    return {
+        "articles": articles,
+        "wall_seconds": round(wall, 3),
+        "first_seconds": round(latencies[0], 3) if latencies else 0.0,
+        "p10_seconds": round(_percentile(latencies, 10), 3),
+        "p50_seconds": round(_percentile(latencies, 50), 3),
+        "p95_seconds": round(_percentile(latencies, 95), 3),
+        "requests": server.stats["requests"],
+        "requests_per_article": round(server.stats["requests"] / articles, 2),
+        "throttled": server.stats["throttled"],
+        "errors": server.stats["errors"],
+        "max_in_flight": server.stats["max_in_flight"],
+        "passed": passed,
+        "attempts": result.get("current_attempt", 1),
+        "prompt_tokens": usage_total.get("prompt_tokens", 0),
+        "completion_tokens": usage_total.get("completion_tokens", 0),
+        "prefix_cache_hit_rate": usage_total.get("prompt_cache_hit_rate", 0.0),
+        "cost": round(usage_total.get("cost", 0.0), 4),
+        "speculative": result.get("metadata", {}).get("speculative", {}),
+        "tracemalloc_peak_mb": round(peak / 1024 / 1024, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+async def main(args) -> list:
+    if not args.with_cache:
+        # 冷启动口径：每次运行都真实请求
+        llm_cache.set_llm_cache(None)
+    config.OUTPUT_DIR = tempfile.mkdtemp(prefix="load_swarm_")
+    run_store.set_run_store(run_store.RunStore(os.path.join(config.OUTPUT_DIR, "runs.sqlite3")))
+    config.TRACE_DIR = os.path.join(config.OUTPUT_DIR, "traces")
+    config.WRITER_STREAMING = args.streaming
+    config.PIPELINE_MODE = args.pipeline
+    if args.concurrency:
+        config.CONCURRENT_LIMIT = config.CONCURRENT_MIN = config.CONCURRENT_MAX = args.concurrency
+    config.WRITER_CANDIDATES = args.candidates
+    if args.flat_priority:
+        # 对照组：运行内不区分请求类别
+        config.LLM_REQUEST_PRIORITIES = {}
+    # 懒加载的 langgraph 导入与图编译放在计时之外（首轮否则会被 tracemalloc 下的导入拖慢）
+    swarm.warm_up_swarm(background=False)
+
+    results = []
+    async with server_from_args(args) as server:
+        config.DEEPSEEK_API_URL = server.url
+        try:
+            for articles in args.articles:
+                results.append(await run_once(server, articles, args.platform, quiet=not args.verbose))
+        finally:
+            await llm_client.close_llm_client()
+
+    print(f"替身延迟: {args.latency_dist} {args.latency * 1000:.0f}ms  429 比例: {args.rate_limit_rate}  "
+          f"500 比例: {args.error_rate}  审核通过率: {args.review_pass_rate}  流式: {args.streaming}  流水线: {args.pipeline}  "
+          f"候选数: {args.candidates}")
+    header = f"{'篇数':>6}{'耗时(s)':>10}{'首篇(s)':>9}{'p10(s)':>9}{'p50(s)':>9}{'p95(s)':>9}{'请求/篇':>9}{'429':>6}{'轮次':>6}{'通过':>6}{'tokens':>9}{'费用¥':>9}{'峰值内存MB':>12}{'RSS MB':>9}"
+    print(header)
+    for r in results:
+        print(f"{r['articles']:>6}{r['wall_seconds']:>10.3f}{r['first_seconds']:>9.3f}{r['p10_seconds']:>9.3f}{r['p50_seconds']:>9.3f}{r['p95_seconds']:>9.3f}"
+              f"{r['requests_per_article']:>9.2f}{r['throttled']:>6}{r['attempts']:>6}{r['passed']:>6}"
+              f"{r['prompt_tokens'] + r['completion_tokens']:>9}{r['cost']:>9.4f}"
+              f"{r['tracemalloc_peak_mb']:>12.2f}{r['max_rss_mb']:>9.1f}")
+    for r in results:
+        speculative = r["speculative"]
+        if speculative.get("generations"):
+            print(f"{r['articles']:>6} 篇：落选候选 {speculative['discarded']} 份 / 约 {speculative['discarded_tokens']} tokens，"
+                  f"本地预选挽回 {speculative['rescued']} 次")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.json}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--articles", type=lambda s: [int(x) for x in s.split(",")], default=[1, 10, 100, 500])
+    parser.add_argument("--platform", default="抖音")
+    parser.add_argument("--streaming", action="store_true", help="Writer 走 SSE 流式")
+    parser.add_argument("--pipeline", action="store_true", help="逐篇流水线模式（Config.PIPELINE_MODE）")
+    parser.add_argument("--concurrency", type=int, default=None, help="固定 LLM 并发窗口（制造排队，观察派发次序）")
+    parser.add_argument("--flat-priority", action="store_true", help="运行内不区分审核 / 修改 / 首稿（对照组）")
+    parser.add_argument("--candidates", type=int, default=1, help="每篇并发候选数（Config.WRITER_CANDIDATES，1 为对照组）")
+    parser.add_argument("--with-cache", action="store_true", help="保留本地响应缓存（默认关闭，测冷启动）")
+    parser.add_argument("--verbose", action="store_true", help="保留 swarm 的节点日志")
+    parser.add_argument("--json", help="把结果写入 JSON 文件，作为后续优化的对比基线")
+    add_server_arguments(parser)
+    asyncio.run(main(parser.parse_args()))
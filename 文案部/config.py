@@ -12,10 +12,94 @@ class Config:
     # ------------------
     DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY", "sk-208329981b3940e89602e2afe567d227")
     DEEPSEEK_API_URL = os.getenv("DEEPSEEK_API_URL", "https://api.deepseek.com/v1/chat/completions")
+    DEEPSEEK_MODEL = "deepseek-chat"
+    # LLM 并发：AIMD 自适应窗口，CONCURRENT_LIMIT 为初始窗口，在 [MIN, MAX] 之间伸缩
     CONCURRENT_LIMIT = 5
+    CONCURRENT_MIN = 1
+    CONCURRENT_MAX = 32
+    LIMITER_DECREASE_FACTOR = 0.5
+    # 短期延迟超过长期基线的倍数即视为拥塞
+    LIMITER_LATENCY_TOLERANCE = 2.0
+    # 共享连接池：总连接上限 / 每主机连接上限 / keep-alive 空闲保持秒数
+    LLM_POOL_LIMIT = 100
+    LLM_POOL_LIMIT_PER_HOST = 10
+    LLM_KEEPALIVE_TIMEOUT = 60
+    # LLM 响应缓存：SQLite 落盘，TTL 秒数 / 条目上限（LRU 淘汰）/ 内存热点层条目数
+    LLM_CACHE_ENABLED = True
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_responses.sqlite3")
+    LLM_CACHE_TTL_SECONDS = 7 * 24 * 3600
+    LLM_CACHE_MAX_ENTRIES = 5000
+    LLM_CACHE_MEMORY_ENTRIES = 512
+    # 过期条目清扫间隔秒数（写入时顺带检查，不必每次写都扫）
+    LLM_CACHE_SWEEP_SECONDS = 300
+    # Writer 温度是故意随机化的，默认不走缓存（审核者固定走缓存）
+    WRITER_USE_CACHE = False
+    # Writer 流式生成（SSE）：首 token 即可看到进度；超过平台字数上限（PLATFORM_SPECS limits）立即中止
+    WRITER_STREAMING = False
+    WRITER_STREAM_ABORT_ON_OVERRUN = True
+    # 推测式多候选：每篇（首稿与修改）按区间内均匀分布的 k 个温度并发生成 k 份候选，
+    # 本地规则（字数 / 禁用词 / 参数 / 套话 / 场景与情感评分）排序后只把最好的一份送 LLM 审核；1 表示关闭
+    WRITER_CANDIDATES = 1
+    WRITER_CANDIDATE_TEMPERATURE_RANGE = (0.6, 0.95)
+    # 首份无硬性问题、无套话的候选到达即采用并取消其余（省延迟与 token）；关闭时等全部候选再按评分选最优
+    WRITER_CANDIDATE_EARLY_ACCEPT = True
+    # 逐篇流水线：每篇独立走 写作 → 审核 → 修改，不等整批完成（关闭时为 Writer / 审核者 整批循环）
+    PIPELINE_MODE = False
+    # 分级审核闸门：off 始终调用 LLM 审核 / gate 硬性规则不通过的篇目跳过 LLM 审核 /
+    # lazy 同 gate，但最后一轮补调 LLM，给人工介入留完整意见
+    REVIEW_GATE_MODE = "gate"
+    # 批量审核：多篇文案合并为一次审核请求（规则文本只发一次），按篇数与 prompt token 预算装箱；
+    # 返回数组解析失败或缺篇时，只有受影响的篇目回退逐篇审核
+    REVIEW_BATCH_ENABLED = True
+    REVIEW_BATCH_SIZE = 10
+    REVIEW_BATCH_MAX_PROMPT_TOKENS = 6000
+    REVIEW_BATCH_OUTPUT_TOKENS_PER_ITEM = 256
+    # Token 单价（元 / 百万 tokens），用于费用估算
+    TOKEN_PRICES = {
+        "prompt_cache_hit": 0.2,
+        "prompt_cache_miss": 2.0,
+        "completion": 3.0,
+    }
+    # 拿不到 usage 时的估算系数（中文约 0.6 token / 字）
+    TOKENS_PER_CHAR = 0.6
+    # 单次运行费用上限（元），None 表示不限；超出后不再发起修改轮，剩余篇目转人工
+    RUN_BUDGET_YUAN = None
+    # 断点续跑：LangGraph 检查点（thread_id = 运行编号）+ 运行登记 / 篇目日志
+    # 检查点落盘需要 langgraph-checkpoint-sqlite，未安装时只在当前进程内可续
+    CHECKPOINT_ENABLED = True
+    CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", ".cache/checkpoints.sqlite3")
+    # 退回进程内检查点时最多保留的中断未续运行数（完成的运行立即释放，运行中的不计入也不淘汰）
+    CHECKPOINT_MEMORY_MAX_THREADS = 8
+    RUN_STORE_PATH = os.getenv("RUN_STORE_PATH", ".cache/runs.sqlite3")
+    # 多运行公平调度：同一个限制器下按运行排队，priority 小的先派发（交互式先于批量），
+    # 同优先级内按 weight 比例分配名额；运行类别记在 metadata["run_class"]
+    SCHEDULER_RUN_CLASSES = {
+        "interactive": {"priority": 0, "weight": 1.0},
+        "batch": {"priority": 1, "weight": 1.0},
+    }
+    # 运行内按请求类别派发：数值越小越先（审核 > 修改 > 首稿），让已在途的篇目先完成；
+    # 排队每满 LLM_PRIORITY_AGING_SECONDS 秒提升一级，低优先级请求不会饿死（0 表示不提升）
+    LLM_REQUEST_PRIORITIES = {"review": 0, "revision": 1, "draft": 2}
+    LLM_PRIORITY_AGING_SECONDS = 10.0
+    # 批量任务（batch_runner）：同时在跑的任务行数；LLM 并发仍由全局自适应限制器统一约束
+    BATCH_MAX_PARALLEL_JOBS = 4
+    # 结构化追踪：节点 / 单篇 / LLM 调用的 span 按运行写入 TRACE_DIR/<运行编号>.jsonl（OTLP/JSON 字段），
+    # 用 python tracing.py <运行编号> 查看关键路径与各阶段分位数
+    TRACE_ENABLED = True
+    TRACE_DIR = os.getenv("TRACE_DIR", ".cache/traces")
+    # trace 文件保留：最多保留的文件数 / 最长保留天数（开始新运行时清理，0 表示不限）
+    TRACE_MAX_FILES = 200
+    TRACE_MAX_AGE_DAYS = 7
+    # span 先攒在内存里，节点结束 / 运行结束 / 攒够这么多条时才写盘
+    TRACE_BUFFER_SPANS = 256
+    # Excel 产出目录（压测时可指向临时目录）
+    OUTPUT_DIR = os.getenv("OUTPUT_DIR", "04-产出仓库")
     SCENE_RAG_TOP_K = 3
     SCENE_RAG_MIN_SCORE = 0.15
     SCENE_RAG_DEFAULT_SCENE = "春节返乡"
+    # 场景检索引擎："overlap"（默认，关键词子串重合，适合当前几节的场景库）
+    # 或 "bm25"（中文字符 2/3-gram BM25，面向上千节的大场景库；有 numpy/scipy 时走稀疏矩阵）
+    SCENE_RAG_ENGINE = os.getenv("SCENE_RAG_ENGINE", "overlap")
     
     # ------------------
     # 业务规则配置
@@ -57,24 +141,30 @@ class Config:
     # ------------------
     # 单例缓存 (IO 缓存体系)
     # ------------------
-    _material_cache = {}
+    # 参考材料缓存：按条目数 / 总字符数 LRU 淘汰；mtime 变化后重读并比对内容哈希；
+    # 找不到的文件在 MATERIAL_NEGATIVE_TTL_SECONDS 秒内不再重试
+    MATERIAL_CACHE_MAX_ENTRIES = 128
+    MATERIAL_CACHE_MAX_CHARS = 4_000_000
+    MATERIAL_NEGATIVE_TTL_SECONDS = 30.0
 
     @classmethod
     def load_material(cls, file_path: str) -> str:
         """
-        加载参考材料，带内存字典缓存
-        [架构防御点 2]: 拦截底层并发重复 IO 读取
+        加载参考材料，带有界缓存（material_cache.MaterialCache）
+        [架构防御点 2]: 拦截底层并发重复 IO 读取；文件修改后自动失效
         """
-        if file_path in cls._material_cache:
-            return cls._material_cache[file_path]
-            
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                cls._material_cache[file_path] = content
-                return content
-        except FileNotFoundError:
-            return f"材料文件未找到：{file_path}"
+        from material_cache import get_material_cache
+
+        content = get_material_cache().get(file_path)
+        return content if content is not None else f"材料文件未找到：{file_path}"
+
+    @classmethod
+    async def aload_material(cls, file_path: str) -> str:
+        """load_material 的异步版本：未命中时的读文件不阻塞事件循环"""
+        from material_cache import get_material_cache
+
+        content = await get_material_cache().aget(file_path)
+        return content if content is not None else f"材料文件未找到：{file_path}"
 
 # 实例化全局配置实例，供各个 Agent 直接调取
 config = Config()
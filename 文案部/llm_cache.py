@@ -0,0 +1,242 @@
+"""
+LLM 响应持久化缓存（内容寻址）
+
+key = sha256(model, prompt, temperature, max_tokens)，值为模型返回的正文。
+落盘到 SQLite（跨进程 / Streamlit rerun 复用），带 TTL、条目上限（LRU 淘汰）
+和命中统计；前面再挂一层小的内存 LRU，热点命中在微秒级返回。
+
+写入只做一次插入：条目数在内存里增量维护，过期清扫按 LLM_CACHE_SWEEP_SECONDS
+定期做一次（走 created_at 索引）。异步路径用 aget / aset，读写库放到线程池，
+不阻塞事件循环。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from config import config
+
+
+class LLMResponseCache:
+    """SQLite 持久化 + 内存热点层的 LLM 响应缓存"""
+
+    def __init__(
+        self,
+        path: str = config.LLM_CACHE_PATH,
+        ttl_seconds: float = config.LLM_CACHE_TTL_SECONDS,
+        max_entries: int = config.LLM_CACHE_MAX_ENTRIES,
+        memory_entries: int = config.LLM_CACHE_MEMORY_ENTRIES,
+        sweep_seconds: float = config.LLM_CACHE_SWEEP_SECONDS,
+    ):
+        self.path = path
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_entries = max(1, int(max_entries))
+        self.memory_entries = max(0, int(memory_entries))
+        self.sweep_seconds = max(0.0, float(sweep_seconds))
+        self._lock = threading.Lock()
+        # key -> (value, created_at)
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        # 内存层命中不写库，访问时间先攒着，写入 / 淘汰前再刷回
+        self._pending_touches: Dict[str, float] = {}
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "memory_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "writes": 0,
+        }
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_cache_created_at ON llm_cache(created_at)"
+        )
+        # 库内条目数（增量维护，每次过期清扫时按库里的实际值校正）
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        self._next_sweep = 0.0
+
+    @staticmethod
+    def make_key(model: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        raw = json.dumps(
+            [model, prompt, round(float(temperature), 4), int(max_tokens)],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, value: str, created_at: float) -> None:
+        if self.memory_entries == 0:
+            return
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _memory_get(self, key: str, now: float) -> Optional[str]:
+        cached = self._memory.get(key)
+        if cached is None:
+            return None
+        value, created_at = cached
+        if self._expired(created_at, now):
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        self._pending_touches[key] = now
+        self.stats["hits"] += 1
+        self.stats["memory_hits"] += 1
+        return value
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            value = self._memory_get(key, now)
+            if value is not None:
+                return value
+
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            value, created_at = row
+            if self._expired(created_at, now):
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._count -= 1
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._remember(key, value, created_at)
+            self.stats["hits"] += 1
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._flush_touches()
+            exists = self._conn.execute("SELECT 1 FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_access)"
+                " VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if exists is None:
+                self._count += 1
+            self._remember(key, value, now)
+            self.stats["writes"] += 1
+            if now >= self._next_sweep:
+                self._sweep(now)
+            self._evict()
+
+    async def aget(self, key: str) -> Optional[str]:
+        """异步读取：内存层命中在事件循环里直接返回，查库放到线程池"""
+        with self._lock:
+            value = self._memory_get(key, time.time())
+        if value is not None:
+            return value
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: str) -> None:
+        """异步写入：写库（及顺带的清扫 / 淘汰）放到线程池"""
+        await asyncio.to_thread(self.set, key, value)
+
+    def _flush_touches(self) -> None:
+        if not self._pending_touches:
+            return
+        self._conn.executemany(
+            "UPDATE llm_cache SET last_access = ? WHERE key = ?",
+            [(ts, key) for key, ts in self._pending_touches.items()],
+        )
+        self._pending_touches.clear()
+
+    def _sweep(self, now: float) -> None:
+        """清掉过期条目，并把条目数校正为库里的实际值（别的进程也可能写过同一个库）"""
+        self._next_sweep = now + self.sweep_seconds
+        if self.ttl_seconds > 0:
+            expired = self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+            self.stats["expired"] += max(expired, 0)
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+
+    def _evict(self) -> None:
+        overflow = self._count - self.max_entries
+        if overflow <= 0:
+            return
+        victims = [
+            key for (key,) in self._conn.execute(
+                "SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?", (overflow,)
+            )
+        ]
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", [(k,) for k in victims])
+        self._count -= len(victims)
+        for key in victims:
+            self._memory.pop(key, None)
+        self.stats["evictions"] += len(victims)
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            return count
+
+    def snapshot(self) -> Dict[str, float]:
+        """命中统计快照（写入运行元数据 / 打印用）"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        result = dict(self.stats)
+        result["hit_rate"] = round(self.stats["hits"] / lookups, 4) if lookups else 0.0
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._count = 0
+            self._memory.clear()
+            self._pending_touches.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_touches()
+            self._conn.close()
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_configured = False
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """获取进程级缓存；Config.LLM_CACHE_ENABLED 关闭时返回 None"""
+    global _cache, _cache_configured
+    if not _cache_configured:
+        _cache = LLMResponseCache() if config.LLM_CACHE_ENABLED else None
+        _cache_configured = True
+    return _cache
+
+
+def set_llm_cache(cache: Optional[LLMResponseCache]) -> None:
+    """替换进程级缓存（传 None 表示禁用，测试 / 基准脚本用）"""
+    global _cache, _cache_configured
+    _cache = cache
+    _cache_configured = True
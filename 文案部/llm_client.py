@@ -0,0 +1,104 @@
+"""
+进程级共享 LLM HTTP 客户端
+
+所有节点（Writer / 审核者 / 修改）共用同一个 aiohttp 连接池：
+keep-alive 长连接 + 每主机连接上限，避免每次请求都重新做 TCP+TLS 握手。
+"""
+
+import asyncio
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+
+from config import config
+
+if TYPE_CHECKING:
+    import aiohttp
+
+
+class LLMClient:
+    """持有单个 aiohttp.ClientSession 的连接池客户端。
+
+    Session 与创建它的事件循环绑定；如果在新的事件循环中被调用，
+    会丢弃旧 session 并重建（旧 loop 上的连接无法跨 loop 复用）。
+    """
+
+    def __init__(
+        self,
+        limit: int = config.LLM_POOL_LIMIT,
+        limit_per_host: int = config.LLM_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = config.LLM_KEEPALIVE_TIMEOUT,
+        session_factory: Optional[Callable[[], "aiohttp.ClientSession"]] = None,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._session_factory = session_factory or self._build_session
+        self._session = None
+        self._loop = None
+        self.stats: Dict[str, int] = {
+            "sessions_created": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+        }
+
+    def _build_session(self) -> "aiohttp.ClientSession":
+        # aiohttp 导入约 0.3s，推迟到第一次真正发请求时
+        import aiohttp
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_create)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300,
+        )
+        return aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
+
+    async def _on_connection_create(self, session, ctx, params):
+        self.stats["connections_created"] += 1
+
+    async def _on_connection_reuse(self, session, ctx, params):
+        self.stats["connections_reused"] += 1
+
+    async def session(self) -> "aiohttp.ClientSession":
+        """返回当前事件循环上的共享 session（按需懒创建）"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or getattr(self._session, "closed", False) or self._loop is not loop:
+            self._session = self._session_factory()
+            self._loop = loop
+            self.stats["sessions_created"] += 1
+        return self._session
+
+    async def close(self) -> None:
+        """关闭连接池，必须在创建 session 的同一个事件循环里调用"""
+        session, self._session = self._session, None
+        loop, self._loop = self._loop, None
+        if session is None or getattr(session, "closed", False):
+            return
+        if loop is not asyncio.get_running_loop():
+            return
+        await session.close()
+
+
+_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """获取进程级共享客户端"""
+    global _client
+    if _client is None:
+        _client = LLMClient()
+    return _client
+
+
+def set_llm_client(client: Optional[LLMClient]) -> None:
+    """替换进程级共享客户端（测试 / 基准脚本注入用）"""
+    global _client
+    _client = client
+
+
+async def close_llm_client() -> None:
+    """关闭进程级共享客户端的连接池"""
+    if _client is not None:
+        await _client.close()
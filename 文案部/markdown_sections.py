@@ -0,0 +1,144 @@
+"""
+Markdown 分节解析（Writer 素材库与场景检索共用）
+
+一遍线性扫描把 markdown 文件切成标题树：
+- 每个标题一节，记录在原文中的偏移（start 为标题行起点，body_start 为正文起点，
+  end 为下一个同级或更高级标题的起点 / 文件末尾），content[start:end] 即整节原文
+- 节内以 **子标题** 开头的行开启一个子块，其后的 - "样本" 列表项归入该子块；
+  子块与列表项同时记到所有外层节（### 样本 下的 **开场切入** 也算在 ## 一、宝妈口吻 里）
+- 代码块（``` / ~~~）里的行不当作标题、子标题或列表项
+
+同一份内容只解析一次（按内容缓存）；返回的树在调用方之间共享，只读，不要原地修改。
+偏移是 str 下标（字符偏移），可直接对原文切片。
+"""
+
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional
+
+_HEADING = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t]*$")
+_FENCES = ("```", "~~~")
+
+
+def quoted_item(line: str) -> Optional[str]:
+    """'- "样本"' 形式的列表项返回样本正文，否则返回 None"""
+    line = line.strip()
+    if line.startswith('- "') and line.endswith('"'):
+        return line[3:-1]
+    return None
+
+
+def block_label(line: str) -> Optional[str]:
+    """以 **子标题** 开头的行返回子标题，否则返回 None（'- **年龄**：…' 这类列表项不算）"""
+    line = line.strip()
+    if not line.startswith("**"):
+        return None
+    close = line.find("**", 2)
+    if close <= 2:
+        return None
+    return line[2:close].strip() or None
+
+
+@dataclass
+class MarkdownSection:
+    """标题树中的一节；level 0 表示整份文件"""
+
+    level: int
+    title: str
+    start: int
+    body_start: int
+    end: int = -1
+    children: List["MarkdownSection"] = field(default_factory=list)
+    # 本节（含下级节）内的全部列表项，按出现顺序
+    items: List[str] = field(default_factory=list)
+    # 子标题 -> 其后的列表项；同名子标题多次出现时合并
+    blocks: Dict[str, List[str]] = field(default_factory=dict)
+
+    @property
+    def heading(self) -> str:
+        """标题行原样（'## 一、宝妈口吻'），整份文件为空串"""
+        return f"{'#' * self.level} {self.title}" if self.level else ""
+
+    def walk(self) -> Iterator["MarkdownSection"]:
+        """按文件顺序遍历本节及所有下级节"""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+@dataclass
+class MarkdownDocument:
+    content: str
+    root: MarkdownSection
+    # 所有标题节，按文件顺序
+    sections: List[MarkdownSection]
+    _by_heading: Dict[str, MarkdownSection] = field(default_factory=dict, repr=False)
+
+    def find(self, heading: str) -> Optional[MarkdownSection]:
+        """按标题行查找（'## 一、宝妈口吻'）；重复标题取第一个"""
+        return self._by_heading.get(heading.strip())
+
+    def text(self, section: MarkdownSection) -> str:
+        return self.content[section.start:section.end]
+
+
+def _tokenize(content: str) -> MarkdownDocument:
+    root = MarkdownSection(level=0, title="", start=0, body_start=0)
+    sections: List[MarkdownSection] = []
+    # 当前打开的节（外层在前）及各自正在收集的子标题
+    stack = [root]
+    labels: List[Optional[str]] = [None]
+    in_fence = False
+    offset = 0
+
+    for raw in content.splitlines(keepends=True):
+        line_start, offset = offset, offset + len(raw)
+        stripped = raw.strip()
+        # 按首字符分流，普通正文行不跑正则
+        lead = stripped[:1]
+        if lead in "`~" and stripped.startswith(_FENCES):
+            in_fence = not in_fence
+            continue
+        if in_fence or not lead or lead not in '#*-':
+            continue
+
+        heading = _HEADING.match(raw.rstrip("\r\n")) if lead == "#" else None
+        if heading:
+            level = len(heading.group(1))
+            while stack[-1].level >= level:
+                stack.pop().end = line_start
+                labels.pop()
+            section = MarkdownSection(level=level, title=heading.group(2), start=line_start, body_start=offset)
+            stack[-1].children.append(section)
+            sections.append(section)
+            stack.append(section)
+            labels.append(None)
+            continue
+
+        label = block_label(stripped) if lead == "*" else None
+        if label is not None:
+            for idx, open_section in enumerate(stack):
+                labels[idx] = label
+                open_section.blocks.setdefault(label, [])
+            continue
+
+        item = quoted_item(stripped) if lead == "-" else None
+        if item is not None:
+            for open_section, current in zip(stack, labels):
+                open_section.items.append(item)
+                if current is not None:
+                    open_section.blocks[current].append(item)
+
+    for open_section in stack:
+        open_section.end = len(content)
+    by_heading: Dict[str, MarkdownSection] = {}
+    for section in sections:
+        by_heading.setdefault(section.heading, section)
+    return MarkdownDocument(content=content, root=root, sections=sections, _by_heading=by_heading)
+
+
+@lru_cache(maxsize=32)
+def parse_markdown(content: str) -> MarkdownDocument:
+    """解析 markdown 为标题树（相同内容命中缓存，返回同一棵只读的树）"""
+    return _tokenize(content)
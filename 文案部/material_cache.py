@@ -0,0 +1,185 @@
+"""
+参考材料缓存（Config.load_material 的存储）
+
+- 有界：按条目数与总字符数 LRU 淘汰，上传 / 临时路径不会永久占内存
+- 失效：每次读取先 stat，mtime / 大小变了再读文件比内容哈希，
+  长驻的 Streamlit 进程也能看到 01-输入材料/既定资料/*.md 的修改
+- 负缓存：找不到的文件只记一个“缺失”标记（不当成内容缓存，最多 max_entries 个，过期即清），
+  MATERIAL_NEGATIVE_TTL_SECONDS 内不再重试打开
+- 并发：内部结构由锁保护；异步节点用 aget，命中只 stat，未命中的读文件放到线程池
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config import config
+
+
+def _fingerprint(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _stat(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size)；文件不存在返回 None"""
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class MaterialCache:
+    """带 LRU 上限、mtime + 哈希失效和负缓存的参考材料缓存"""
+
+    def __init__(
+        self,
+        max_entries: int = config.MATERIAL_CACHE_MAX_ENTRIES,
+        max_chars: int = config.MATERIAL_CACHE_MAX_CHARS,
+        negative_ttl_seconds: float = config.MATERIAL_NEGATIVE_TTL_SECONDS,
+    ):
+        self.max_entries = max(1, int(max_entries))
+        self.max_chars = max(1, int(max_chars))
+        self.negative_ttl_seconds = float(negative_ttl_seconds)
+        self._lock = threading.Lock()
+        # path -> (content, (mtime_ns, size), sha1)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # path -> 缺失标记的过期时间（monotonic）；TTL 固定，插入顺序即过期顺序，最多 max_entries 个
+        self._missing: "OrderedDict[str, float]" = OrderedDict()
+        self._chars = 0
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "negative_hits": 0,
+            "reloads": 0,
+            "revalidations": 0,
+            "evictions": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+    def _lookup(self, path: str) -> Tuple[bool, Optional[str], Optional[Tuple[int, int]]]:
+        """只查内存 + stat：返回 (是否可直接返回, 内容, stat)"""
+        with self._lock:
+            expires = self._missing.get(path)
+            if expires is not None:
+                if time.monotonic() < expires:
+                    self.stats["negative_hits"] += 1
+                    return True, None, None
+                del self._missing[path]
+
+        stat = _stat(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and stat is not None and entry[1] == stat:
+                self._entries.move_to_end(path)
+                self.stats["hits"] += 1
+                return True, entry[0], stat
+        return False, None, stat
+
+    def _fill(self, path: str, stat: Optional[Tuple[int, int]]) -> Optional[str]:
+        """读文件并写回缓存（阻塞 IO，异步调用方放到线程池）"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+        except FileNotFoundError:
+            content = None
+        if content is not None and stat is None:
+            # stat 与 open 之间文件才出现，重新取一次，避免下次误判为已变
+            stat = _stat(path)
+
+        with self._lock:
+            self.stats["misses"] += 1
+            previous = self._entries.pop(path, None)
+            if previous is not None:
+                self._chars -= len(previous[0])
+            if content is None:
+                self._mark_missing(path)
+                return None
+
+            digest = _fingerprint(content)
+            if previous is not None:
+                # mtime 变了但内容没变（touch / 原样保存）只算一次校验，不算重新加载
+                self.stats["revalidations" if previous[2] == digest else "reloads"] += 1
+            if len(content) <= self.max_chars:
+                self._entries[path] = (content, stat, digest)
+                self._chars += len(content)
+                self._evict()
+            return content
+
+    def _mark_missing(self, path: str) -> None:
+        """记缺失标记；顺带清掉已过期的，并按 max_entries 丢弃最早的"""
+        now = time.monotonic()
+        self._missing.pop(path, None)
+        while self._missing and (next(iter(self._missing.values())) <= now or len(self._missing) >= self.max_entries):
+            self._missing.popitem(last=False)
+        self._missing[path] = now + self.negative_ttl_seconds
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or self._chars > self.max_chars):
+            _, (content, _, _) = self._entries.popitem(last=False)
+            self._chars -= len(content)
+            self.stats["evictions"] += 1
+
+    def get(self, path: str) -> Optional[str]:
+        """读取材料正文；文件不存在返回 None"""
+        ready, content, stat = self._lookup(path)
+        if ready:
+            return content
+        return self._fill(path, stat)
+
+    async def aget(self, path: str) -> Optional[str]:
+        """异步读取：命中在事件循环里直接返回，未命中的读文件放到线程池"""
+        ready, content, stat = self._lookup(path)
+        if ready:
+            return content
+        return await asyncio.to_thread(self._fill, path, stat)
+
+    # ------------------------------------------------------------------
+    # 管理
+    # ------------------------------------------------------------------
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """丢弃指定路径（None 表示全部）的缓存与缺失标记"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._missing.clear()
+                self._chars = 0
+                return
+            entry = self._entries.pop(path, None)
+            if entry is not None:
+                self._chars -= len(entry[0])
+            self._missing.pop(path, None)
+
+    def snapshot(self) -> Dict[str, float]:
+        """命中统计快照（写入运行元数据 / 打印用）"""
+        with self._lock:
+            result = dict(self.stats)
+            result["entries"] = len(self._entries)
+            result["chars"] = self._chars
+            result["missing"] = len(self._missing)
+        lookups = result["hits"] + result["misses"] + result["negative_hits"]
+        result["hit_rate"] = round((result["hits"] + result["negative_hits"]) / lookups, 4) if lookups else 0.0
+        return result
+
+
+_cache: Optional[MaterialCache] = None
+
+
+def get_material_cache() -> MaterialCache:
+    """获取进程级材料缓存（首次使用时创建）"""
+    global _cache
+    if _cache is None:
+        _cache = MaterialCache()
+    return _cache
+
+
+def set_material_cache(cache: Optional[MaterialCache]) -> None:
+    """替换进程级材料缓存（测试用；传 None 表示下次使用时重建）"""
+    global _cache
+    _cache = cache
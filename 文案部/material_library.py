@@ -0,0 +1,173 @@
+"""
+Writer 素材库索引
+
+口吻样本库 / 场景切入库 / 爆款参考库 / 细节描写库 各自只解析一次（markdown_sections 一遍扫描
+成标题树），按人设 / 场景 / 平台存成样本数组；每篇创作时的查询都是字典查找，不再重新打开文件、
+逐个 find 分节标记、逐行切分。
+文件经 material_cache 读取（每次查询只 stat 一下），内容变了才重新解析（编辑素材库后无需重启 Web UI）。
+"""
+
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from markdown_sections import MarkdownSection, parse_markdown
+from material_cache import get_material_cache
+
+MATERIAL_DIR = "02-参考学习/03-Writer材料/内容变量库"
+PERSONA_FILE = "口吻样本库.md"
+SCENE_FILE = "场景切入库.md"
+FEW_SHOT_FILE = "爆款参考库.md"
+DETAIL_FILE = "细节描写库.md"
+
+PERSONA_MARKERS = {
+    "宝妈": "## 一、宝妈口吻",
+    "孝子": "## 二、孝子口吻",
+    "小夫妻": "## 三、小夫妻口吻",
+    "职场精英": "## 四、职场精英口吻",
+}
+PERSONA_SUBSECTIONS = ("开场切入", "痛点描述", "解决方案", "情感升华")
+
+SCENE_MARKERS = {
+    "春节返乡": "## 一、春节返乡场景",
+    "周末出游": "## 二、周末出游场景",
+    "日常通勤": "## 三、日常通勤场景",
+    "亲子游玩": "## 四、亲子游玩场景",
+    "孝敬父母": "## 五、孝敬父母场景",
+}
+SCENE_SUBSECTIONS = ("时间触发", "场景描写", "情感升华")
+DEFAULT_SCENE = "春节返乡"
+
+PLATFORM_MARKERS = {
+    "小红书": "## 小红书平台样本",
+    "抖音": "## 抖音平台样本",
+    "今日头条": "## 今日头条平台样本",
+    "朋友圈": "## 朋友圈样本",
+}
+DEFAULT_PLATFORM = "小红书"
+
+
+# ============================================================================
+# 解析（每个文件只在加载 / mtime 变化时由 markdown_sections 一遍扫描成标题树）
+# ============================================================================
+
+def _marked_sections(content: str, markers: Dict[str, str]) -> Dict[str, MarkdownSection]:
+    """按标题行取节（节到下一个同级标题为止）；标记缺失的键不出现在结果里"""
+    document = parse_markdown(content)
+    sections = {key: document.find(marker) for key, marker in markers.items()}
+    return {key: section for key, section in sections.items() if section is not None}
+
+
+def _pick_blocks(section: MarkdownSection, subsections: Tuple[str, ...]) -> Dict[str, List[str]]:
+    return {name: list(section.blocks.get(name, ())) for name in subsections}
+
+
+def parse_quoted_items(text: str) -> List[str]:
+    return list(parse_markdown(text).root.items)
+
+
+def parse_subsections(text: str, subsections: Tuple[str, ...]) -> Dict[str, List[str]]:
+    """按 **小节名** 归类其后的列表项"""
+    return _pick_blocks(parse_markdown(text).root, subsections)
+
+
+def parse_persona_library(content: str) -> Dict[str, Dict[str, List[str]]]:
+    sections = _marked_sections(content, PERSONA_MARKERS)
+    return {persona: _pick_blocks(section, PERSONA_SUBSECTIONS) for persona, section in sections.items()}
+
+
+def parse_scene_library(content: str) -> Dict[str, Dict[str, List[str]]]:
+    sections = _marked_sections(content, SCENE_MARKERS)
+    return {scene: _pick_blocks(section, SCENE_SUBSECTIONS) for scene, section in sections.items()}
+
+
+def parse_few_shot_library(content: str) -> Dict[str, List[str]]:
+    sections = _marked_sections(content, PLATFORM_MARKERS)
+    return {platform: list(section.items) for platform, section in sections.items()}
+
+
+# ============================================================================
+# 素材库
+# ============================================================================
+
+class MaterialLibrary:
+    """
+    解析后的 Writer 素材库（线程安全：Web UI 线程与后台事件循环共用一个实例）
+
+    文件内容统一经 material_cache（Config.load_material 的同一份缓存）读取：上限、失效与命中统计
+    都归它管，这里只按内容缓存解析结果，内容变了才重新解析。
+    返回的样本数组是共享的，调用方只读（random.sample 等），不要原地修改。
+    """
+
+    def __init__(self, root: str = MATERIAL_DIR):
+        self.root = root
+        # path -> (解析时的文件内容, 解析结果)；文件缺失时内容为 None
+        self._entries: Dict[str, Tuple[Optional[str], object]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"parses": 0, "lookups": 0}
+
+    def _resolve(self, name: str) -> str:
+        return name if os.path.isabs(name) or os.path.dirname(name) else os.path.join(self.root, name)
+
+    def _load(self, name: str, parser: Callable[[str], object], label: str):
+        path = self._resolve(name)
+        # 命中时 material_cache 返回同一个 str 对象，比较只是身份判断
+        content = get_material_cache().get(path)
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == content:
+            return entry[1]
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == content:
+                return entry[1]
+            if content is None:
+                print(f"警告：找不到{label}文件 {path}")
+                parsed = parser("")
+            else:
+                parsed = parser(content)
+                self.stats["parses"] += 1
+            self._entries[path] = (content, parsed)
+            return parsed
+
+    def persona_samples(self, persona: str) -> Dict[str, List[str]]:
+        """指定人设的口吻样本：开场切入 / 痛点描述 / 解决方案 / 情感升华（未知人设为空）"""
+        self.stats["lookups"] += 1
+        library = self._load(PERSONA_FILE, parse_persona_library, "口吻样本库")
+        return library.get(persona) or {name: [] for name in PERSONA_SUBSECTIONS}
+
+    def scene_samples(self, scene_type: str) -> Dict[str, List[str]]:
+        """指定场景的切入样本：时间触发 / 场景描写 / 情感升华（未知场景回退春节返乡）"""
+        self.stats["lookups"] += 1
+        library = self._load(SCENE_FILE, parse_scene_library, "场景切入库")
+        samples = library.get(scene_type) if scene_type in SCENE_MARKERS else library.get(DEFAULT_SCENE)
+        return samples or {name: [] for name in SCENE_SUBSECTIONS}
+
+    def few_shot_samples(self, platform: str) -> List[str]:
+        """指定平台的爆款样本（未知平台回退小红书）"""
+        self.stats["lookups"] += 1
+        library = self._load(FEW_SHOT_FILE, parse_few_shot_library, "爆款参考库")
+        key = platform if platform in PLATFORM_MARKERS else DEFAULT_PLATFORM
+        return library.get(key, [])
+
+    def details(self, name: str = DETAIL_FILE) -> List[str]:
+        """细节描写库的全部列表项"""
+        self.stats["lookups"] += 1
+        return self._load(name, parse_quoted_items, "细节库")
+
+
+_library: Optional[MaterialLibrary] = None
+
+
+def get_material_library() -> MaterialLibrary:
+    """获取进程级素材库（首次查询时才解析文件）"""
+    global _library
+    if _library is None:
+        _library = MaterialLibrary()
+    return _library
+
+
+def set_material_library(library: Optional[MaterialLibrary]) -> None:
+    """替换进程级素材库（测试 / 基准脚本用；传 None 表示下次使用时重建）"""
+    global _library
+    _library = library
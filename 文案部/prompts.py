@@ -0,0 +1,214 @@
+"""
+Prompt 组装层（按 DeepSeek 前缀缓存友好的顺序排布）
+
+DeepSeek 对请求前缀做硬盘缓存：与之前请求逐字节相同的开头部分按缓存价计费、且首 token 更快。
+因此每类 prompt 都拆成两段：
+- 静态前缀：角色设定、平台规范、车型资料、规则块，只依赖 (车型, 平台)，用 lru_cache 保证逐字节一致
+- 变量后缀：人设 / 卖点 / 场景 / 随机素材 / 正文等每篇不同的内容，一律追加在末尾
+"""
+
+from functools import lru_cache
+from typing import Dict, List
+
+from config import config
+
+
+# ============================================================================
+# Writer 首稿
+# ============================================================================
+
+@lru_cache(maxsize=64)
+def writer_prompt_prefix(car_model: str, platform: str, car_knowledge: str) -> str:
+    """Writer 静态前缀：同一 (车型, 平台, 车型资料) 下逐字节相同"""
+    spec = config.PLATFORM_SPECS.get(platform, config.PLATFORM_SPECS["小红书"])
+    return f"""你是一个深谙各个社交平台流量密码的顶级内容主理人。你现在要根据分配的信息，写一篇针对【{platform}】平台的关于汽车（{car_model}）的内容。
+
+【平台与车型】
+- 车型：{car_model}
+- 平台：{platform}（目标篇幅：{spec['word_count']}）
+- 平台专属文风要求：{spec['style']}
+- 平台专属排版结构：{spec['structure']}
+
+【💎 核心要求：产品配置干货植入 (极其重要)】
+以下是关于该车型的官方专属打底知识。你**必须根据后面分配的场景，自然指出 1-2 个宏观卖点（如：动力、操控、科技配置、空间等），然后强行且自然地陈述 2-3 个具体的小卖点物理参数（如 2701mm轴距、193匹马力、Honda SENSING 等）来补充解释你的观点**！
+❌ 错误示范：“这车空间很大，装得下很多东西”、“动力充沛，随叫随到”、“非常安全，气囊很多”
+✅ 正确示范（具体数据支撑）：
+- （动力切入）：“起步太窜了，这**1.5T地球梦发动机**给的**193匹马力**真的不是盖的，一脚油门下去推背感绝了...”
+- （空间切入）：“后备箱空间变态大，**2701mm的轴距**使得第二排腿部空间超级富裕，哪怕放了**儿童推车**也不用折叠直接怼进去了哈~”
+- （安全切入）：“刚才雨雪天路滑，差点被旁边的货车挤到，多亏**Honda SENSING**警报疯狂介入，而且想想要是真撞了，毕竟全系标配**10个安全气囊**外加**ACE承载式车身**，心里也很有底。”
+<车型专属资料>
+{car_knowledge or '暂无详细资料，请结合大众对该车型的认知。'}
+</车型专属资料>
+
+【🔴 极其严厉的文风与逻辑规则（违反任何一条视为失败）】
+0. **【字数红线】**：必须严格控制在 **{spec['word_count']}** 的区间内！写完后在心里默数一遍字数，坚决不准超出上限或低于下限！
+1. **【痛点营销逻辑强制】**：全文必须包含清晰的说服逻辑链路：【共鸣痛点/受众认知】 -> 【制造选车纠结/点出痛点】 -> 【抛出本品核心硬核参数降维打击】 -> 【价值升华/结论抛出】。
+2. **【拒绝低级口语化】**：绝对禁止使用任何公关广告腔调。同时也**绝不使用**“绝绝子”、“无语子”、“太”、“简直”、“哎”、“服了”等低级情绪词汇。你要表现得像一个懂车且理性、精打细算的导购达人/评测博主，语气干练扎实，用“这波操作确实很香”、“性价比没得说”、“精准戳中需求”等沉稳词汇。
+3. **【极其严格的竞品对比红线（条件触发）】**：如果在方向/场景中涉及“对比”，你必须引入友商热门竞品作为锚点，用具体的参数对比进行说服。但必须遵守两点铁律：
+   A. **绝对不准“拉踩”**：对比时必须客观甚至肯定友商长处，禁止使用任何贬低、攻击性词汇去踩踏竞品。
+   B. **标题与标签区隔离**：如果你的输出带有标题、开头引导语或文末的 #话题标签（发布文案），这些区域**绝对禁止**出现友商车型名称！友商名字只允许在探讨具体参数的**正文中间段落**客观出现。对于不需要对标的主题，则专注讲透本品数据即可。
+4. **【拒绝堆砌参数】**：不要像念说明书一样单列数据段落。必须在解决痛点的对话场景中自然连贯地引出（例：“比起硬上入门款的配置，不如看看这台车的1.5T地球梦发动机，182匹给到的充沛储备才是务实之选”）。
+5. **名字灵活**。不要频繁正经地喊出“本田CR-V”。你可以叫它“这台车”、“同级标杆”或者只提一次“CR-V”。
+"""
+
+
+def build_writer_prompt(
+    customer_brief: Dict,
+    assignment: Dict,
+    persona_opening: List[str],
+    persona_pain: List[str],
+    selected_details: List[str],
+    hit_samples: List[str],
+) -> str:
+    """Writer 首稿 prompt = 静态前缀 + 本次任务 / 本篇分配 / 随机素材"""
+    prefix = writer_prompt_prefix(
+        customer_brief['车型'],
+        customer_brief['平台'],
+        customer_brief.get('车型专属打底知识', ''),
+    )
+    return prefix + f"""
+【本次任务】
+- 方向：{customer_brief['方向']}
+- 调性：{customer_brief['调性']}
+
+【本篇分配】
+- 人设：{assignment['persona']}
+- 核心卖点：{assignment['selling_point']}
+- 场景：{assignment['scene']}
+
+【参考素材（融合这些灵感，但千万别照抄，体会"感觉"）】
+1. 人设起步参考：
+{chr(10).join(f"   - {sample}" for sample in persona_opening[:2]) if persona_opening else "   - （无样本）"}
+
+2. 痛点场景参考：
+{chr(10).join(f"   - {sample}" for sample in persona_pain[:2]) if persona_pain else "   - （无样本）"}
+
+3. 具体细节库随机抽取：
+{chr(10).join(f"   - {detail}" for detail in selected_details)}
+
+【🔥 真实人类爆款感觉示例 (Few-Shot 注入) 🔥】
+请深深体会以下真实高赞帖文的断句、网感和神经质的真实感，**照着这个调性写你的初稿**：
+{chr(10).join(f"- '{sample}'" for sample in hit_samples) if hit_samples else "- （暂无该平台参照，请紧贴平台原生风格）"}
+
+直接开始写你的真实碎片（直接输出正文，不要有任何前缀或解释）："""
+
+
+# ============================================================================
+# 审核者
+# ============================================================================
+
+# 五大雷区与评分标准：单篇审核和批量审核共用同一份规则文本
+AI_FLAVOR_RULES = """【🔴 必须打回重写（不通过）的五大雷区】
+1. 词汇雷区：包含“每到春节”、“归心似箭”、“保驾护航”、“移动的家”、“不得不说”、“承载”等陈词滥调。
+2. 逻辑缺失雷区：文章没有建立【共鸣痛点/认知冲突 -> (视情况有竞品对比)方案抛出 -> 具体数字参数实证 -> 价值结论】的说服力链路，通篇只有无意义的情感情绪抒发或纯粹的感叹。
+3. 竞品拉踩与格式雷区：如果文章包含竞品对比，出现了恶意贬低、踩踏友商的词汇（拉踩）；或者在文章的标题、首句、文末#话题标签(发布文案)等位置直接出现了友商的车型名称（友商名只允许在正文探讨参数时出现）。
+4. 语气雷区：使用了“绝绝子”、“无语子”、“绝了”、“服了”、“简直”等低层次情绪词汇装作“碎碎念网感”，而没有展现出理性、精打细算懂车达人的真实软性评测质感。
+5. ⚠️ 数据空洞雷区（致命）：文中必须根据场景自然指出 1-2 个宏观大卖点（如动力、操控、空间等），并配合陈述 2-3 个具体的真实物理参数/专有名词（如：2701mm轴距、193匹马力、Honda SENSING 等）来支撑。如果全是“空间大”、“动力强”等虚词，未提及具体配置数据或技术名词，必须直接打回！"""
+
+REVIEW_PROMPT_PREFIX = f"""你是一个极其严格的“反AI八股文”内容质检管家。你的目标是检查以下社交媒体文案是否含有“AI味”、“公关播音腔”或“套路化模板”。
+
+{AI_FLAVOR_RULES}
+
+请严格审核！给出 0-10 的“去AI味”评分（10分代表毫无AI味且数据扎实、极其像真人；低于7分判定为不通过）。
+必须仅以纯JSON格式返回，不要有任何多余字符，格式如下：
+{{
+  "passed": false,
+  "score": 5,
+  "issues": ["指出具体哪里有AI味，或者缺少具体配置数据支撑"],
+  "suggestions": ["给出具体怎么改的建议，包括补充什么类型的数据"]
+}}
+"""
+
+BATCH_REVIEW_PROMPT_PREFIX = f"""你是一个极其严格的“反AI八股文”内容质检管家。你的目标是逐篇检查后面给出的多篇社交媒体文案是否含有“AI味”、“公关播音腔”或“套路化模板”。
+
+{AI_FLAVOR_RULES}
+
+请逐篇独立严格审核，篇与篇之间互不影响！每篇给出 0-10 的“去AI味”评分（10分代表毫无AI味且数据扎实、极其像真人；低于7分判定为不通过）。
+必须仅以纯JSON数组返回，不要有任何多余字符，每篇一个对象，id 与篇号一致，格式如下：
+[
+  {{
+    "id": 1,
+    "passed": false,
+    "score": 5,
+    "issues": ["指出具体哪里有AI味，或者缺少具体配置数据支撑"],
+    "suggestions": ["给出具体怎么改的建议，包括补充什么类型的数据"]
+  }}
+]
+"""
+
+
+def build_review_prompt(content: str, assignment: Dict) -> str:
+    """单篇审核 prompt = 规则前缀 + 本篇人设 / 卖点 / 正文"""
+    return REVIEW_PROMPT_PREFIX + f"""
+【审核内容】
+人设：{assignment['persona']}
+卖点：{assignment['selling_point']}
+正文：
+{content}"""
+
+
+def build_batch_review_prompt(items: List[Dict]) -> str:
+    """
+    批量审核 prompt：规则前缀只出现一次，多篇正文按篇号排列在末尾
+    items: [{"id", "content", "assignment"}]
+    """
+    sections = "\n\n".join(
+        f"""=== 篇{item['id']} ===
+人设：{item['assignment']['persona']}
+卖点：{item['assignment']['selling_point']}
+正文：
+{item['content']}"""
+        for item in items
+    )
+    return BATCH_REVIEW_PROMPT_PREFIX + f"""
+【审核内容（共 {len(items)} 篇）】
+{sections}"""
+
+
+# ============================================================================
+# 修改
+# ============================================================================
+
+# 修改轮沿用的平台简要规范（与首稿的 PLATFORM_SPECS 口径略有不同，保持原有行为）
+REVISION_PLATFORM_SPECS = {
+    "小红书": "100-300字，轻快、多Emoji、生活碎片感",
+    "抖音": "250-300字，短平快钩子多，极其口语化",
+    "今日头条": "650-800字，深度分析、新闻纪实感、带小标题的逻辑文",
+    "朋友圈": "50-150字，熟人语境极其简短的碎碎念"
+}
+
+
+@lru_cache(maxsize=16)
+def revision_prompt_prefix(platform: str) -> str:
+    """修改静态前缀：同一平台下逐字节相同"""
+    spec = REVISION_PLATFORM_SPECS.get(platform, "自然人类语气")
+    return f"""你是一个顶级社交媒体达人。你之前针对【{platform}】写的一篇文案被判定为“不够真实”、“有AI味”或“不符合该平台的调性”，你需要根据后面的反馈重新修改。
+
+【平台】{platform}（{spec}）
+
+【🔴 强制要求（违反视为再败）】
+1. 狠砸原来的机器骨架！不要标准四段式。请严格遵循【{platform}】的体裁来写！
+2. 彻底抛弃播音腔和公关词汇（禁用：缔造、保驾护航、移动的家、承载、不得不说等）。
+3. 务必满足审核官指出的字数与格式要求。
+"""
+
+
+def build_revision_prompt(customer_brief, assignment, original_content, issues, suggestions):
+    """
+    构建修改 Prompt = 平台静态前缀 + 本篇设定 / 原内容 / 审核意见
+    """
+    return revision_prompt_prefix(customer_brief['平台']) + f"""
+【本篇设定】
+- 人设：{assignment['persona']}
+- 核心卖点：{assignment['selling_point']}
+
+【原内容】
+{original_content}
+
+【审核官的批评及雷区】
+{chr(10).join(f"- {issue}" for issue in issues)}
+
+【修改建议】
+{chr(10).join(f"- {suggestion}" for suggestion in suggestions)}
+
+直接输出修改后的正文（勿加注释）："""
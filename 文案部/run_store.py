@@ -0,0 +1,285 @@
+"""
+运行记录与断点续跑
+
+- 节点级：create_swarm(checkpointer) 编译时挂 LangGraph 检查点，thread_id 即运行编号（run_id），
+  中断后 ainvoke(None, {"configurable": {"thread_id": run_id}}) 从最后一个完成的节点继续。
+  装了 langgraph-checkpoint-sqlite 时检查点落盘到 Config.CHECKPOINT_PATH（跨进程可续）；
+  没装时退回进程内 InMemorySaver（只覆盖 Streamlit rerun 这类同进程中断）：运行完成即释放其检查点，
+  中断未续的运行最多保留 Config.CHECKPOINT_MEMORY_MAX_THREADS 个，常驻进程内存不随运行次数增长。
+- 篇目级：RunStore 的 article_journal 表按 (run_id, 阶段, 轮次, 篇号) 记下每篇已完成的产出，
+  节点重放时已完成的篇目直接取回，不再重复调用 LLM；运行标记为 finished 时清掉该运行的日志。
+- runs 表登记每次运行的输入、状态、最后完成的节点，供 CLI / Web UI 列出和续跑；
+  完成时存一份最终状态快照，载入已完成运行的结果不经过检查点（进程内检查点完成即释放）。
+- batch_jobs 表记录批量任务（batch_runner）每一行的运行编号与结果摘要，重跑时跳过已完成的行。
+"""
+
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from config import config
+
+
+class RunStore:
+    """SQLite 持久化的运行登记表 + 篇目日志"""
+
+    def __init__(self, path: str = config.RUN_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id TEXT PRIMARY KEY,"
+            " user_input TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " last_node TEXT NOT NULL DEFAULT '',"
+            " final_output TEXT NOT NULL DEFAULT '',"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " final_state TEXT NOT NULL DEFAULT '')"
+        )
+        # 旧库补列：已完成运行的最终状态快照（续跑已完成的运行直接从这里载入，不依赖检查点）
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(runs)")}
+        if "final_state" not in columns:
+            self._conn.execute("ALTER TABLE runs ADD COLUMN final_state TEXT NOT NULL DEFAULT ''")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS article_journal ("
+            " run_id TEXT NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " attempt INTEGER NOT NULL,"
+            " article_id INTEGER NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (run_id, stage, attempt, article_id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS batch_jobs ("
+            " batch_id TEXT NOT NULL,"
+            " job_id TEXT NOT NULL,"
+            " run_id TEXT NOT NULL DEFAULT '',"
+            " status TEXT NOT NULL,"
+            " summary TEXT NOT NULL DEFAULT '{}',"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (batch_id, job_id))"
+        )
+
+    # ------------------------------------------------------------------
+    # 运行登记
+    # ------------------------------------------------------------------
+    def start_run(self, run_id: str, user_input: Dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO runs (run_id, user_input, status, created_at, updated_at)"
+                " VALUES (?, ?, 'running', ?, ?)",
+                (run_id, json.dumps(user_input, ensure_ascii=False, default=str), now, now),
+            )
+
+    def record_node(self, run_id: str, node: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET last_node = ?, status = 'running', updated_at = ? WHERE run_id = ?",
+                (node, time.time(), run_id),
+            )
+
+    def set_status(self, run_id: str, status: str, final_output: str = "", final_state: Optional[Dict] = None) -> None:
+        """
+        更新运行状态；finished 时可带上最终状态快照（之后载入结果不再需要检查点），
+        最终产出已落定，篇目日志不再需要，一并清掉
+        """
+        snapshot = json.dumps(final_state, ensure_ascii=False, default=str) if final_state is not None else ""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, final_output = COALESCE(NULLIF(?, ''), final_output),"
+                " final_state = COALESCE(NULLIF(?, ''), final_state), updated_at = ?"
+                " WHERE run_id = ?",
+                (status, final_output, snapshot, time.time(), run_id),
+            )
+        if status == "finished":
+            self.clear_articles(run_id)
+
+    @staticmethod
+    def _row_to_run(row) -> Dict:
+        run_id, user_input, status, last_node, final_output, created_at, updated_at = row
+        return {
+            "run_id": run_id,
+            "user_input": json.loads(user_input),
+            "status": status,
+            "last_node": last_node,
+            "final_output": final_output,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+    def get_run(self, run_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id, user_input, status, last_node, final_output, created_at, updated_at"
+                " FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+        return self._row_to_run(row) if row else None
+
+    def load_final_state(self, run_id: str) -> Optional[Dict]:
+        """已完成运行的最终状态快照；未完成或没有快照时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT final_state FROM runs WHERE run_id = ? AND status = 'finished'", (run_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def list_runs(self, limit: int = 20) -> List[Dict]:
+        """最近的运行（新的在前）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_id, user_input, status, last_node, final_output, created_at, updated_at"
+                " FROM runs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._row_to_run(row) for row in rows]
+
+    # ------------------------------------------------------------------
+    # 篇目日志
+    # ------------------------------------------------------------------
+    def save_article(self, run_id: str, stage: str, attempt: int, article_id: int, payload: Dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO article_journal (run_id, stage, attempt, article_id, payload, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, stage, attempt, article_id, json.dumps(payload, ensure_ascii=False), time.time()),
+            )
+
+    def load_article(self, run_id: str, stage: str, attempt: int, article_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM article_journal WHERE run_id = ? AND stage = ? AND attempt = ? AND article_id = ?",
+                (run_id, stage, attempt, article_id),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def clear_articles(self, run_id: str) -> int:
+        """删除运行的全部篇目日志，返回删除的行数"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM article_journal WHERE run_id = ?", (run_id,))
+        return cursor.rowcount
+
+    def count_articles(self, run_id: str) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM article_journal WHERE run_id = ?", (run_id,)
+            ).fetchone()
+        return count
+
+    # ------------------------------------------------------------------
+    # 批量任务进度
+    # ------------------------------------------------------------------
+    def save_batch_job(self, batch_id: str, job_id: str, run_id: str, status: str, summary: Optional[Dict] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO batch_jobs (batch_id, job_id, run_id, status, summary, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (batch_id, job_id, run_id, status,
+                 json.dumps(summary or {}, ensure_ascii=False, default=str), time.time()),
+            )
+
+    def load_batch_jobs(self, batch_id: str) -> Dict[str, Dict]:
+        """{job_id: {run_id, status, summary}}"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, run_id, status, summary FROM batch_jobs WHERE batch_id = ?", (batch_id,)
+            ).fetchall()
+        return {
+            job_id: {"run_id": run_id, "status": status, "summary": json.loads(summary)}
+            for job_id, run_id, status, summary in rows
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def new_run_id() -> str:
+    """运行编号：时间戳 + 随机后缀，同时作为检查点的 thread_id"""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+
+_store: Optional[RunStore] = None
+_store_configured = False
+
+
+def get_run_store() -> Optional[RunStore]:
+    """获取进程级运行登记表；Config.CHECKPOINT_ENABLED 关闭时返回 None"""
+    global _store, _store_configured
+    if not _store_configured:
+        _store = RunStore() if config.CHECKPOINT_ENABLED else None
+        _store_configured = True
+    return _store
+
+
+def set_run_store(store: Optional[RunStore]) -> None:
+    """替换进程级运行登记表（传 None 表示禁用，测试 / 基准脚本用）"""
+    global _store, _store_configured
+    _store = store
+    _store_configured = True
+
+
+_memory_checkpointer = None
+# 正在使用进程内检查点的运行（并发的批量任务 / Web UI 运行），淘汰时跳过
+_active_runs: Set[str] = set()
+
+
+def _prune_memory_threads(saver, keep: int) -> None:
+    """不在运行中的进程内检查点只保留最近的 keep 个（storage 按首次写入顺序排列）"""
+    idle = [thread_id for thread_id in list(saver.storage) if thread_id not in _active_runs]
+    for thread_id in idle[: max(0, len(idle) - keep)]:
+        saver.delete_thread(thread_id)
+
+
+def release_checkpoint(checkpointer, run_id: str) -> None:
+    """运行完成后释放进程内检查点；落盘的检查点保留（跨进程仍可查看最终状态）"""
+    if checkpointer is not None and checkpointer is _memory_checkpointer:
+        checkpointer.delete_thread(run_id)
+
+
+@contextlib.asynccontextmanager
+async def open_checkpointer(run_id: Optional[str] = None) -> AsyncIterator[Optional[object]]:
+    """
+    打开 LangGraph 检查点存储（需在运行所用的事件循环内进入）
+
+    优先用 langgraph-checkpoint-sqlite 落盘；未安装时退回进程级 InMemorySaver：
+    run_id 在退出前登记为运行中，进入时只淘汰最早的非运行中检查点（并发运行再多也不会丢检查点）；
+    Config.CHECKPOINT_ENABLED 关闭时产出 None（不挂检查点）。
+    """
+    global _memory_checkpointer
+    if not config.CHECKPOINT_ENABLED:
+        yield None
+        return
+    try:
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    except ImportError:
+        if _memory_checkpointer is None:
+            from langgraph.checkpoint.memory import InMemorySaver
+
+            print("[检查点] 未安装 langgraph-checkpoint-sqlite，检查点仅保存在当前进程内")
+            _memory_checkpointer = InMemorySaver()
+        if run_id:
+            _active_runs.add(run_id)
+        try:
+            _prune_memory_threads(_memory_checkpointer, config.CHECKPOINT_MEMORY_MAX_THREADS)
+            yield _memory_checkpointer
+        finally:
+            if run_id:
+                _active_runs.discard(run_id)
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(config.CHECKPOINT_PATH)), exist_ok=True)
+    async with AsyncSqliteSaver.from_conn_string(config.CHECKPOINT_PATH) as saver:
+        yield saver
@@ -1,61 +1,86 @@
+import heapq
+import math
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
+from markdown_sections import parse_markdown
 
-class SceneRetriever:
-    """Lightweight local scene retriever backed by markdown scene library."""
-
-    _SCENE_MARKERS: List[Tuple[str, str]] = [
-        ("春节返乡", "## 一、春节返乡场景"),
-        ("周末出游", "## 二、周末出游场景"),
-        ("日常通勤", "## 三、日常通勤场景"),
-        ("亲子游玩", "## 四、亲子游玩场景"),
-        ("孝敬父母", "## 五、孝敬父母场景"),
-    ]
-
-    _DEFAULT_KEYWORDS: Dict[str, List[str]] = {
-        "春节返乡": ["春节", "过年", "返乡", "回家", "团圆", "年货", "春运", "归途"],
-        "周末出游": ["周末", "出游", "露营", "郊游", "自驾", "旅行", "风景"],
-        "日常通勤": ["通勤", "上班", "下班", "早高峰", "堵车", "代步", "油耗"],
-        "亲子游玩": ["亲子", "孩子", "宝宝", "后排", "玩具", "游玩", "陪伴"],
-        "孝敬父母": ["父母", "长辈", "老人", "孝敬", "接送", "舒适", "责任"],
-    }
+_TERM_PATTERN = re.compile(r"[A-Za-z0-9]+|[\u4e00-\u9fff]{2,}")
+# "## 一、春节返乡场景" / "## 12. 海边露营场景": any level-2 heading ending in 场景 opens a section,
+# which runs until the next scene heading (or the end of the file).
+_SCENE_TITLE = re.compile(r"^(?:[一二三四五六七八九十百千零\d]+\s*[、.．:：]\s*)?(?P<name>.+?)场景$")
+_CJK_RUN = re.compile(r"[\u4e00-\u9fff]+|[A-Za-z0-9]+")
 
-    def __init__(
-        self,
-        scene_library_path: str,
-        top_k: int = 3,
-        min_score: float = 0.15,
-        default_scene: str = "春节返乡",
-    ):
-        self.scene_library_path = scene_library_path
-        self.top_k = max(1, int(top_k))
-        self.min_score = float(min_score)
-        self.default_scene = default_scene
-        self._scene_sections = self._load_scene_sections()
+DEFAULT_KEYWORDS: Dict[str, List[str]] = {
+    "春节返乡": ["春节", "过年", "返乡", "回家", "团圆", "年货", "春运", "归途"],
+    "周末出游": ["周末", "出游", "露营", "郊游", "自驾", "旅行", "风景"],
+    "日常通勤": ["通勤", "上班", "下班", "早高峰", "堵车", "代步", "油耗"],
+    "亲子游玩": ["亲子", "孩子", "宝宝", "后排", "玩具", "游玩", "陪伴"],
+    "孝敬父母": ["父母", "长辈", "老人", "孝敬", "接送", "舒适", "责任"],
+}
 
-    def _load_scene_sections(self) -> Dict[str, str]:
-        try:
-            with open(self.scene_library_path, "r", encoding="utf-8") as f:
-                content = f.read()
-        except Exception:
-            return {}
 
-        sections: Dict[str, str] = {}
-        for idx, (scene_name, marker) in enumerate(self._SCENE_MARKERS):
-            start = content.find(marker)
-            if start == -1:
-                continue
-            end = len(content)
-            for next_name, next_marker in self._SCENE_MARKERS[idx + 1 :]:
-                pos = content.find(next_marker, start + 1)
-                if pos != -1:
-                    end = min(end, pos)
-            sections[scene_name] = content[start:end]
-        return sections
-
-    def _extract_terms(self, text: str) -> List[str]:
-        tokens = re.findall(r"[A-Za-z0-9]+|[\u4e00-\u9fff]{2,}", text or "")
+def parse_scene_sections(content: str) -> Dict[str, str]:
+    """Split a scene library into ``{scene name: section text}`` in file order."""
+    headings = []
+    for section in parse_markdown(content).sections:
+        match = _SCENE_TITLE.match(section.title) if section.level == 2 else None
+        if match:
+            headings.append((match.group("name").strip(), section.start))
+    sections: Dict[str, str] = {}
+    for idx, (name, start) in enumerate(headings):
+        end = headings[idx + 1][1] if idx + 1 < len(headings) else len(content)
+        sections.setdefault(name, content[start:end])
+    return sections
+
+
+def char_ngrams(text: str, sizes: Sequence[int] = (2, 3)) -> List[str]:
+    """CJK character n-grams plus lower-cased ASCII words, deduplicated in first-seen order."""
+    grams: List[str] = []
+    seen = set()
+    for run in _CJK_RUN.findall(text or ""):
+        if run.isascii():
+            candidates = [run.lower()] if len(run) >= 2 else []
+        else:
+            candidates = [run[i:i + n] for n in sizes for i in range(len(run) - n + 1)]
+        for gram in candidates:
+            if gram not in seen:
+                seen.add(gram)
+                grams.append(gram)
+    return grams
+
+
+def _load_numpy():
+    """NumPy / SciPy are optional: without them BM25 scores from pure-Python postings lists."""
+    try:
+        import numpy as np
+        from scipy import sparse
+    except ImportError:
+        return None, None
+    return np, sparse
+
+
+class OverlapSceneEngine:
+    """Hand-tuned term overlap scorer for the small built-in scene library.
+
+    Scene term lists and a substring inverted index are built once; a query term
+    matches the first scene term that contains it or that it contains.
+    """
+
+    name = "overlap"
+
+    def __init__(self, sections: Dict[str, str], default_keywords: Optional[Dict[str, List[str]]] = None):
+        self.sections = sections
+        self.default_keywords = DEFAULT_KEYWORDS if default_keywords is None else default_keywords
+        self._scene_terms: Dict[str, List[str]] = {
+            scene_name: self._scene_term_set(scene_name, section_text)
+            for scene_name, section_text in sections.items()
+        }
+        self._build_index()
+
+    @staticmethod
+    def extract_terms(text: str) -> List[str]:
+        tokens = _TERM_PATTERN.findall(text or "")
         deduped = []
         seen = set()
         for token in tokens:
@@ -68,8 +93,8 @@ class SceneRetriever:
         return deduped
 
     def _scene_term_set(self, scene_name: str, section_text: str) -> List[str]:
-        terms = list(self._DEFAULT_KEYWORDS.get(scene_name, []))
-        for term in self._extract_terms(section_text):
+        terms = list(self.default_keywords.get(scene_name, []))
+        for term in self.extract_terms(section_text):
             if len(term) <= 6:
                 terms.append(term)
         deduped = []
@@ -80,39 +105,50 @@ class SceneRetriever:
                 deduped.append(term)
         return deduped
 
-    def _fallback(self, reason: str, query: str = "") -> Dict:
-        evidence = [reason]
-        if query:
-            evidence.append(f"query={query}")
-        return {
-            "scene_type": self.default_scene,
-            "keywords": [],
-            "evidence": evidence,
-            "score": 0.0,
-            "fallback_used": True,
-        }
-
-    def retrieve(self, scene_text: str) -> Dict:
-        query = (scene_text or "").strip()
-        if not query:
-            return self._fallback("empty_input")
+    def _build_index(self) -> None:
+        """
+        Index every scene term two ways, keeping the earliest position per scene
+        (a query term matches the first scene term that contains it or that it
+        contains, in scene term order):
+        - ``_term_positions``: term -> {scene: position}
+        - ``_containing_positions``: every substring of a term -> {scene: position}
+        """
+        self._term_positions: Dict[str, Dict[str, int]] = {}
+        self._containing_positions: Dict[str, Dict[str, int]] = {}
+        self._max_term_len = 0
+        for scene_name, terms in self._scene_terms.items():
+            for pos, term in enumerate(terms):
+                self._max_term_len = max(self._max_term_len, len(term))
+                self._term_positions.setdefault(term, {}).setdefault(scene_name, pos)
+                for start in range(len(term)):
+                    for end in range(start + 1, len(term) + 1):
+                        self._containing_positions.setdefault(term[start:end], {}).setdefault(scene_name, pos)
 
-        if not self._scene_sections:
-            return self._fallback("library_unavailable", query)
+    def _match_terms(self, query_terms: List[str]) -> Dict[str, List[str]]:
+        """For each scene, the first scene term matched by each query term (in query order)."""
+        matches: Dict[str, List[str]] = {scene_name: [] for scene_name in self.sections}
+        for q in query_terms:
+            # scene terms containing q
+            best = dict(self._containing_positions.get(q, {}))
+            # scene terms contained in q: look up q's substrings no longer than the longest term
+            for start in range(len(q)):
+                for end in range(start + 1, min(len(q), start + self._max_term_len) + 1):
+                    for scene_name, pos in self._term_positions.get(q[start:end], {}).items():
+                        if pos < best.get(scene_name, pos + 1):
+                            best[scene_name] = pos
+            for scene_name, pos in best.items():
+                matches[scene_name].append(self._scene_terms[scene_name][pos])
+        return matches
 
-        query_terms = self._extract_terms(query)
+    def top(self, query: str, k: int) -> Optional[List[Dict]]:
+        """Best ``k`` scenes as ``{scene_type, score, matched}``; None when the query has no usable terms."""
+        query_terms = self.extract_terms(query)
         if not query_terms:
-            return self._fallback("query_unusable", query)
-
+            return None
+        matches = self._match_terms(query_terms)
         ranking = []
-        for scene_name, section_text in self._scene_sections.items():
-            scene_terms = self._scene_term_set(scene_name, section_text)
-            matched = []
-            for q in query_terms:
-                for st in scene_terms:
-                    if q in st or st in q:
-                        matched.append(st)
-                        break
+        for scene_name in self.sections:
+            matched = matches[scene_name]
             scene_name_hit = 1 if scene_name in query else 0
             score = (len(matched) + scene_name_hit) / (len(query_terms) + 1)
             ranking.append(
@@ -122,11 +158,295 @@ class SceneRetriever:
                     "matched": matched,
                 }
             )
-
         ranking.sort(key=lambda item: item["score"], reverse=True)
+        return ranking[:k]
+
+    def top_many(self, queries: Sequence[str], k: int) -> List[Optional[List[Dict]]]:
+        return [self.top(query, k) for query in queries]
+
+
+class BM25SceneEngine:
+    """Okapi BM25 over CJK character bigrams / trigrams, for libraries with many scene sections.
+
+    Documents are indexed once into a sparse ``docs x vocabulary`` weight matrix
+    (SciPy CSR when available, postings lists otherwise). A batch of queries is
+    scored as one sparse product ``Q @ M.T`` (``queries x vocabulary`` n-gram counts
+    times the weight matrix), so only sections sharing an n-gram with a query get a
+    score entry (a single query just sums its n-grams' postings with one ``bincount``);
+    top-k is a ``partition`` over each row's entries. Scores are normalised to an
+    IDF-weighted coverage (raw BM25 / sum of the query n-grams' IDF, capped at 1:
+    every query n-gram occurring once in an average-length section scores 1.0),
+    the same 0-1 scale ``min_score`` expects. Query n-grams that never occur in
+    the library weigh as the rarest term, so mostly unknown queries stay low.
+    """
+
+    name = "bm25"
+
+    def __init__(
+        self,
+        sections: Dict[str, str],
+        default_keywords: Optional[Dict[str, List[str]]] = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+        ngram_sizes: Sequence[int] = (2, 3),
+        use_numpy: bool = True,
+        batch_size: int = 32,
+    ):
+        self.sections = sections
+        self.default_keywords = DEFAULT_KEYWORDS if default_keywords is None else default_keywords
+        self.k1 = float(k1)
+        self.b = float(b)
+        self.ngram_sizes = tuple(ngram_sizes)
+        self.batch_size = max(1, int(batch_size))
+        self._names = list(sections)
+        self._np, self._sparse = _load_numpy() if use_numpy else (None, None)
+        self._build_index()
+
+    def _doc_counts(self, scene_name: str, text: str) -> Dict[str, int]:
+        # a section ends at the next level-2 heading of any kind, so trailing notes
+        # (e.g. "## 六、使用原则" after the last scene) don't leak into the last scene
+        next_heading = text.find("\n## ")
+        if next_heading != -1:
+            text = text[:next_heading]
+        counts: Dict[str, int] = {}
+        keywords = " ".join(self.default_keywords.get(scene_name, []))
+        for run in _CJK_RUN.findall(f"{text} {keywords}"):
+            if run.isascii():
+                grams = [run.lower()] if len(run) >= 2 else []
+            else:
+                grams = [run[i:i + n] for n in self.ngram_sizes for i in range(len(run) - n + 1)]
+            for gram in grams:
+                counts[gram] = counts.get(gram, 0) + 1
+        return counts
+
+    def _build_index(self) -> None:
+        self.vocabulary: Dict[str, int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        tfs: List[int] = []
+        lengths: List[int] = []
+        for doc_id, name in enumerate(self._names):
+            counts = self._doc_counts(name, self.sections[name])
+            lengths.append(sum(counts.values()))
+            rows.extend([doc_id] * len(counts))
+            cols.extend(self.vocabulary.setdefault(gram, len(self.vocabulary)) for gram in counts)
+            tfs.extend(counts.values())
+        self._grams = list(self.vocabulary)
+
+        n_docs = len(self._names)
+        avg_length = (sum(lengths) / n_docs) if n_docs else 0.0
+        # n-grams absent from the library weigh as much as the rarest possible term (df = 1)
+        self._unknown_idf = math.log(1 + (n_docs - 0.5) / 1.5)
+
+        # w(t, d) = idf(t) * tf * (k1 + 1) / (tf + k1 * (1 - b + b * |d| / avgdl))
+        if self._np is not None:
+            np = self._np
+            row_arr = np.asarray(rows, dtype=np.int64)
+            col_arr = np.asarray(cols, dtype=np.int64)
+            tf_arr = np.asarray(tfs, dtype=np.float64)
+            df = np.bincount(col_arr, minlength=len(self._grams))
+            idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * np.asarray(lengths, dtype=np.float64) / avg_length) if avg_length else np.full(n_docs, self.k1)
+            weights = idf[col_arr] * tf_arr * (self.k1 + 1) / (tf_arr + norm[row_arr])
+            self._idf = idf.tolist()
+            self._matrix = self._sparse.csr_matrix((weights, (row_arr, col_arr)), shape=(n_docs, len(self._grams)))
+            self._matrix_t = self._matrix.T.tocsr()
+            # plain lists of the CSR bounds: per-section / per-term slicing without scipy overhead
+            self._row_bounds = self._matrix.indptr.tolist()
+            self._term_bounds = self._matrix_t.indptr.tolist()
+            return
+
+        df = [0] * len(self._grams)
+        for term_id in cols:
+            df[term_id] += 1
+        self._idf = [math.log(1 + (n_docs - d + 0.5) / (d + 0.5)) for d in df]
+        norms = [self.k1 * (1 - self.b + self.b * length / avg_length) if avg_length else self.k1 for length in lengths]
+        self._postings: Dict[int, List[Tuple[int, float]]] = {}
+        self._doc_terms: List[Dict[int, float]] = [{} for _ in range(n_docs)]
+        for doc_id, term_id, tf in zip(rows, cols, tfs):
+            weight = self._idf[term_id] * tf * (self.k1 + 1) / (tf + norms[doc_id])
+            self._postings.setdefault(term_id, []).append((doc_id, weight))
+            self._doc_terms[doc_id][term_id] = weight
+
+    def _query(self, query: str) -> Tuple[List[int], float]:
+        """Known term ids of the query and its score upper bound."""
+        term_ids = []
+        upper = 0.0
+        for gram in char_ngrams(query, self.ngram_sizes):
+            term_id = self.vocabulary.get(gram)
+            if term_id is None:
+                upper += self._unknown_idf
+            else:
+                term_ids.append(term_id)
+                upper += self._idf[term_id]
+        return term_ids, upper
+
+    def _doc_weights(self, doc_id: int, term_ids: List[int]) -> Dict[int, float]:
+        """{term id: BM25 weight} of the query terms present in one section."""
+        if self._np is None:
+            doc_terms = self._doc_terms[doc_id]
+            return {term_id: doc_terms[term_id] for term_id in term_ids if term_id in doc_terms}
+        np = self._np
+        lo, hi = self._row_bounds[doc_id], self._row_bounds[doc_id + 1]
+        row_terms = self._matrix.indices[lo:hi]  # sorted: the matrix is canonical CSR
+        wanted = np.asarray(term_ids, dtype=row_terms.dtype)
+        pos = np.minimum(np.searchsorted(row_terms, wanted), max(hi - lo - 1, 0))
+        found = row_terms[pos] == wanted if hi > lo else np.zeros(len(wanted), dtype=bool)
+        return dict(zip(wanted[found].tolist(), self._matrix.data[lo:hi][pos[found]].tolist()))
+
+    def _result(self, doc_id: int, raw_score: float, upper: float, term_ids: List[int]) -> Dict:
+        doc_terms = self._doc_weights(doc_id, term_ids)
+        ranked = sorted(doc_terms, key=lambda t: (-len(self._grams[t]), -doc_terms[t]))
+        matched: List[str] = []
+        for term_id in ranked:
+            gram = self._grams[term_id]
+            # longest first; drop n-grams already covered by a kept keyword
+            if not any(gram in kept for kept in matched):
+                matched.append(gram)
+        return {
+            "scene_type": self._names[doc_id],
+            "score": round(min(raw_score / upper, 1.0), 4) if upper else 0.0,
+            "matched": matched,
+        }
+
+    def _pad(self, best: List[Tuple[int, float]], k: int) -> List[Tuple[int, float]]:
+        """Fewer than k sections share a term: pad with zero-score sections in library order."""
+        chosen = {doc_id for doc_id, _ in best}
+        for doc_id in range(len(self._names)):
+            if len(best) >= k:
+                break
+            if doc_id not in chosen:
+                best.append((doc_id, 0.0))
+        return best
+
+    def _top_python(self, term_ids: List[int], k: int) -> List[Tuple[int, float]]:
+        scores: Dict[int, float] = {}
+        for term_id in term_ids:
+            for doc_id, weight in self._postings.get(term_id, ()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        return self._pad(heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], item[0])), k)
+
+    def _top_entries(self, doc_ids, row_scores, k: int) -> List[Tuple[int, float]]:
+        """Top-k of one query's nonzero (section, score) entries."""
+        np = self._np
+        if len(doc_ids) > k:
+            # k-th best score; everything above it is in, ties at it go by library order
+            threshold = -np.partition(-row_scores, k - 1)[k - 1]
+            above = np.flatnonzero(row_scores > threshold)
+            tied = np.flatnonzero(row_scores == threshold)
+            tied = tied[np.argsort(doc_ids[tied], kind="stable")][: k - len(above)]
+            keep = np.concatenate([above, tied])
+            doc_ids, row_scores = doc_ids[keep], row_scores[keep]
+        order = np.lexsort((doc_ids, -row_scores))
+        return self._pad([(int(doc_ids[i]), float(row_scores[i])) for i in order], k)
+
+    def _top_numpy(self, query_rows: List[List[int]], k: int) -> List[List[Tuple[int, float]]]:
+        np = self._np
+        k = min(k, len(self._names))
+        if len(query_rows) == 1:
+            # a single query: sum its terms' postings (rows of the term x doc matrix) with
+            # one bincount, cheaper than building a sparse product for one row
+            indices, data = self._matrix_t.indices, self._matrix_t.data
+            bounds = [(self._term_bounds[t], self._term_bounds[t + 1]) for t in query_rows[0]]
+            if not bounds:
+                return [self._pad([], k)]
+            scores = np.bincount(
+                np.concatenate([indices[lo:hi] for lo, hi in bounds]),
+                np.concatenate([data[lo:hi] for lo, hi in bounds]),
+                minlength=len(self._names),
+            )
+            doc_ids = np.flatnonzero(scores)
+            return [self._top_entries(doc_ids, scores[doc_ids], k)]
+        # sparse queries x vocabulary count matrix times the vocabulary x docs weight
+        # matrix: only sections sharing a term with a query get a score entry
+        rows = [row for row, term_ids in enumerate(query_rows) for _ in term_ids]
+        cols = [term_id for term_ids in query_rows for term_id in term_ids]
+        queries = self._sparse.csr_matrix(
+            (np.ones(len(cols)), (rows, cols)), shape=(len(query_rows), len(self._grams))
+        )
+        scores = (queries @ self._matrix_t).tocsr()
+        return [
+            self._top_entries(scores.indices[lo:hi], scores.data[lo:hi], k)
+            for lo, hi in zip(scores.indptr[:-1], scores.indptr[1:])
+        ]
+
+    def top(self, query: str, k: int) -> Optional[List[Dict]]:
+        return self.top_many([query], k)[0]
+
+    def top_many(self, queries: Sequence[str], k: int) -> List[Optional[List[Dict]]]:
+        """Batch retrieval: one sparse score product per ``batch_size`` queries."""
+        parsed = [self._query(query) for query in queries]
+        results: List[Optional[List[Dict]]] = [None] * len(queries)
+        if not self._names:
+            return results
+        usable = [i for i, (term_ids, upper) in enumerate(parsed) if upper > 0]
+        for start in range(0, len(usable), self.batch_size):
+            chunk = usable[start:start + self.batch_size]
+            if self._np is not None:
+                tops = self._top_numpy([parsed[i][0] for i in chunk], k)
+            else:
+                tops = [self._top_python(parsed[i][0], k) for i in chunk]
+            for i, top in zip(chunk, tops):
+                term_ids, upper = parsed[i]
+                results[i] = [self._result(doc_id, score, upper, term_ids) for doc_id, score in top]
+        return results
+
+
+ENGINES = {
+    OverlapSceneEngine.name: OverlapSceneEngine,
+    BM25SceneEngine.name: BM25SceneEngine,
+}
+
+
+class SceneRetriever:
+    """Lightweight local scene retriever backed by markdown scene library.
+
+    Scoring is delegated to a pluggable engine (``overlap`` for the hand-tuned
+    five-scene library, ``bm25`` for large libraries); this class owns loading
+    and the result contract shared by every engine.
+    """
+
+    def __init__(
+        self,
+        scene_library_path: str,
+        top_k: int = 3,
+        min_score: float = 0.15,
+        default_scene: str = "春节返乡",
+        engine: str = "overlap",
+        **engine_options,
+    ):
+        self.scene_library_path = scene_library_path
+        self.top_k = max(1, int(top_k))
+        self.min_score = float(min_score)
+        self.default_scene = default_scene
+        self._scene_sections = self._load_scene_sections()
+        if engine not in ENGINES:
+            raise ValueError(f"unknown scene engine: {engine} (choose from {', '.join(ENGINES)})")
+        self.engine = ENGINES[engine](self._scene_sections, **engine_options)
+
+    def _load_scene_sections(self) -> Dict[str, str]:
+        try:
+            with open(self.scene_library_path, "r", encoding="utf-8") as f:
+                content = f.read()
+        except Exception:
+            return {}
+        return parse_scene_sections(content)
+
+    def _fallback(self, reason: str, query: str = "") -> Dict:
+        evidence = [reason]
+        if query:
+            evidence.append(f"query={query}")
+        return {
+            "scene_type": self.default_scene,
+            "keywords": [],
+            "evidence": evidence,
+            "score": 0.0,
+            "fallback_used": True,
+        }
+
+    def _build_result(self, ranking: List[Dict]) -> Dict:
         best = ranking[0]
-        top_candidates = ranking[: self.top_k]
-        evidence = [f"{item['scene_type']}:{item['score']:.4f}" for item in top_candidates]
+        evidence = [f"{item['scene_type']}:{item['score']:.4f}" for item in ranking]
 
         if best["score"] < self.min_score:
             return {
@@ -144,3 +464,24 @@ class SceneRetriever:
             "score": float(best["score"]),
             "fallback_used": False,
         }
+
+    def retrieve(self, scene_text: str) -> Dict:
+        return self.retrieve_many([scene_text])[0]
+
+    def retrieve_many(self, scene_texts: Sequence[str]) -> List[Dict]:
+        """Retrieve a batch of queries (e.g. every row of a batch job) in one engine pass."""
+        queries = [(text or "").strip() for text in scene_texts]
+        results: List[Optional[Dict]] = [None] * len(queries)
+        pending = []
+        for i, query in enumerate(queries):
+            if not query:
+                results[i] = self._fallback("empty_input")
+            elif not self._scene_sections:
+                results[i] = self._fallback("library_unavailable", query)
+            else:
+                pending.append(i)
+
+        rankings = self.engine.top_many([queries[i] for i in pending], self.top_k)
+        for i, ranking in zip(pending, rankings):
+            results[i] = self._build_result(ranking) if ranking else self._fallback("query_unusable", queries[i])
+        return results
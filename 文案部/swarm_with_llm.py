@@ -1,7 +1,28 @@
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-
+from adaptive_limiter import AdaptiveLimiter, current_request_class, flow_scope, request_class_scope
 from config import config
+from llm_cache import LLMResponseCache, get_llm_cache
+from llm_client import get_llm_client, close_llm_client
+from material_cache import get_material_cache
+from material_library import get_material_library
+from prompts import (
+    build_batch_review_prompt,
+    build_review_prompt,
+    build_revision_prompt,
+    build_writer_prompt,
+)
+from run_store import get_run_store, new_run_id, open_checkpointer, release_checkpoint
 from scene_rag import SceneRetriever
+import tracing
+from usage_tracker import (
+    UsageLedger,
+    current_scope,
+    estimate_usage,
+    record_local_cache_hit,
+    record_usage,
+    tracks_usage,
+    usage_cost,
+    usage_scope,
+)
 
 """
 Agent Swarm 原型 - Content Expansion (with Real LLM)
@@ -10,26 +31,42 @@ Agent Swarm 原型 - Content Expansion (with Real LLM)
 技术栈：LangGraph + Claude Opus (真实 API 调用)
 """
 
-from typing import TypedDict, List, Dict
-from langgraph.graph import StateGraph, END
+from typing import TypedDict, List, Dict, Optional, Callable, AsyncIterator, Awaitable, Tuple
+import argparse
+import contextlib
+import functools
+import hashlib
 import json
 import random
 import os
-import requests
 import asyncio
-import aiohttp
+import atexit
+import threading
+import time
 from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
 
-_api_semaphore = asyncio.Semaphore(config.CONCURRENT_LIMIT)
+# langgraph（约 0.9s）/ aiohttp / openpyxl 导入较重，都推迟到首次使用：
+# 建图时导入 langgraph，首次请求时导入 aiohttp，写 Excel 时导入 openpyxl
+
+# 自适应并发限制器在首次使用时创建，而不是 import 时（此时还没有事件循环）
+_api_limiter = None
+
+# 场景检索器在首次检索时才读取场景库
+_scene_retriever: Optional[SceneRetriever] = None
 
-scene_retriever = SceneRetriever(
-    scene_library_path="02-参考学习/03-Writer材料/内容变量库/场景切入库.md",
-    top_k=config.SCENE_RAG_TOP_K,
-    min_score=config.SCENE_RAG_MIN_SCORE,
-    default_scene=config.SCENE_RAG_DEFAULT_SCENE,
-)
+
+def get_scene_retriever() -> SceneRetriever:
+    """获取进程级场景检索器（首次调用时加载场景库）"""
+    global _scene_retriever
+    if _scene_retriever is None:
+        _scene_retriever = SceneRetriever(
+            scene_library_path="02-参考学习/03-Writer材料/内容变量库/场景切入库.md",
+            top_k=config.SCENE_RAG_TOP_K,
+            min_score=config.SCENE_RAG_MIN_SCORE,
+            default_scene=config.SCENE_RAG_DEFAULT_SCENE,
+            engine=config.SCENE_RAG_ENGINE,
+        )
+    return _scene_retriever
 
 # ============================================================================
 # Shared Context（所有角色共享的状态）
@@ -63,6 +100,12 @@ class SharedContext(TypedDict):
     # 用户交互控制
     skip_confirmations: bool  # 是否跳过所有确认
 
+    # 审核结论备忘：{hash(正文 + 审核规则): 审核结果}，修改轮只复审改过的篇目
+    review_memo: Dict
+
+    # 运行编号（检查点 thread_id / 篇目日志的键）
+    run_id: str
+
     # 元数据
     metadata: Dict  # {start_time, current_stage, attempts}
 
@@ -79,23 +122,164 @@ def random_sample_details(detail_library: List[str], k: int = 3) -> List[str]:
     return random.sample(detail_library, min(k, len(detail_library)))
 
 
+async def journaled_article(
+    state: SharedContext,
+    stage: str,
+    attempt: int,
+    article_id: int,
+    produce: Callable[[], Awaitable[Dict]],
+    completed: Callable[[Dict], bool] = lambda result: True,
+) -> Dict:
+    """
+    篇目日志：本次运行里这一篇在该阶段 / 轮次已经完成过就直接取回（中断后节点重放时不重复调用 LLM），
+    否则执行 produce()，completed(result) 为真时记入日志
+    """
+    run_id = state.get("run_id")
+    store = get_run_store() if run_id else None
+    if store is None:
+        return await produce()
+    saved = store.load_article(run_id, stage, attempt, article_id)
+    if saved is not None:
+        metadata = state.setdefault("metadata", {})
+        metadata["resumed_articles"] = metadata.get("resumed_articles", 0) + 1
+        return saved
+    result = await produce()
+    if completed(result):
+        store.save_article(run_id, stage, attempt, article_id, result)
+    return result
+
+
+def _get_api_limiter() -> AdaptiveLimiter:
+    """获取全局 AIMD 并发限制器（整个运行共用一个事件循环、一个限制器）"""
+    global _api_limiter
+    if _api_limiter is None:
+        _api_limiter = AdaptiveLimiter()
+    return _api_limiter
+
+
 async def map_scene_to_keywords_async(scene_text: str, api_key: str, api_url: str) -> str:
     """
     兼容层：保留旧调用签名，内部改为 SceneRetriever 本地检索。
     """
     del api_key, api_url
-    result = scene_retriever.retrieve(scene_text)
+    result = get_scene_retriever().retrieve(scene_text)
     keywords = "、".join(result["keywords"]) if result["keywords"] else result["scene_type"]
     return f"{result['scene_type']}｜关键词:{keywords}｜score:{result['score']:.2f}"
 
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=10),
-    retry=retry_if_exception_type((aiohttp.ClientError, asyncio.TimeoutError)),
-    reraise=True
-)
-async def call_deepseek_api_async(prompt: str, api_key: str, api_url: str, temperature: float = 0.7, max_tokens: int = 512) -> str:
+def _is_transient_error(exc: BaseException) -> bool:
+    """网络错误 / 超时 / 429 / 5xx 才重试，其余 4xx 重试也不会成功（aiohttp 在这里才导入，发请求时它早已加载）"""
+    import aiohttp
+
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status == 429 or exc.status >= 500
+    return isinstance(exc, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def _record_retry(retry_state) -> None:
+    """tenacity before_sleep：重试次数与退避时长记到外层 llm.call span"""
+    span = tracing.current_span()
+    span.add("llm.retries", 1)
+    span.add("llm.backoff_ms", _ms(retry_state.next_action.sleep))
+
+
+@functools.lru_cache(maxsize=None)
+def _retrying(fn):
+    """fn 套上 tenacity 重试（首次调用时才导入 tenacity，不拖慢 import swarm_with_llm）"""
+    from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+
+    return retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        retry=retry_if_exception(_is_transient_error),
+        before_sleep=_record_retry,
+        reraise=True
+    )(fn)
+
+
+def transient_retry(fn):
+    """瞬时错误（超时 / 429 / 5xx）最多重试 3 次、指数退避；保留 tenacity 的 retry_with 供测试调参"""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await _retrying(fn)(*args, **kwargs)
+
+    wrapper.retry_with = lambda *args, **kwargs: _retrying(fn).retry_with(*args, **kwargs)
+    return wrapper
+
+
+def traced_llm_call(purpose: str, request_class: Optional[str] = None):
+    """
+    一次逻辑 LLM 调用（含全部重试）记一个 llm.call span，节点 / 篇号 / 轮次取自 usage_scope；
+    request_class 给定时按该类别排队（见 Config.LLM_REQUEST_PRIORITIES），否则沿用上下文里的类别
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            scope = current_scope()
+            attributes = {
+                "llm.purpose": purpose,
+                "swarm.node": scope.get("node"),
+                "article.id": scope.get("article_id"),
+                "article.attempt": scope.get("attempt"),
+            }
+            class_scope = request_class_scope(request_class) if request_class else contextlib.nullcontext()
+            with class_scope, tracing.span("llm.call", attributes, kind="CLIENT"):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# 单篇任务阶段 → LLM 请求类别（决定运行内的派发次序）
+_STAGE_REQUEST_CLASS = {"write": "draft", "revise": "revision", "review": "review"}
+
+
+@contextlib.contextmanager
+def article_scope(stage: str, article_id: int, attempt: int, node: Optional[str] = None):
+    """单篇任务的归属（记账篇号 / 轮次 / 请求类别）+ article.<stage> span"""
+    fields = {"article_id": article_id, "attempt": attempt}
+    if node:
+        fields["node"] = node
+    attributes = {"article.id": article_id, "article.attempt": attempt}
+    with usage_scope(**fields), request_class_scope(_STAGE_REQUEST_CLASS[stage]):
+        with tracing.span(f"article.{stage}", attributes):
+            yield
+
+
+@transient_retry
+async def _chat_completion(payload: Dict, api_key: str, api_url: str) -> Dict:
+    """
+    发送一次 chat/completions 请求（共享连接池 + 并发信号量 + 重试），返回完整响应 JSON
+    """
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+
+    call_span = tracing.current_span()
+    attempt_attributes = {"llm.attempt": int(call_span.get("llm.retries", 0)) + 1, "llm.request_class": current_request_class()}
+    with tracing.span("llm.attempt", attempt_attributes, kind="CLIENT") as span:
+        queued_at = time.monotonic()
+        async with _get_api_limiter().slot() as lease:
+            span.set_attribute("llm.queue_wait_ms", _ms(lease.started - queued_at))
+            session = await get_llm_client().session()
+            async with session.post(api_url, headers=headers, json=payload, timeout=60) as response:
+                span.set_attribute("llm.ttfb_ms", _ms(time.monotonic() - lease.started))
+                span.set_attribute("http.status_code", response.status)
+                lease.observe(response.status, response.headers)
+                response.raise_for_status()
+                body_started = time.monotonic()
+                result = await response.json()
+                span.set_attribute("llm.body_ms", _ms(time.monotonic() - body_started))
+    record_usage(result.get("usage"))
+    return result
+
+
+@traced_llm_call("generate")
+async def call_deepseek_api_async(prompt: str, api_key: str, api_url: str, temperature: float = 0.7, max_tokens: int = 512, use_cache: bool = True) -> str:
     """
     异步调用 Deepseek API
 
@@ -105,29 +289,298 @@ async def call_deepseek_api_async(prompt: str, api_key: str, api_url: str, tempe
         api_url: API 地址
         temperature: 生成的随机性温度
         max_tokens: 允许生成的最长 Tokens
+        use_cache: 是否读写 LLM 响应缓存（Writer 随机温度时可关闭）
 
     Returns:
         生成的内容
     """
+    cache = get_llm_cache() if use_cache else None
+    cache_key = None
+    if cache is not None:
+        cache_key = LLMResponseCache.make_key(config.DEEPSEEK_MODEL, prompt, temperature, max_tokens)
+        cached = await cache.aget(cache_key)
+        if cached is not None:
+            record_local_cache_hit()
+            tracing.current_span().set_attribute("llm.cache_hit", True)
+            return cached
+
+    payload = {
+        "model": config.DEEPSEEK_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+
+    result = await _chat_completion(payload, api_key, api_url)
+    content = result['choices'][0]['message']['content'].strip()
+    if cache is not None:
+        await cache.aset(cache_key, content)
+    return content
+
+
+async def stream_deepseek_api_async(prompt: str, api_key: str, api_url: str, temperature: float = 0.7, max_tokens: int = 512) -> AsyncIterator[str]:
+    """
+    以 SSE 流式（stream: true）调用 Deepseek API，逐段 yield 增量文本。
+    调用方提前停止迭代（aclose）时会直接断开连接，服务端随即停止生成。
+    """
     headers = {
         "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
+        "Content-Type": "application/json",
+        "Accept": "text/event-stream"
     }
 
     payload = {
-        "model": "deepseek-chat",
+        "model": config.DEEPSEEK_MODEL,
         "messages": [{"role": "user", "content": prompt}],
         "temperature": temperature,
-        "max_tokens": max_tokens
+        "max_tokens": max_tokens,
+        "stream": True,
+        "stream_options": {"include_usage": True}
     }
 
-    async with _api_semaphore:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(api_url, headers=headers, json=payload, timeout=60) as response:
-                response.raise_for_status()
-                result = await response.json()
-                return result['choices'][0]['message']['content'].strip()
+    span = tracing.current_span()
+    queued_at = time.monotonic()
+    async with _get_api_limiter().slot() as lease:
+        span.set_attribute("llm.queue_wait_ms", _ms(lease.started - queued_at))
+        session = await get_llm_client().session()
+        async with session.post(api_url, headers=headers, json=payload, timeout=60) as response:
+            span.set_attribute("llm.ttfb_ms", _ms(time.monotonic() - lease.started))
+            span.set_attribute("http.status_code", response.status)
+            lease.observe(response.status, response.headers)
+            response.raise_for_status()
+            completed = False
+            usage = None
+            emitted_chars = 0
+            try:
+                async for raw_line in response.content:
+                    line = raw_line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        completed = True
+                        break
+                    chunk = json.loads(data)
+                    usage = chunk.get("usage") or usage
+                    choices = chunk.get("choices") or []
+                    delta = choices[0].get("delta", {}).get("content") if choices else None
+                    if delta:
+                        if not emitted_chars:
+                            span.set_attribute("llm.first_token_ms", _ms(time.monotonic() - lease.started))
+                        emitted_chars += len(delta)
+                        yield delta
+                else:
+                    completed = True
+            finally:
+                span.set_attribute("llm.body_ms", _ms(time.monotonic() - lease.started))
+                if not completed:
+                    # 中途放弃：关闭连接而不是读完剩余 token
+                    response.close()
+                if usage is not None:
+                    record_usage(usage)
+                else:
+                    # 中止或服务端未返回 usage：按字数估算计费
+                    record_usage(estimate_usage(prompt, emitted_chars), estimated=True)
+
+
+@traced_llm_call("generate.stream")
+@transient_retry
+async def call_deepseek_api_stream_async(prompt: str, api_key: str, api_url: str, temperature: float = 0.7, max_tokens: int = 512, max_chars: Optional[int] = None, on_token: Optional[Callable[[str, str], None]] = None, use_cache: bool = True) -> Dict:
+    """
+    流式生成并收集全文；文本一旦超过 max_chars（平台字数上限）立即中止生成。
 
+    Args:
+        max_chars: 字数上限，None 表示不截断
+        on_token: 每收到一段增量时回调 on_token(delta, text_so_far)
+
+    Returns:
+        {"content": 正文, "truncated": 是否因超长被提前截断}
+    """
+    cache = get_llm_cache() if use_cache else None
+    cache_key = None
+    if cache is not None:
+        cache_key = LLMResponseCache.make_key(config.DEEPSEEK_MODEL, prompt, temperature, max_tokens)
+        cached = await cache.aget(cache_key)
+        if cached is not None:
+            record_local_cache_hit()
+            tracing.current_span().set_attribute("llm.cache_hit", True)
+            return {"content": cached, "truncated": False}
+
+    parts = []
+    length = 0
+    truncated = False
+    call_span = tracing.current_span()
+    attempt_attributes = {"llm.attempt": int(call_span.get("llm.retries", 0)) + 1, "llm.request_class": current_request_class()}
+    with tracing.span("llm.attempt", attempt_attributes, kind="CLIENT") as span:
+        stream = stream_deepseek_api_async(prompt, api_key, api_url, temperature=temperature, max_tokens=max_tokens)
+        try:
+            async for delta in stream:
+                parts.append(delta)
+                length += len(delta)
+                if on_token is not None:
+                    on_token(delta, "".join(parts))
+                if max_chars is not None and length > max_chars:
+                    truncated = True
+                    break
+        finally:
+            await stream.aclose()
+        span.set_attribute("llm.truncated", truncated)
+
+    content = "".join(parts).strip()
+    if cache is not None and not truncated:
+        await cache.aset(cache_key, content)
+    return {"content": content, "truncated": truncated}
+
+
+
+async def generate_writer_text_async(prompt: str, platform: str, article_id: int, temperature: float = 0.7, max_tokens: int = 512) -> Dict:
+    """
+    Writer 生成入口（首稿与修改共用）：Config.WRITER_STREAMING 打开时走流式，
+    首个 token 到达即打印进度，超过平台字数上限立即中止。
+
+    Returns:
+        {"content": 正文, "truncated": 是否被提前截断}
+    """
+    if not config.WRITER_STREAMING:
+        content = await call_deepseek_api_async(
+            prompt, config.DEEPSEEK_API_KEY, config.DEEPSEEK_API_URL,
+            temperature=temperature, max_tokens=max_tokens,
+            use_cache=config.WRITER_USE_CACHE
+        )
+        return {"content": content, "truncated": False}
+
+    spec = config.PLATFORM_SPECS.get(platform, config.PLATFORM_SPECS["小红书"])
+    max_chars = spec["limits"][1] if config.WRITER_STREAM_ABORT_ON_OVERRUN else None
+    started = time.perf_counter()
+    first_token_seen = []
+
+    def on_token(delta: str, text: str) -> None:
+        if not first_token_seen:
+            first_token_seen.append(True)
+            print(f"    … 第{article_id}篇开始输出（首字 {time.perf_counter() - started:.2f}s）")
+
+    result = await call_deepseek_api_stream_async(
+        prompt, config.DEEPSEEK_API_KEY, config.DEEPSEEK_API_URL,
+        temperature=temperature, max_tokens=max_tokens,
+        max_chars=max_chars, on_token=on_token,
+        use_cache=config.WRITER_USE_CACHE
+    )
+    if result["truncated"]:
+        print(f"    ✂ 第{article_id}篇超过{platform}字数上限 {max_chars} 字，已提前停止生成")
+    return result
+
+
+def candidate_temperatures(k: int) -> List[float]:
+    """k 份候选的温度：在 WRITER_CANDIDATE_TEMPERATURE_RANGE 内均匀分布"""
+    low, high = config.WRITER_CANDIDATE_TEMPERATURE_RANGE
+    if k <= 1:
+        return [round((low + high) / 2, 2)]
+    return [round(low + (high - low) * i / (k - 1), 2) for i in range(k)]
+
+
+def candidate_rank_key(content_item: Dict, platform: str) -> Tuple:
+    """
+    候选稿本地排序键（越小越好）：
+    硬性问题数 → AI 套话数 → 场景 + 情感评分（高者优先）→ 字数偏离审核区间中点的距离
+    """
+    content = content_item["content"]
+    issues, _ = hard_check_content(content_item, platform)
+    cliches = sum(1 for word in AI_CLICHE_WORDS if word in content)
+    quality = check_scene_quality(content)["score"] + check_emotion_quality(content)["score"]
+    min_words, max_words = REVIEW_WORD_LIMITS.get(platform, (200, 400))
+    distance = abs(len(content) - (min_words + max_words) / 2)
+    return (len(issues), cliches, -quality, distance)
+
+
+def record_speculative_stats(stats: Dict, prompt: str, candidates: List[Dict], best: Dict, failed: int, cancelled: int, platform: str) -> None:
+    """
+    记录多候选的代价与收益（写入 metadata["speculative"]）：
+    落选候选的 token / 费用按字数估算（提前采用时被取消的候选不计）；
+    rescued 为“有候选没过硬性规则、但选中的那份过了”的次数，即本地预选省下的一轮 审核 → 修改
+    """
+    clean = [not hard_check_content(c, platform)[0] for c in candidates]
+    best_clean = clean[candidates.index(best)]
+    discarded = [c for c in candidates if c is not best]
+    discarded_usage = [estimate_usage(prompt, len(c["content"])) for c in discarded]
+
+    stats["generations"] = stats.get("generations", 0) + 1
+    stats["candidates"] = stats.get("candidates", 0) + len(candidates)
+    stats["failed"] = stats.get("failed", 0) + failed
+    stats["cancelled"] = stats.get("cancelled", 0) + cancelled
+    stats["discarded"] = stats.get("discarded", 0) + len(discarded)
+    stats["discarded_tokens"] = stats.get("discarded_tokens", 0) + sum(
+        u["prompt_tokens"] + u["completion_tokens"] for u in discarded_usage
+    )
+    stats["discarded_cost"] = round(stats.get("discarded_cost", 0.0) + sum(usage_cost(u) for u in discarded_usage), 6)
+    stats["clean_picks"] = stats.get("clean_picks", 0) + int(best_clean)
+    stats["rescued"] = stats.get("rescued", 0) + int(best_clean and not all(clean))
+
+
+def format_speculative_summary(state: SharedContext) -> Optional[str]:
+    """多候选的代价 / 收益一行摘要（未开启时返回 None）"""
+    metadata = state.get("metadata", {})
+    stats = metadata.get("speculative") or {}
+    if not stats.get("generations"):
+        return None
+    total_cost = metadata.get("token_usage", {}).get("total", {}).get("cost", 0.0)
+    share = f"，占总费用 {stats['discarded_cost'] / total_cost:.0%}" if total_cost else ""
+    return (f"k={config.WRITER_CANDIDATES}：{stats['generations']} 次生成共 {stats['candidates']} 份候选，"
+            f"落选 {stats['discarded']} 份（约 {stats['discarded_tokens']} tokens / ¥{stats['discarded_cost']:.4f}{share}），"
+            f"选中稿过硬性规则 {stats['clean_picks']} 次，其中本地预选挽回 {stats['rescued']} 次，"
+            f"审核轮次 {state.get('current_attempt', 1)}")
+
+
+async def generate_writer_candidates_async(prompt: str, platform: str, article_id: int, temperature: float = 0.7, max_tokens: int = 512, stats: Optional[Dict] = None) -> Dict:
+    """
+    推测式多候选（Config.WRITER_CANDIDATES = k > 1）：同一 prompt 按 k 个温度并发生成，
+    用 candidate_rank_key 本地排序，只返回最好的一份交给审核；多花的是并行的 token，
+    换来更少的串行 审核 → 修改 轮次。WRITER_CANDIDATE_EARLY_ACCEPT 打开时首份合格稿即返回，
+    其余候选取消。k = 1 时等同 generate_writer_text_async（使用传入的温度）。
+
+    Returns:
+        {"content": 正文, "truncated": 是否被提前截断, "temperature": 选中候选的温度}
+    """
+    k = max(1, int(config.WRITER_CANDIDATES))
+    if k == 1:
+        return await generate_writer_text_async(prompt, platform, article_id, temperature=temperature, max_tokens=max_tokens)
+
+    temperatures = candidate_temperatures(k)
+
+    async def generate(t: float) -> Dict:
+        result = await generate_writer_text_async(prompt, platform, article_id, temperature=t, max_tokens=max_tokens)
+        return dict(result, temperature=t)
+
+    tasks = [asyncio.ensure_future(generate(t)) for t in temperatures]
+    candidates = []
+    errors = []
+    accepted = None
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                candidate = await next_done
+            except Exception as e:
+                errors.append(e)
+                continue
+            candidates.append(candidate)
+            rank = candidate_rank_key(candidate, platform)
+            if config.WRITER_CANDIDATE_EARLY_ACCEPT and rank[0] == 0 and rank[1] == 0:
+                # 首份无硬性问题、无套话的候选即采用，不再等更慢的候选（取 k 份里最快的合格稿）
+                accepted = candidate
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        # 等落选候选真正退出（释放限制器名额、关闭流式连接）再返回，异常就地吞掉不留到事件循环
+        await asyncio.gather(*tasks, return_exceptions=True)
+        cancelled = sum(1 for task in tasks if task.cancelled())
+    if not candidates:
+        raise errors[0]
+
+    best = accepted or min(candidates, key=lambda c: candidate_rank_key(c, platform))
+    if stats is not None:
+        record_speculative_stats(stats, prompt, candidates, best, len(errors), cancelled, platform)
+    print(f"    ◇ 第{article_id}篇 {len(candidates)} 份候选，选中温度 {best['temperature']}（{len(best['content'])}字）")
+    return best
 
 
 def ask_user_confirmation(title: str, content: Dict, options: List[str] = None) -> str:
@@ -182,27 +635,8 @@ def ask_user_confirmation(title: str, content: Dict, options: List[str] = None)
 
 
 def load_detail_library(file_path: str) -> List[str]:
-    """从 markdown 文件加载细节描写库"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        # 解析 markdown，提取列表项
-        details = []
-        for line in content.split('\n'):
-            line = line.strip()
-            if line.startswith('- "') and line.endswith('"'):
-                detail = line[3:-1]  # 去掉 '- "' 和 '"'
-                details.append(detail)
-
-        return details
-    except FileNotFoundError:
-        print(f"警告：找不到细节库文件 {file_path}，使用默认样本")
-        return [
-            "不用玩后备箱俄罗斯方块",
-            "老妈的腊肉、老爸的酒，一样都不落",
-            "后备箱盖一关，满满当当的安心"
-        ]
+    """从 markdown 文件加载细节描写库（MaterialLibrary 解析一次，mtime 变化才重读）"""
+    return get_material_library().details(file_path)
 
 
 def load_persona_samples(persona: str) -> Dict[str, List[str]]:
@@ -213,72 +647,9 @@ def load_persona_samples(persona: str) -> Dict[str, List[str]]:
         persona: 人设名称（宝妈、孝子、小夫妻、职场精英）
 
     Returns:
-        包含开场切入、痛点描述、解决方案、情感升华的字典
+        包含开场切入、痛点描述、解决方案、情感升华的字典（只读，来自 MaterialLibrary）
     """
-    file_path = "02-参考学习/03-Writer材料/内容变量库/口吻样本库.md"
-
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        # 初始化结果
-        samples = {
-            "开场切入": [],
-            "痛点描述": [],
-            "解决方案": [],
-            "情感升华": []
-        }
-
-        # 根据人设找到对应部分
-        persona_markers = {
-            "宝妈": "## 一、宝妈口吻",
-            "孝子": "## 二、孝子口吻",
-            "小夫妻": "## 三、小夫妻口吻",
-            "职场精英": "## 四、职场精英口吻"
-        }
-
-        if persona not in persona_markers:
-            return samples
-
-        # 找到该人设的起始位置
-        start_marker = persona_markers[persona]
-        start_pos = content.find(start_marker)
-        if start_pos == -1:
-            return samples
-
-        # 找到下一个人设的起始位置（作为结束位置）
-        next_markers = [m for p, m in persona_markers.items() if p != persona]
-        end_pos = len(content)
-        for next_marker in next_markers:
-            pos = content.find(next_marker, start_pos + 1)
-            if pos != -1 and pos < end_pos:
-                end_pos = pos
-
-        # 提取该人设的内容
-        persona_content = content[start_pos:end_pos]
-
-        # 解析各个子部分
-        current_subsection = None
-        for line in persona_content.split('\n'):
-            line = line.strip()
-            if "**开场切入**" in line:
-                current_subsection = "开场切入"
-            elif "**痛点描述**" in line:
-                current_subsection = "痛点描述"
-            elif "**解决方案**" in line:
-                current_subsection = "解决方案"
-            elif "**情感升华**" in line:
-                current_subsection = "情感升华"
-            elif current_subsection and line.startswith('- "') and line.endswith('"'):
-                # 处理中文引号
-                sample = line[3:-1]
-                samples[current_subsection].append(sample)
-
-        return samples
-
-    except FileNotFoundError:
-        print(f"警告：找不到口吻样本库文件 {file_path}")
-        return {"开场切入": [], "痛点描述": [], "解决方案": [], "情感升华": []}
+    return get_material_library().persona_samples(persona)
 
 
 def load_scene_samples(scene_type: str) -> Dict[str, List[str]]:
@@ -289,116 +660,23 @@ def load_scene_samples(scene_type: str) -> Dict[str, List[str]]:
         scene_type: 场景类型（春节返乡、周末出游、日常通勤等）
 
     Returns:
-        包含时间触发、场景描写、情感升华的字典
+        包含时间触发、场景描写、情感升华的字典（只读，来自 MaterialLibrary）
     """
-    file_path = "02-参考学习/03-Writer材料/内容变量库/场景切入库.md"
-
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        # 初始化结果
-        samples = {
-            "时间触发": [],
-            "场景描写": [],
-            "情感升华": []
-        }
-
-        # 根据场景类型找到对应部分
-        scene_markers = {
-            "春节返乡": "## 一、春节返乡场景",
-            "周末出游": "## 二、周末出游场景",
-            "日常通勤": "## 三、日常通勤场景",
-            "亲子游玩": "## 四、亲子游玩场景",
-            "孝敬父母": "## 五、孝敬父母场景"
-        }
-
-        # 默认使用春节返乡
-        start_marker = scene_markers.get(scene_type, scene_markers["春节返乡"])
-
-        # 找到该场景的起始位置
-        start_pos = content.find(start_marker)
-        if start_pos == -1:
-            return samples
-
-        # 找到下一个场景的起始位置（作为结束位置）
-        next_markers = [m for s, m in scene_markers.items() if s != scene_type]
-        end_pos = len(content)
-        for next_marker in next_markers:
-            pos = content.find(next_marker, start_pos + 1)
-            if pos != -1 and pos < end_pos:
-                end_pos = pos
-
-        # 提取该场景的内容
-        scene_content = content[start_pos:end_pos]
-
-        # 解析各个子部分
-        current_subsection = None
-        for line in scene_content.split('\n'):
-            line = line.strip()
-            if "**时间触发**" in line:
-                current_subsection = "时间触发"
-            elif "**场景描写**" in line:
-                current_subsection = "场景描写"
-            elif "**情感升华**" in line:
-                current_subsection = "情感升华"
-            elif current_subsection and line.startswith('- "') and line.endswith('"'):
-                # 处理中文引号
-                sample = line[3:-1]
-                samples[current_subsection].append(sample)
-
-        return samples
-
-    except FileNotFoundError:
-        print(f"警告：找不到场景切入库文件 {file_path}")
-        return {"时间触发": [], "场景描写": [], "情感升华": []}
+    return get_material_library().scene_samples(scene_type)
 
 
 def load_few_shot_samples(platform: str) -> List[str]:
     """
     加载指定平台的爆款样本进行 Few-Shot 注入
     """
-    file_path = "02-参考学习/03-Writer材料/内容变量库/爆款参考库.md"
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # 根据平台对应不同标题区块
-        platform_markers = {
-            "小红书": "## 小红书平台样本",
-            "抖音": "## 抖音平台样本",
-            "今日头条": "## 今日头条平台样本",
-            "朋友圈": "## 朋友圈样本"
-        }
-        
-        start_marker = platform_markers.get(platform, platform_markers["小红书"])
-        start_pos = content.find(start_marker)
-        if start_pos == -1:
-            return []
-            
-        next_markers = [m for p, m in platform_markers.items() if p != platform]
-        end_pos = len(content)
-        for next_marker in next_markers:
-            pos = content.find(next_marker, start_pos + 1)
-            if pos != -1 and pos < end_pos:
-                end_pos = pos
-                
-        platform_content = content[start_pos:end_pos]
-        
-        samples = []
-        for line in platform_content.split('\n'):
-            line = line.strip()
-            if line.startswith('- "') and line.endswith('"'):
-                samples.append(line[3:-1])
-                
-        return samples
-    except FileNotFoundError:
-        print(f"警告：找不到爆款参考库文件 {file_path}")
-        return []
+    return get_material_library().few_shot_samples(platform)
 
 
 def generate_excel_output(state: SharedContext) -> str:
     """生成 Excel 格式的输出报告"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment, PatternFill
+
     wb = Workbook()
 
     # Sheet 1: 内容汇总
@@ -475,38 +753,120 @@ def generate_excel_output(state: SharedContext) -> str:
         ("人工介入篇数", len(state.get("need_manual_review", [])))
     ]
 
+    token_usage = state.get("metadata", {}).get("token_usage", {})
+    total_usage = token_usage.get("total")
+    if total_usage:
+        metadata_rows += [
+            ("LLM 调用次数", total_usage["calls"]),
+            ("本地缓存命中", total_usage["local_cache_hits"]),
+            ("输入 tokens", total_usage["prompt_tokens"]),
+            ("输出 tokens", total_usage["completion_tokens"]),
+            ("缓存命中 tokens", total_usage["prompt_cache_hit_tokens"]),
+            ("前缀缓存命中率", f"{total_usage['prompt_cache_hit_rate']:.1%}"),
+            ("预估费用(元)", round(total_usage["cost"], 4)),
+        ]
+
+    review_rounds = state.get("metadata", {}).get("review_rounds", [])
+    if review_rounds:
+        metadata_rows.append((
+            "审核复用（节省调用）",
+            " / ".join(f"第{r['attempt']}轮 {r['saved_review_calls']}" for r in review_rounds)
+        ))
+
+    queue_wait = state.get("metadata", {}).get("queue_wait")
+    if queue_wait:
+        metadata_rows.append((
+            "LLM 排队等待",
+            f"累计 {queue_wait['queue_wait_seconds']}s / 平均 {queue_wait['avg_queue_wait_ms']}ms / 最长 {queue_wait['max_queue_wait_ms']}ms"
+        ))
+        by_class = queue_wait.get("by_class", {})
+        if len(by_class) > 1:
+            metadata_rows.append((
+                "LLM 排队等待（按请求类别）",
+                " / ".join(f"{name} 平均 {stats['avg_queue_wait_ms']}ms" for name, stats in sorted(by_class.items()))
+            ))
+
+    gated_items = state.get("metadata", {}).get("reviewer", {}).get("gated_items", 0)
+    if gated_items:
+        metadata_rows.append(("硬性规则拦截（节省 LLM 审核）", gated_items))
+
+    speculative = format_speculative_summary(state)
+    if speculative:
+        metadata_rows.append(("推测式多候选", speculative))
+
+    material_cache = state.get("metadata", {}).get("material_cache")
+    if material_cache:
+        metadata_rows.append((
+            "参考材料缓存",
+            f"命中 {material_cache['hits']} / 未命中 {material_cache['misses']} / 缺失命中 {material_cache['negative_hits']} / "
+            f"重新加载 {material_cache['reloads']} / 淘汰 {material_cache['evictions']}"
+        ))
+
     for row_idx, (key, value) in enumerate(metadata_rows, 2):
         ws3.cell(row=row_idx, column=1, value=key)
         ws3.cell(row=row_idx, column=2, value=value)
 
+    # 按节点 / 按篇的 token 明细
+    row_idx = len(metadata_rows) + 3
+    usage_headers = ["维度", "调用次数", "输入tokens", "输出tokens", "缓存命中tokens", "费用(元)", "缓存命中率"]
+    for section, rows in (
+        ("按节点", token_usage.get("by_node", {}).items()),
+        ("按篇号", sorted(token_usage.get("by_article", {}).items(), key=lambda kv: int(kv[0]))),
+    ):
+        rows = list(rows)
+        if not rows:
+            continue
+        ws3.cell(row=row_idx, column=1, value=section).font = Font(bold=True)
+        row_idx += 1
+        for col_idx, header in enumerate(usage_headers, 1):
+            ws3.cell(row=row_idx, column=col_idx, value=header).font = Font(bold=True)
+        row_idx += 1
+        for key, bucket in rows:
+            label = f"篇{key}" if section == "按篇号" else key
+            values = [label, bucket["calls"], bucket["prompt_tokens"], bucket["completion_tokens"],
+                      bucket["prompt_cache_hit_tokens"], round(bucket["cost"], 4),
+                      f"{bucket.get('prompt_cache_hit_rate', 0.0):.1%}"]
+            for col_idx, value in enumerate(values, 1):
+                ws3.cell(row=row_idx, column=col_idx, value=value)
+            row_idx += 1
+        row_idx += 1
+
     # 调整列宽
     ws3.column_dimensions['A'].width = 15
     ws3.column_dimensions['B'].width = 30
+    for column in ("C", "D", "E", "F", "G"):
+        ws3.column_dimensions[column].width = 15
 
     # 保存文件
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"{state['user_input']['车型']}_{state['user_input']['平台']}_{timestamp}.xlsx"
-    output_path = f"04-产出仓库/{filename}"
+    # 批量任务给每行指定独立目录（metadata["output_dir"]），避免同秒同名文件互相覆盖
+    output_dir = state.get("metadata", {}).get("output_dir", config.OUTPUT_DIR)
+    output_path = os.path.join(output_dir, filename)
 
     # 确保输出目录存在
-    os.makedirs("04-产出仓库", exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
 
     wb.save(output_path)
 
     return output_path
 
 
+BANNED_WORDS = ['说实话', '但问题来了', '你看', '首先', '其次', '方面', '不得不说']
+PARAM_KEYWORDS = ['10气囊', 'ACE车身', '980Mpa', 'Honda SENSING', 'MM理念', '保值率']
+# 审核规则里的“词汇雷区”“语气雷区”，本地即可查出
+AI_CLICHE_WORDS = ['每到春节', '归心似箭', '保驾护航', '移动的家', '承载', '绝绝子', '无语子', '绝了', '服了', '简直']
+
+
 def check_banned_words(content: str) -> List[str]:
     """检查禁用词"""
-    banned = ['说实话', '但问题来了', '你看', '首先', '其次', '方面', '不得不说']
-    found = [word for word in banned if word in content]
+    found = [word for word in BANNED_WORDS if word in content]
     return found
 
 
 def count_params(content: str) -> int:
     """统计参数数量"""
-    params = ['10气囊', 'ACE车身', '980Mpa', 'Honda SENSING', 'MM理念', '保值率']
-    return sum(1 for p in params if p in content)
+    return sum(1 for p in PARAM_KEYWORDS if p in content)
 
 
 def check_scene_quality(content: str) -> Dict[str, any]:
@@ -620,182 +980,266 @@ def check_emotion_quality(content: str) -> Dict[str, any]:
     }
 
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=10),
-    retry=retry_if_exception_type((aiohttp.ClientError, asyncio.TimeoutError)),
-    reraise=True
-)
+# 审核 API 失败时的兜底结论（fallback 标记：不写缓存、不进审核备忘）
+_DEFAULT_REVIEW = {"passed": True, "score": 7, "issues": [], "suggestions": [], "fallback": True}
+
+
+def _strip_json_fence(raw_content: str) -> str:
+    raw_content = raw_content.strip()
+    if raw_content.startswith("```json"): raw_content = raw_content[7:]
+    if raw_content.startswith("```"): raw_content = raw_content[3:]
+    if raw_content.endswith("```"): raw_content = raw_content[:-3]
+    return raw_content.strip()
+
+
+def _review_cache_key(content: str, assignment: Dict) -> str:
+    # 单篇与批量审核共用同一个按篇的缓存 key，批量得到的结论也能被单篇复用
+    return LLMResponseCache.make_key(config.DEEPSEEK_MODEL, build_review_prompt(content, assignment), 0.1, 512)
+
+
+@traced_llm_call("review", request_class="review")
 async def evaluate_content_ai_flavor_async(content: str, assignment: Dict, api_key: str, api_url: str) -> Dict:
-    prompt = f"""你是一个极其严格的“反AI八股文”内容质检管家。你的目标是检查以下社交媒体文案是否含有“AI味”、“公关播音腔”或“套路化模板”。
-
-【审核内容】
-人设：{assignment['persona']}
-卖点：{assignment['selling_point']}
-正文：
-{content}
-
-【🔴 必须打回重写（不通过）的五大雷区】
-1. 词汇雷区：包含“每到春节”、“归心似箭”、“保驾护航”、“移动的家”、“不得不说”、“承载”等陈词滥调。
-2. 逻辑缺失雷区：文章没有建立【共鸣痛点/认知冲突 -> (视情况有竞品对比)方案抛出 -> 具体数字参数实证 -> 价值结论】的说服力链路，通篇只有无意义的情感情绪抒发或纯粹的感叹。
-3. 竞品拉踩与格式雷区：如果文章包含竞品对比，出现了恶意贬低、踩踏友商的词汇（拉踩）；或者在文章的标题、首句、文末#话题标签(发布文案)等位置直接出现了友商的车型名称（友商名只允许在正文探讨参数时出现）。
-4. 语气雷区：使用了“绝绝子”、“无语子”、“绝了”、“服了”、“简直”等低层次情绪词汇装作“碎碎念网感”，而没有展现出理性、精打细算懂车达人的真实软性评测质感。
-5. ⚠️ 数据空洞雷区（致命）：文中必须根据场景自然指出 1-2 个宏观大卖点（如动力、操控、空间等），并配合陈述 2-3 个具体的真实物理参数/专有名词（如：2701mm轴距、193匹马力、Honda SENSING 等）来支撑。如果全是“空间大”、“动力强”等虚词，未提及具体配置数据或技术名词，必须直接打回！
-
-请严格审核！给出 0-10 的“去AI味”评分（10分代表毫无AI味且数据扎实、极其像真人；低于7分判定为不通过）。
-必须仅以纯JSON格式返回，不要有任何多余字符，格式如下：
-{{
-  "passed": false,
-  "score": 5,
-  "issues": ["指出具体哪里有AI味，或者缺少具体配置数据支撑"],
-  "suggestions": ["给出具体怎么改的建议，包括补充什么类型的数据"]
-}}"""
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
+    prompt = build_review_prompt(content, assignment)
+    # 审核温度固定为 0.1，同一段文本的评审结果可以直接复用缓存
+    temperature, max_tokens = 0.1, 512
+    cache = get_llm_cache()
+    cache_key = None
+    if cache is not None:
+        cache_key = _review_cache_key(content, assignment)
+        cached = await cache.aget(cache_key)
+        if cached is not None:
+            record_local_cache_hit()
+            tracing.current_span().set_attribute("llm.cache_hit", True)
+            return json.loads(cached)
+
     payload = {
-        "model": "deepseek-chat",
+        "model": config.DEEPSEEK_MODEL,
         "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.1,
-        "max_tokens": 512
-    }
-    async with _api_semaphore:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(api_url, headers=headers, json=payload, timeout=60) as response:
-                try:
-                    response.raise_for_status()
-                    result = await response.json()
-                    raw_content = result['choices'][0]['message']['content'].strip()
-                    if raw_content.startswith("```json"): raw_content = raw_content[7:]
-                    if raw_content.startswith("```"): raw_content = raw_content[3:]
-                    if raw_content.endswith("```"): raw_content = raw_content[:-3]
-                    review_res = json.loads(raw_content.strip())
-                    return review_res
-                except Exception as e:
-                    print(f"[Reviewer API Error] {e}")
-                    # 解析失败时默认放行，避免无限循环打回
-                    return {"passed": True, "score": 7, "issues": [], "suggestions": []}
-
-def build_revision_prompt(customer_brief, assignment, original_content, issues, suggestions):
-    """
-    构建修改 Prompt
-    """
-    platform = customer_brief['平台']
-    platform_specs = {
-        "小红书": "100-300字，轻快、多Emoji、生活碎片感",
-        "抖音": "250-300字，短平快钩子多，极其口语化",
-        "今日头条": "650-800字，深度分析、新闻纪实感、带小标题的逻辑文",
-        "朋友圈": "50-150字，熟人语境极其简短的碎碎念"
+        "temperature": temperature,
+        "max_tokens": max_tokens
     }
-    spec = platform_specs.get(platform, "自然人类语气")
+    try:
+        result = await _chat_completion(payload, api_key, api_url)
+        parse_started = time.monotonic()
+        review_res = json.loads(_strip_json_fence(result['choices'][0]['message']['content']))
+        tracing.current_span().set_attribute("llm.parse_ms", _ms(time.monotonic() - parse_started))
+    except Exception as e:
+        print(f"[Reviewer API Error] {e}")
+        # 解析失败时默认放行，避免无限循环打回（兜底结果不写缓存）
+        return dict(_DEFAULT_REVIEW)
 
-    prompt = f"""你是一个顶级社交媒体达人。你之前针对【{platform}】写的一篇文案被判定为“不够真实”、“有AI味”或“不符合该平台的调性”，你需要根据反馈重新修改。
+    if cache is not None:
+        await cache.aset(cache_key, json.dumps(review_res, ensure_ascii=False))
+    return review_res
 
-【原内容】
-{original_content}
 
-【审核官的批评及雷区】
-{chr(10).join(f"- {issue}" for issue in issues)}
+def pack_review_batches(items: List[Dict], max_items: int, max_prompt_tokens: int) -> List[List[Dict]]:
+    """
+    按篇数上限与 prompt token 预算贪心装箱（按字数估算 token），单篇超预算时独占一批
+    """
+    overhead = len(build_batch_review_prompt([])) * config.TOKENS_PER_CHAR
+    batches, current, current_tokens = [], [], overhead
+    for item in items:
+        item_tokens = (len(item["content"]) + 40) * config.TOKENS_PER_CHAR
+        if current and (len(current) >= max_items or current_tokens + item_tokens > max_prompt_tokens):
+            batches.append(current)
+            current, current_tokens = [], overhead
+        current.append(item)
+        current_tokens += item_tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+@traced_llm_call("review.batch", request_class="review")
+async def evaluate_contents_batch_async(items: List[Dict], api_key: str, api_url: str) -> Dict[int, Dict]:
+    """
+    一次请求审核多篇，返回 {id: 审核结果}
+    请求失败或 JSON 解析失败时返回空字典；数组里缺失 / 格式不对的篇号不出现在结果中，由调用方逐篇兜底
+    """
+    payload = {
+        "model": config.DEEPSEEK_MODEL,
+        "messages": [{"role": "user", "content": build_batch_review_prompt(items)}],
+        "temperature": 0.1,
+        "max_tokens": min(config.REVIEW_BATCH_OUTPUT_TOKENS_PER_ITEM * len(items), 8192)
+    }
+    call_span = tracing.current_span()
+    call_span.set_attribute("article.ids", [item["id"] for item in items])
+    try:
+        result = await _chat_completion(payload, api_key, api_url)
+        parse_started = time.monotonic()
+        parsed = json.loads(_strip_json_fence(result['choices'][0]['message']['content']))
+        call_span.set_attribute("llm.parse_ms", _ms(time.monotonic() - parse_started))
+    except Exception as e:
+        print(f"[Reviewer Batch Error] {e}，{len(items)}篇改为逐篇审核")
+        return {}
+
+    if isinstance(parsed, dict):
+        parsed = parsed.get("results", [])
+    if not isinstance(parsed, list):
+        return {}
+
+    wanted = {str(item["id"]): item["id"] for item in items}
+    reviews = {}
+    for entry in parsed:
+        if not isinstance(entry, dict) or "passed" not in entry:
+            continue
+        article_id = wanted.get(str(entry.get("id")))
+        if article_id is None or article_id in reviews:
+            continue
+        reviews[article_id] = {
+            "passed": bool(entry.get("passed")),
+            "score": entry.get("score", 5),
+            "issues": list(entry.get("issues", [])),
+            "suggestions": list(entry.get("suggestions", [])),
+        }
+    return reviews
 
-【修改建议】
-{chr(10).join(f"- {suggestion}" for suggestion in suggestions)}
 
-【本篇设定】
-- 平台：{platform}（{spec}）
-- 人设：{assignment['persona']}
-- 核心卖点：{assignment['selling_point']}
+async def evaluate_contents_ai_flavor_async(items: List[Dict], api_key: str, api_url: str, stats: Optional[Dict] = None) -> Dict[int, Dict]:
+    """
+    审核多篇的统一入口：先查按篇缓存，未命中的按批打包；批量结果缺失的篇目逐篇兜底
+    items: [{"id", "content", "assignment"}]，stats 累计批量请求数 / 兜底篇数
+    """
+    stats = stats if stats is not None else {}
+    for key in ("batch_requests", "batched_items", "fallback_items", "single_requests"):
+        stats.setdefault(key, 0)
+
+    async def review_single(item):
+        stats["single_requests"] += 1
+        with usage_scope(article_id=item["id"]):
+            return item["id"], await evaluate_content_ai_flavor_async(item["content"], item["assignment"], api_key, api_url)
+
+    if not config.REVIEW_BATCH_ENABLED or len(items) <= 1:
+        return dict(await asyncio.gather(*[review_single(item) for item in items]))
+
+    reviews: Dict[int, Dict] = {}
+    pending = []
+    cache = get_llm_cache()
+    for item in items:
+        cached = await cache.aget(_review_cache_key(item["content"], item["assignment"])) if cache is not None else None
+        if cached is not None:
+            with usage_scope(article_id=item["id"]):
+                record_local_cache_hit()
+            reviews[item["id"]] = json.loads(cached)
+        else:
+            pending.append(item)
+
+    async def review_batch(batch):
+        if len(batch) == 1:
+            return dict([await review_single(batch[0])])
+        stats["batch_requests"] += 1
+        stats["batched_items"] += len(batch)
+        batch_reviews = await evaluate_contents_batch_async(batch, api_key, api_url)
+        if cache is not None:
+            for item in batch:
+                if item["id"] in batch_reviews:
+                    await cache.aset(_review_cache_key(item["content"], item["assignment"]),
+                                     json.dumps(batch_reviews[item["id"]], ensure_ascii=False))
+        missing = [item for item in batch if item["id"] not in batch_reviews]
+        if missing:
+            stats["fallback_items"] += len(missing)
+            batch_reviews.update(await asyncio.gather(*[review_single(item) for item in missing]))
+        return batch_reviews
+
+    batches = pack_review_batches(pending, config.REVIEW_BATCH_SIZE, config.REVIEW_BATCH_MAX_PROMPT_TOKENS)
+    for batch_reviews in await asyncio.gather(*[review_batch(batch) for batch in batches]):
+        reviews.update(batch_reviews)
+    return reviews
+
+async def revise_single_content(customer_brief: Dict, assignment: Dict, content_item: Dict, review: Dict, attempt: int, stats: Optional[Dict] = None) -> Dict:
+    """
+    异步修改单篇不通过的内容（与首轮 Writer 共用连接池、并发信号量和重试）
+    """
+    print(f"  [Writer] 正在修改第{content_item['id']}篇...")
+
+    # 构建包含修改建议的 Prompt
+    prompt = build_revision_prompt(
+        customer_brief,
+        assignment,
+        content_item["content"],
+        review["issues"],
+        review["suggestions"]
+    )
 
-【🔴 强制要求（违反视为再败）】
-1. 狠砸原来的机器骨架！不要标准四段式。请严格遵循【{platform}】的体裁来写！
-2. 彻底抛弃播音腔和公关词汇（禁用：缔造、保驾护航、移动的家、承载、不得不说等）。
-3. 务必满足审核官指出的字数与格式要求。直接输出修改后的正文（勿加注释）："""
+    try:
+        with article_scope("revise", content_item["id"], attempt, node="修改"):
+            generated = await generate_writer_candidates_async(
+                prompt,
+                customer_brief["平台"],
+                content_item["id"],
+                temperature=0.7,  # 降低随机性，提升字数控制
+                max_tokens=512,   # 限制最大长度
+                stats=stats
+            )
+        revised_content = generated["content"]
+    except Exception as e:
+        print(f"    ✗ 第{content_item['id']}篇修改失败：{e}")
+        # 失败时保留原内容
+        return content_item
 
-    return prompt
+    print(f"    ✓ 第{content_item['id']}篇修改完成（{len(revised_content)}字）")
+    return {
+        "id": content_item["id"],
+        "content": revised_content,
+        "persona": content_item["persona"],
+        "selling_point": content_item["selling_point"],
+        "attempt": attempt,
+        "truncated": generated["truncated"],
+        "revision_history": content_item.get("revision_history", []) + [{
+            "attempt": attempt - 1,
+            "issues": review["issues"],
+            "suggestions": review["suggestions"]
+        }]
+    }
 
 
-def revise_contents(state: SharedContext, failed_items: List[Dict], attempt: int) -> List[Dict]:
+async def revise_contents(state: SharedContext, failed_items: List[Dict], attempt: int) -> List[Dict]:
     """
-    修改不通过的内容
+    修改不通过的内容：所有不通过的篇目并发重写（受 CONCURRENT_LIMIT 约束），
+    结果按原 contents 顺序返回，本轮耗时记录到 metadata["revision_rounds"]
     """
     customer_brief = state["customer_brief"]
     planner_brief = state["planner_brief"]
     existing_contents = state["contents"]
 
-    # Deepseek API 配置
-    DEEPSEEK_API_KEY = config.DEEPSEEK_API_KEY
-    DEEPSEEK_API_URL = config.DEEPSEEK_API_URL
+    reviews_by_id = {r["id"]: r for r in failed_items}
+    assignments_by_id = {a["id"]: a for a in planner_brief["assignments"]}
 
-    # 保留通过的内容，重写不通过的内容
-    updated_contents = []
+    async def keep(content_item: Dict) -> Dict:
+        return content_item
 
+    # 保留通过的内容，重写不通过的内容
+    tasks = []
     for content_item in existing_contents:
-        # 查找对应的审核结果
-        review = next((r for r in failed_items if r["id"] == content_item["id"]), None)
-
+        review = reviews_by_id.get(content_item["id"])
         if review is None:
-            # 已通过，保留原内容
-            updated_contents.append(content_item)
+            tasks.append(keep(content_item))
         else:
-            # 需要修改
-            print(f"  [Writer] 正在修改第{content_item['id']}篇...")
-
-            # 找到对应的 assignment
-            assignment = next(
-                (a for a in planner_brief["assignments"] if a["id"] == content_item["id"]),
-                None
-            )
-
-            # 构建包含修改建议的 Prompt
-            prompt = build_revision_prompt(
-                customer_brief,
-                assignment,
-                content_item["content"],
-                review["issues"],
-                review["suggestions"]
-            )
-
-            # 调用 Deepseek API
-            try:
-                headers = {
-                    "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-                    "Content-Type": "application/json"
-                }
-
-                payload = {
-                    "model": "deepseek-chat",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.7,  # 降低随机性，提升字数控制
-                    "max_tokens": 512    # 限制最大长度
-                }
-
-                response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=60)
-                response.raise_for_status()
-
-                result = response.json()
-                revised_content = result['choices'][0]['message']['content'].strip()
-
-                # 更新内容
-                updated_item = {
-                    "id": content_item["id"],
-                    "content": revised_content,
-                    "persona": content_item["persona"],
-                    "selling_point": content_item["selling_point"],
-                    "attempt": attempt,
-                    "revision_history": content_item.get("revision_history", []) + [{
-                        "attempt": attempt - 1,
-                        "issues": review["issues"],
-                        "suggestions": review["suggestions"]
-                    }]
-                }
-
-                updated_contents.append(updated_item)
-                print(f"    ✓ 第{content_item['id']}篇修改完成（{len(revised_content)}字）")
-
-            except Exception as e:
-                print(f"    ✗ 第{content_item['id']}篇修改失败：{e}")
-                # 失败时保留原内容
-                updated_contents.append(content_item)
+            tasks.append(journaled_article(
+                state, "Writer", attempt, content_item["id"],
+                functools.partial(
+                    revise_single_content,
+                    customer_brief,
+                    assignments_by_id.get(content_item["id"]),
+                    content_item,
+                    review,
+                    attempt,
+                    state.setdefault("metadata", {}).setdefault("speculative", {})
+                ),
+                completed=lambda item, attempt=attempt: item.get("attempt") == attempt,
+            ))
+
+    started = time.perf_counter()
+    updated_contents = list(await asyncio.gather(*tasks))
+    wall_seconds = time.perf_counter() - started
+
+    print(f"  [Writer] 第{attempt}次修改轮完成：{len(reviews_by_id)}篇并发修改，耗时 {wall_seconds:.2f}s")
+    state.setdefault("metadata", {}).setdefault("revision_rounds", []).append({
+        "attempt": attempt,
+        "revised": len(reviews_by_id),
+        "wall_seconds": round(wall_seconds, 3)
+    })
 
     return updated_contents
 
@@ -876,7 +1320,7 @@ def 客户经理(state: SharedContext) -> SharedContext:
     return state
 
 
-def 策划者(state: SharedContext) -> SharedContext:
+async def 策划者(state: SharedContext) -> SharedContext:
     """
     职责：思考传播方向、输出 planner_brief（包含分配表）
     """
@@ -886,7 +1330,7 @@ def 策划者(state: SharedContext) -> SharedContext:
     skip_confirmations = state.get("skip_confirmations", False)
 
     # 读取参考材料
-    material = config.load_material("02-参考学习/02-策划者材料/传播方向案例库.md")
+    material = await config.aload_material("02-参考学习/02-策划者材料/传播方向案例库.md")
 
     # 生成分配表
     target_users = customer_brief["目标用户"]
@@ -898,9 +1342,9 @@ def 策划者(state: SharedContext) -> SharedContext:
     
     print(f"\n[策划者] 正在接收并解构宏观场景: '{direction}'...")
     try:
-        scene_match = scene_retriever.retrieve(direction)
-        enriched_scene_tags = asyncio.run(
-            map_scene_to_keywords_async(direction, config.DEEPSEEK_API_KEY, config.DEEPSEEK_API_URL)
+        scene_match = get_scene_retriever().retrieve(direction)
+        enriched_scene_tags = await map_scene_to_keywords_async(
+            direction, config.DEEPSEEK_API_KEY, config.DEEPSEEK_API_URL
         )
         print(
             "  -> 🧠 [动态推演] "
@@ -949,7 +1393,9 @@ def 策划者(state: SharedContext) -> SharedContext:
                 f"篇{a['id']}: {a['persona']} × {a['selling_point']} ({a['scene']})"
             )
 
-        confirmation = ask_user_confirmation(
+        # 命令行交互是阻塞的，放到线程里执行，避免卡住事件循环
+        confirmation = await asyncio.to_thread(
+            ask_user_confirmation,
             title="内容分配表确认",
             content={
                 "传播方向": planner_brief["传播方向"],
@@ -975,149 +1421,137 @@ def 策划者(state: SharedContext) -> SharedContext:
     return state
 
 
-def Writer(state: SharedContext) -> SharedContext:
+def load_writer_detail_samples() -> List[str]:
+    """从文件加载细节库，为空时使用默认样本"""
+    detail_library_path = "02-参考学习/03-Writer材料/内容变量库/细节描写库.md"
+    detail_samples = load_detail_library(detail_library_path)
+
+    if not detail_samples:
+        print("警告：细节库为空，使用默认样本")
+        detail_samples = [
+            "不用玩后备箱俄罗斯方块",
+            "老妈的腊肉、老爸的酒，一样都不落",
+            "后备箱盖一关，满满当当的安心"
+        ]
+    return detail_samples
+
+
+def prepare_writer_request(customer_brief: Dict, assignment: Dict, detail_samples: List[str]) -> Tuple[str, float, int]:
+    """
+    组装单篇首稿的 prompt（素材抽样 + 分平台参数），返回 (prompt, 温度, max_tokens)；
+    素材来自 MaterialLibrary 的内存索引，但每个素材文件都要 stat 一次确认没改过（改了还会重读重解析），
+    会碰磁盘：异步调用方放到线程池
+    """
+    # 加载材料库
+    selected_details = random_sample_details(detail_samples, k=3)
+    persona_samples = load_persona_samples(assignment['persona'])
+    persona_opening = random.sample(persona_samples.get("开场切入", [""]), min(2, len(persona_samples.get("开场切入", []))))
+    persona_pain = random.sample(persona_samples.get("痛点描述", [""]), min(2, len(persona_samples.get("痛点描述", []))))
+    scene_samples = load_scene_samples(customer_brief['方向'])
+    scene_trigger = random.sample(scene_samples.get("时间触发", [""]), min(2, len(scene_samples.get("时间触发", []))))
+    scene_emotion = random.sample(scene_samples.get("情感升华", [""]), min(2, len(scene_samples.get("情感升华", []))))
+
+    # ======= 分平台策略适配 =======
+    platform = customer_brief['平台']
+    spec = config.PLATFORM_SPECS.get(platform, config.PLATFORM_SPECS["小红书"]) # 默认小红书
+    
+    # [🔥 Phase 8 Task 2/4] 动态加载真实爆款 Few-Shot & 随机生成参数
+    hit_samples_full = load_few_shot_samples(platform)
+    hit_samples = random.sample(hit_samples_full, min(2, len(hit_samples_full))) if hit_samples_full else []
+    
+    # 随机化温度带来多样性 (防同质化)
+    dynamic_temp = round(random.uniform(0.6, 0.9), 2)
+    # 计算字数对应的近似 Max Tokens（使用 limits 元组的上限）
+    word_upper = spec.get('limits', (200, 400))[1]
+    dynamic_max_tokens = int(word_upper * 2.5) 
+
+    # 静态前缀（车型资料 + 规则块）在前，本篇变量在后，提升 DeepSeek 前缀缓存命中
+    prompt = build_writer_prompt(
+        customer_brief, assignment,
+        persona_opening, persona_pain, selected_details, hit_samples
+    )
+    return prompt, dynamic_temp, dynamic_max_tokens
+
+
+async def write_single_content(customer_brief: Dict, assignment: Dict, detail_samples: List[str], stats: Optional[Dict] = None) -> Dict:
+    """
+    异步创作单篇首稿（批量 Writer 节点和逐篇流水线共用）
+    """
+    print(f"  [Writer] 开始创作第{assignment['id']}篇（{assignment['persona']} - {assignment['selling_point']}）...")
+
+    platform = customer_brief['平台']
+    prompt, dynamic_temp, dynamic_max_tokens = await asyncio.to_thread(
+        prepare_writer_request, customer_brief, assignment, detail_samples
+    )
+
+    try:
+        # 注入动态温度和 Token 限制
+        with article_scope("write", assignment["id"], 1):
+            generated = await generate_writer_candidates_async(
+                prompt, platform, assignment["id"],
+                temperature=dynamic_temp, max_tokens=dynamic_max_tokens, stats=stats
+            )
+        content = generated["content"]
+        print(f"    ✓ 第{assignment['id']}篇创作完成（{len(content)}字）")
+        return {
+            "id": assignment["id"],
+            "content": content,
+            "persona": assignment["persona"],
+            "selling_point": assignment["selling_point"],
+            "attempt": 1,
+            "truncated": generated["truncated"],
+            "revision_history": []
+        }
+    except Exception as e:
+        print(f"    ✗ 第{assignment['id']}篇创作失败：{e}")
+        return {
+            "id": assignment["id"],
+            "content": f"[创作失败：{e}]",
+            "persona": assignment["persona"],
+            "selling_point": assignment["selling_point"],
+            "attempt": 1,
+            "revision_history": []
+        }
+
+
+@tracks_usage("Writer")
+async def Writer(state: SharedContext) -> SharedContext:
     """
     职责：根据分配任务创作内容（支持修改模式）
     """
     customer_brief = state["customer_brief"]
     planner_brief = state["planner_brief"]
     review_results = state.get("review_results", [])
-    current_attempt = state.get("current_attempt", 1)
 
     # 判断是首次创作还是修改模式
     is_revision = len(review_results) > 0
 
     if is_revision:
+        # 进入新一轮修改（路由函数只负责判断去向，不修改状态）
+        current_attempt = state.get("current_attempt", 1) + 1
+        state["current_attempt"] = current_attempt
         print(f"\n[Writer] 修改模式（第{current_attempt}次尝试）...")
         # 只处理不通过的内容
         failed_items = [r for r in review_results if not r["passed"]]
-        contents = revise_contents(state, failed_items, current_attempt)
+        contents = await revise_contents(state, failed_items, current_attempt)
     else:
         print(f"\n[Writer] 首次创作...")
         # 处理所有 assignments
         assignments = planner_brief["assignments"]
 
         # 读取参考材料
-        template = config.load_material("02-参考学习/03-Writer材料/结构模板库/春节返乡-情感路线.md")
-
-        # 从文件加载细节库
-        detail_library_path = "02-参考学习/03-Writer材料/内容变量库/细节描写库.md"
-        detail_samples = load_detail_library(detail_library_path)
-
-        if not detail_samples:
-            print("警告：细节库为空，使用默认样本")
-            detail_samples = [
-                "不用玩后备箱俄罗斯方块",
-                "老妈的腊肉、老爸的酒，一样都不落",
-                "后备箱盖一关，满满当当的安心"
-            ]
-
-        # Deepseek API 配置
-        DEEPSEEK_API_KEY = config.DEEPSEEK_API_KEY
-        DEEPSEEK_API_URL = config.DEEPSEEK_API_URL
+        template = await config.aload_material("02-参考学习/03-Writer材料/结构模板库/春节返乡-情感路线.md")
+        detail_samples = await asyncio.to_thread(load_writer_detail_samples)
+        speculative_stats = state.setdefault("metadata", {}).setdefault("speculative", {})
 
         # 并行创作所有内容
         async def create_single_content(assignment: Dict) -> Dict:
-            """异步创建单篇内容"""
-            print(f"  [Writer] 开始创作第{assignment['id']}篇（{assignment['persona']} - {assignment['selling_point']}）...")
-
-            # 加载材料库
-            selected_details = random_sample_details(detail_samples, k=3)
-            persona_samples = load_persona_samples(assignment['persona'])
-            persona_opening = random.sample(persona_samples.get("开场切入", [""]), min(2, len(persona_samples.get("开场切入", []))))
-            persona_pain = random.sample(persona_samples.get("痛点描述", [""]), min(2, len(persona_samples.get("痛点描述", []))))
-            scene_samples = load_scene_samples(customer_brief['方向'])
-            scene_trigger = random.sample(scene_samples.get("时间触发", [""]), min(2, len(scene_samples.get("时间触发", []))))
-            scene_emotion = random.sample(scene_samples.get("情感升华", [""]), min(2, len(scene_samples.get("情感升华", []))))
-
-            # ======= 分平台策略适配 =======
-            platform = customer_brief['平台']
-            spec = config.PLATFORM_SPECS.get(platform, config.PLATFORM_SPECS["小红书"]) # 默认小红书
-            
-            # [🔥 Phase 8 Task 2/4] 动态加载真实爆款 Few-Shot & 随机生成参数
-            hit_samples_full = load_few_shot_samples(platform)
-            hit_samples = random.sample(hit_samples_full, min(2, len(hit_samples_full))) if hit_samples_full else []
-            
-            # 随机化温度带来多样性 (防同质化)
-            dynamic_temp = round(random.uniform(0.6, 0.9), 2)
-            # 计算字数对应的近似 Max Tokens（使用 limits 元组的上限）
-            word_upper = spec.get('limits', (200, 400))[1]
-            dynamic_max_tokens = int(word_upper * 2.5) 
-
-            prompt = f"""你是一个深谙各个社交平台流量密码的顶级内容主理人。你现在要根据分配的信息，写一篇针对【{platform}】平台的关于汽车（{customer_brief['车型']}）的内容。
-
-【任务信息】
-- 车型：{customer_brief['车型']}
-- 平台：{platform}（目标篇幅：{spec['word_count']}）
-- 平台专属文风要求：{spec['style']}
-- 平台专属排版结构：{spec['structure']}
-- 方向：{customer_brief['方向']}
-- 调性：{customer_brief['调性']}
-
-【本篇分配】
-- 人设：{assignment['persona']}
-- 核心卖点：{assignment['selling_point']}
-- 场景：{assignment['scene']}
-
-【💎 核心要求：产品配置干货植入 (极其重要)】
-以下是关于该车型的官方专属打底知识。你**必须根据前面的场景，自然指出 1-2 个宏观卖点（如：动力、操控、科技配置、空间等），然后强行且自然地陈述 2-3 个具体的小卖点物理参数（如 2701mm轴距、193匹马力、Honda SENSING 等）来补充解释你的观点**！
-❌ 错误示范：“这车空间很大，装得下很多东西”、“动力充沛，随叫随到”、“非常安全，气囊很多”
-✅ 正确示范（具体数据支撑）：
-- （动力切入）：“起步太窜了，这**1.5T地球梦发动机**给的**193匹马力**真的不是盖的，一脚油门下去推背感绝了...”
-- （空间切入）：“后备箱空间变态大，**2701mm的轴距**使得第二排腿部空间超级富裕，哪怕放了**儿童推车**也不用折叠直接怼进去了哈~”
-- （安全切入）：“刚才雨雪天路滑，差点被旁边的货车挤到，多亏**Honda SENSING**警报疯狂介入，而且想想要是真撞了，毕竟全系标配**10个安全气囊**外加**ACE承载式车身**，心里也很有底。”
-<车型专属资料>
-{customer_brief.get('车型专属打底知识', '暂无详细资料，请结合大众对该车型的认知。')}
-</车型专属资料>
-
-【🔴 极其严厉的文风与逻辑规则（违反任何一条视为失败）】
-0. **【字数红线】**：必须严格控制在 **{spec['word_count']}** 的区间内！写完后在心里默数一遍字数，坚决不准超出上限或低于下限！
-1. **【痛点营销逻辑强制】**：全文必须包含清晰的说服逻辑链路：【共鸣痛点/受众认知】 -> 【制造选车纠结/点出痛点】 -> 【抛出本品核心硬核参数降维打击】 -> 【价值升华/结论抛出】。
-2. **【拒绝低级口语化】**：绝对禁止使用任何公关广告腔调。同时也**绝不使用**“绝绝子”、“无语子”、“太”、“简直”、“哎”、“服了”等低级情绪词汇。你要表现得像一个懂车且理性、精打细算的导购达人/评测博主，语气干练扎实，用“这波操作确实很香”、“性价比没得说”、“精准戳中需求”等沉稳词汇。
-3. **【极其严格的竞品对比红线（条件触发）】**：如果在方向/场景中涉及“对比”，你必须引入友商热门竞品作为锚点，用具体的参数对比进行说服。但必须遵守两点铁律：
-   A. **绝对不准“拉踩”**：对比时必须客观甚至肯定友商长处，禁止使用任何贬低、攻击性词汇去踩踏竞品。
-   B. **标题与标签区隔离**：如果你的输出带有标题、开头引导语或文末的 #话题标签（发布文案），这些区域**绝对禁止**出现友商车型名称！友商名字只允许在探讨具体参数的**正文中间段落**客观出现。对于不需要对标的主题，则专注讲透本品数据即可。
-4. **【拒绝堆砌参数】**：不要像念说明书一样单列数据段落。必须在解决痛点的对话场景中自然连贯地引出（例：“比起硬上入门款的配置，不如看看这台车的1.5T地球梦发动机，182匹给到的充沛储备才是务实之选”）。
-5. **名字灵活**。不要频繁正经地喊出“本田CR-V”。你可以叫它“这台车”、“同级标杆”或者只提一次“CR-V”。
-
-【参考素材（融合这些灵感，但千万别照抄，体会"感觉"）】
-1. 人设起步参考：
-{chr(10).join(f"   - {sample}" for sample in persona_opening[:2]) if persona_opening else "   - （无样本）"}
-
-2. 痛点场景参考：
-{chr(10).join(f"   - {sample}" for sample in persona_pain[:2]) if persona_pain else "   - （无样本）"}
-
-3. 具体细节库随机抽取：
-{chr(10).join(f"   - {detail}" for detail in selected_details)}
-
-【🔥 真实人类爆款感觉示例 (Few-Shot 注入) 🔥】
-请深深体会以下真实高赞帖文的断句、网感和神经质的真实感，**照着这个调性写你的初稿**：
-{chr(10).join(f"- '{sample}'" for sample in hit_samples) if hit_samples else "- （暂无该平台参照，请紧贴平台原生风格）"}
-
-直接开始写你的真实碎片（直接输出正文，不要有任何前缀或解释）："""
-
-            try:
-                # 注入动态温度和 Token 限制
-                content = await call_deepseek_api_async(prompt, DEEPSEEK_API_KEY, DEEPSEEK_API_URL, temperature=dynamic_temp, max_tokens=dynamic_max_tokens)
-                print(f"    ✓ 第{assignment['id']}篇创作完成（{len(content)}字）")
-                return {
-                    "id": assignment["id"],
-                    "content": content,
-                    "persona": assignment["persona"],
-                    "selling_point": assignment["selling_point"],
-                    "attempt": 1,
-                    "revision_history": []
-                }
-            except Exception as e:
-                print(f"    ✗ 第{assignment['id']}篇创作失败：{e}")
-                return {
-                    "id": assignment["id"],
-                    "content": f"[创作失败：{e}]",
-                    "persona": assignment["persona"],
-                    "selling_point": assignment["selling_point"],
-                    "attempt": 1,
-                    "revision_history": []
-                }
+            # 失败稿不记日志，续跑时重新创作
+            return await journaled_article(
+                state, "Writer", 1, assignment["id"],
+                functools.partial(write_single_content, customer_brief, assignment, detail_samples, speculative_stats),
+                completed=lambda item: not item["content"].startswith("[创作失败"),
+            )
 
         async def create_contents_parallel():
             """并行创建所有内容"""
@@ -1125,7 +1559,7 @@ def Writer(state: SharedContext) -> SharedContext:
             return await asyncio.gather(*tasks)
 
         # 运行并行创作
-        contents = asyncio.run(create_contents_parallel())
+        contents = await create_contents_parallel()
         # 按 id 排序确保顺序一致
         contents = sorted(contents, key=lambda x: x["id"])
 
@@ -1135,7 +1569,157 @@ def Writer(state: SharedContext) -> SharedContext:
     return state
 
 
-def 审核者(state: SharedContext) -> SharedContext:
+# 分平台字数要求（审核口径）
+REVIEW_WORD_LIMITS = {
+    "小红书": (100, 300),
+    "抖音": (250, 350),
+    "今日头条": (650, 800),
+    "朋友圈": (20, 200)
+}
+
+
+def hard_check_content(content_item: Dict, platform: str) -> Tuple[List[str], List[str]]:
+    """
+    硬性审核：字数 / 截断 / 禁用词 / 参数数量，返回 (issues, suggestions)
+    """
+    content = content_item["content"]
+    issues = []
+    suggestions = []
+
+    min_words, max_words = REVIEW_WORD_LIMITS.get(platform, (200, 400))
+
+    word_count = len(content)
+    if content_item.get("truncated"):
+        # 流式生成超出平台上限被提前截断，正文不完整
+        issues.append(f"生成内容超出【{platform}】字数上限被提前截断，正文不完整")
+        suggestions.append(f"整体压缩篇幅，完整收尾并控制在 {min_words}-{max_words} 字区间")
+    elif not (min_words <= word_count <= max_words):
+        issues.append(f"字数与【{platform}】要求不符（当前{word_count}字，合理区间为 {min_words}-{max_words}字）")
+        suggestions.append(f"调整字数至 {min_words}-{max_words} 字区间")
+
+    banned_found = check_banned_words(content)
+    if banned_found:
+        issues.append(f"包含禁用词：{', '.join(banned_found)}")
+        suggestions.append(f"删除禁用词：{', '.join(banned_found)}")
+
+    param_count = count_params(content)
+    if param_count > 2:
+        issues.append(f"参数过多（当前{param_count}个，要求≤2个）")
+        suggestions.append("减少参数使用，用场景描写替代参数堆砌")
+    return issues, suggestions
+
+
+def build_review_result(content_item: Dict, issues: List[str], suggestions: List[str], llm_eval: Dict) -> Dict:
+    """合并硬性审核与 LLM 审核结果"""
+    issues = list(issues)
+    suggestions = list(suggestions)
+    if not llm_eval.get("passed", False):
+        issues.extend(llm_eval.get("issues", []))
+        suggestions.extend(llm_eval.get("suggestions", []))
+
+    passed = len(issues) == 0
+    return {
+        "id": content_item["id"],
+        "passed": passed,
+        "issues": issues,
+        "suggestions": suggestions if not passed else [],
+        "quality_scores": {
+            "scene": llm_eval.get("score", 5),
+            "emotion": llm_eval.get("score", 5)
+        }
+    }
+
+
+# 审核规则指纹：LLM 审核 prompt 与硬性规则任何一项变化，备忘里的旧结论都会失效
+_REVIEW_RUBRIC_FINGERPRINT = hashlib.sha256(json.dumps(
+    [build_review_prompt("", {"persona": "", "selling_point": ""}), build_batch_review_prompt([]),
+     REVIEW_WORD_LIMITS, BANNED_WORDS, PARAM_KEYWORDS],
+    ensure_ascii=False, sort_keys=True
+).encode("utf-8")).hexdigest()
+
+
+def review_memo_key(content_item: Dict, assignment: Dict, platform: str) -> str:
+    """审核备忘 key = hash(审核规则, 平台, 人设 / 卖点, 正文, 是否截断)"""
+    raw = json.dumps([
+        _REVIEW_RUBRIC_FINGERPRINT,
+        platform,
+        assignment.get("persona"),
+        assignment.get("selling_point"),
+        content_item["content"],
+        bool(content_item.get("truncated")),
+    ], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def find_assignment(planner_brief: Dict, article_id: int) -> Dict:
+    return next(
+        (a for a in planner_brief["assignments"] if a["id"] == article_id),
+        {"persona": "未知", "selling_point": "未知"}
+    )
+
+
+def local_soft_feedback(content: str) -> Tuple[List[str], List[str]]:
+    """
+    本地软性反馈：LLM 审核被硬性规则拦下时，用它补齐修改意见，
+    让修改 prompt 仍拿到完整的问题清单（套话 / 数据空洞 / 场景与情感建议）
+    """
+    issues = []
+    suggestions = []
+
+    cliches = [word for word in AI_CLICHE_WORDS if word in content]
+    if cliches:
+        issues.append(f"包含AI八股套话：{', '.join(cliches)}")
+        suggestions.append("删掉套话和低层次情绪词，换成理性、具体的真实体验")
+
+    if count_params(content) == 0 and not any(ch.isdigit() for ch in content):
+        issues.append("缺少具体配置数据支撑（通篇没有参数或技术名词）")
+        suggestions.append("结合场景补充 2-3 个真实配置参数或技术名词")
+
+    suggestions.extend(check_scene_quality(content)["feedback"])
+    suggestions.extend(check_emotion_quality(content)["feedback"])
+    return issues, suggestions
+
+
+# 被硬性规则拦下、未调用 LLM 的审核占位（gated 标记：不进审核备忘）
+_GATED_REVIEW = {"passed": True, "score": 5, "issues": [], "suggestions": [], "gated": True}
+
+
+def should_call_llm_reviewer(hard_issues: List[str], attempt: int) -> bool:
+    """
+    分级审核闸门（Config.REVIEW_GATE_MODE）：
+    - off：始终调用 LLM 审核（旧行为）
+    - gate：硬性规则不通过的篇目反正要打回，跳过 LLM 审核
+    - lazy：同 gate，但最后一轮（不会再修改）补调 LLM，给人工介入一份完整意见
+    """
+    mode = config.REVIEW_GATE_MODE
+    if mode == "off" or not hard_issues:
+        return True
+    return mode == "lazy" and attempt >= 3
+
+
+def build_gated_review(content_item: Dict, issues: List[str], suggestions: List[str]) -> Dict:
+    soft_issues, soft_suggestions = local_soft_feedback(content_item["content"])
+    return build_review_result(content_item, issues + soft_issues, suggestions + soft_suggestions, _GATED_REVIEW)
+
+
+async def review_single_content(content_item: Dict, assignment: Dict, platform: str, attempt: int = 1, stats: Optional[Dict] = None) -> Dict:
+    """
+    逐篇审核（流水线模式用）：硬性审核 → （闸门放行时）单篇 LLM 审核
+    """
+    issues, suggestions = hard_check_content(content_item, platform)
+    if not should_call_llm_reviewer(issues, attempt):
+        if stats is not None:
+            stats["gated_items"] = stats.get("gated_items", 0) + 1
+        return build_gated_review(content_item, issues, suggestions)
+    with article_scope("review", content_item["id"], attempt, node="审核者"):
+        llm_eval = await evaluate_content_ai_flavor_async(
+            content_item["content"], assignment, config.DEEPSEEK_API_KEY, config.DEEPSEEK_API_URL
+        )
+    return build_review_result(content_item, issues, suggestions, llm_eval)
+
+
+@tracks_usage("审核者")
+async def 审核者(state: SharedContext) -> SharedContext:
     """
     职责：检查内容、生成修改建议、控制循环
     """
@@ -1146,66 +1730,63 @@ def 审核者(state: SharedContext) -> SharedContext:
     DEEPSEEK_API_KEY = config.DEEPSEEK_API_KEY
     DEEPSEEK_API_URL = config.DEEPSEEK_API_URL
 
-    async def review_all_contents():
-        async def review_single(content_item):
-            content = content_item["content"]
-            issues = []
-            suggestions = []
-            
-            # === 硬性审核 ===
-            platform = state.get("customer_brief", {}).get("平台", "小红书")
-            
-            # 分平台字数要求
-            platform_limits = {
-                "小红书": (100, 300),
-                "抖音": (250, 350),
-                "今日头条": (650, 800),
-                "朋友圈": (20, 200)
-            }
-            min_words, max_words = platform_limits.get(platform, (200, 400))
-            
-            word_count = len(content)
-            if not (min_words <= word_count <= max_words):
-                issues.append(f"字数与【{platform}】要求不符（当前{word_count}字，合理区间为 {min_words}-{max_words}字）")
-                suggestions.append(f"调整字数至 {min_words}-{max_words} 字区间")
-
-            banned_found = check_banned_words(content)
-            if banned_found:
-                issues.append(f"包含禁用词：{', '.join(banned_found)}")
-                suggestions.append(f"删除禁用词：{', '.join(banned_found)}")
-
-            param_count = count_params(content)
-            if param_count > 2:
-                issues.append(f"参数过多（当前{param_count}个，要求≤2个）")
-                suggestions.append("减少参数使用，用场景描写替代参数堆砌")
-
-            # === AI味智能审核 (LLM) ===
-            assignment = next((a for a in planner_brief["assignments"] if a["id"] == content_item["id"]), {"persona": "未知", "selling_point": "未知"})
-            llm_eval = await evaluate_content_ai_flavor_async(content, assignment, DEEPSEEK_API_KEY, DEEPSEEK_API_URL)
-            
-            if not llm_eval.get("passed", False):
-                issues.extend(llm_eval.get("issues", []))
-                suggestions.extend(llm_eval.get("suggestions", []))
-                
-            passed = len(issues) == 0
-            
-            return {
-                "id": content_item["id"],
-                "passed": passed,
-                "issues": issues,
-                "suggestions": suggestions if not passed else [],
-                "quality_scores": {
-                    "scene": llm_eval.get("score", 5),
-                    "emotion": llm_eval.get("score", 5)
-                }
-            }
-        
-        tasks = [review_single(item) for item in contents]
-        return await asyncio.gather(*tasks)
+    platform = state.get("customer_brief", {}).get("平台", "小红书")
 
-    # 运行异步审核
-    review_results = asyncio.run(review_all_contents())
+    # 正文与审核规则都没变的篇目（通过的篇目、修改失败保留原文的篇目）直接复用上一轮结论
+    review_memo = state.get("review_memo") or {}
+    assignments = {c["id"]: find_assignment(planner_brief, c["id"]) for c in contents}
+    memo_keys = {c["id"]: review_memo_key(c, assignments[c["id"]], platform) for c in contents}
+    to_review = [c for c in contents if memo_keys[c["id"]] not in review_memo]
+
+    # === 第一级：硬性审核（本地、确定性）===
+    hard_checks = {c["id"]: hard_check_content(c, platform) for c in to_review}
+    attempt = state.get("current_attempt", 1)
+    gated_ids = {c["id"] for c in to_review if not should_call_llm_reviewer(hard_checks[c["id"]][0], attempt)}
+
+    # === 第二级：AI味智能审核 (LLM)，只审硬性规则放行的篇目；开启批量审核时多篇合并为一次请求 ===
+    review_items = [
+        {
+            "id": content_item["id"],
+            "content": content_item["content"],
+            "assignment": assignments[content_item["id"]],
+        }
+        for content_item in to_review
+        if content_item["id"] not in gated_ids
+    ]
+    reviewer_stats = state.setdefault("metadata", {}).setdefault("reviewer", {})
+    reviewer_stats["gated_items"] = reviewer_stats.get("gated_items", 0) + len(gated_ids)
+    llm_evals = await evaluate_contents_ai_flavor_async(review_items, DEEPSEEK_API_KEY, DEEPSEEK_API_URL, stats=reviewer_stats)
+
+    review_results = []
+    for content_item in contents:
+        memo_key = memo_keys[content_item["id"]]
+        if memo_key in review_memo:
+            review_results.append(dict(review_memo[memo_key], id=content_item["id"]))
+            continue
+        issues, suggestions = hard_checks[content_item["id"]]
+        if content_item["id"] in gated_ids:
+            # 被硬性规则拦下：不调 LLM，用本地软性反馈补齐修改意见
+            review_results.append(build_gated_review(content_item, issues, suggestions))
+            continue
+        llm_eval = llm_evals.get(content_item["id"], _DEFAULT_REVIEW)
+        result = build_review_result(content_item, issues, suggestions, llm_eval)
+        if not llm_eval.get("fallback"):
+            review_memo[memo_key] = result
+        review_results.append(result)
     review_results = sorted(review_results, key=lambda x: x["id"])
+    state["review_memo"] = review_memo
+
+    memo_hits = len(contents) - len(to_review)
+    state["metadata"].setdefault("review_rounds", []).append({
+        "attempt": state.get("current_attempt", 1),
+        "reviewed": len(to_review),
+        "memo_hits": memo_hits,
+        "saved_review_calls": memo_hits,
+    })
+    if memo_hits:
+        print(f"[审核者] 本轮 {memo_hits} 篇正文未变，复用上一轮审核结论，节省 {memo_hits} 次 LLM 审核调用")
+    if gated_ids:
+        print(f"[审核者] 本轮 {len(gated_ids)} 篇未过硬性规则，跳过 LLM 审核（累计省下 {reviewer_stats['gated_items']} 次）")
 
     # 打印调试信息
     for r in review_results:
@@ -1218,10 +1799,140 @@ def 审核者(state: SharedContext) -> SharedContext:
 
     passed_count = sum(1 for r in review_results if r["passed"])
     print(f"[审核者] 审核完成：{passed_count}/{len(contents)} 篇通过")
+    if reviewer_stats.get("batch_requests"):
+        print(f"[审核者] 批量审核累计 {reviewer_stats['batch_requests']} 次请求覆盖 {reviewer_stats['batched_items']} 篇，"
+              f"逐篇兜底 {reviewer_stats['fallback_items']} 篇")
+
+    record_run_snapshots(state)
+
+    # 超过3次仍不通过 → 标记人工介入（状态修改必须在节点内完成，路由函数的修改不会被保留）
+    failed_ids = [r["id"] for r in review_results if not r["passed"]]
+    if failed_ids and state.get("current_attempt", 1) >= 3:
+        state["need_manual_review"] = failed_ids
+    elif failed_ids and would_exceed_budget(state, len(failed_ids)):
+        state["metadata"]["budget_exhausted"] = True
+        state["need_manual_review"] = failed_ids
+
+    print_usage_summary(state, "审核者")
 
     return state
 
 
+def record_run_snapshots(state: SharedContext) -> None:
+    """把响应缓存、材料缓存、并发限制器与本运行排队等待的当前状态写入运行元数据"""
+    metadata = state.setdefault("metadata", {})
+    cache = get_llm_cache()
+    if cache is not None:
+        metadata["llm_cache"] = cache.snapshot()
+    limiter = _get_api_limiter()
+    metadata["api_limiter"] = limiter.snapshot()
+    queue_wait = limiter.flow_snapshot(state.get("run_id") or "default")
+    if queue_wait is not None:
+        metadata["queue_wait"] = queue_wait
+    metadata["material_cache"] = get_material_cache().snapshot()
+
+
+def run_flow_scope(run_id: str, run_class: str):
+    """本运行的 LLM 请求归到调度流 run_id，按运行类别取优先级 / 权重"""
+    scheduling = config.SCHEDULER_RUN_CLASSES.get(run_class, config.SCHEDULER_RUN_CLASSES["interactive"])
+    return flow_scope(run_id, priority=scheduling["priority"], weight=scheduling["weight"])
+
+
+def print_usage_summary(state: SharedContext, role: str) -> None:
+    total_usage = state.get("metadata", {}).get("token_usage", {}).get("total", {})
+    if total_usage:
+        print(f"[{role}] 累计 {total_usage['calls']} 次调用，"
+              f"{total_usage['prompt_tokens'] + total_usage['completion_tokens']} tokens，"
+              f"约 ¥{total_usage['cost']:.4f}，前缀缓存命中率 {total_usage['prompt_cache_hit_rate']:.1%}")
+
+
+@tracks_usage("Writer")
+async def 流水线(state: SharedContext) -> SharedContext:
+    """
+    职责：逐篇流水线（Config.PIPELINE_MODE）
+
+    每篇独立走 写作 → 审核 → 修改 → 审核 …，最多 3 次尝试，共享同一个并发限制器；
+    没有 Writer / 审核者 之间的整批屏障，慢稿只拖慢自己，总耗时趋近最慢的单篇链路。
+    全部完成后再按 id 汇总成与批量模式相同的 contents / review_results。
+    """
+    print("\n[流水线] 逐篇执行 写作 → 审核 → 修改 ...")
+
+    customer_brief = state["customer_brief"]
+    planner_brief = state["planner_brief"]
+    platform = customer_brief["平台"]
+    max_attempts = 3  # 与 route_after_review 的上限一致
+    detail_samples = await asyncio.to_thread(load_writer_detail_samples)
+    reviewer_stats = state.setdefault("metadata", {}).setdefault("reviewer", {})
+    speculative_stats = state["metadata"].setdefault("speculative", {})
+    started = time.perf_counter()
+
+    async def run_article_chain(assignment: Dict) -> Dict:
+        content_item = await write_single_content(customer_brief, assignment, detail_samples, speculative_stats)
+        attempt = 1
+        while True:
+            review = await review_single_content(content_item, assignment, platform, attempt, stats=reviewer_stats)
+            status = "通过" if review["passed"] else "不通过"
+            print(f"  [流水线] 篇{assignment['id']} 第{attempt}次审核{status}")
+            if review["passed"] or attempt >= max_attempts:
+                break
+            if would_exceed_budget(state, 1):
+                state["metadata"]["budget_exhausted"] = True
+                break
+            attempt += 1
+            content_item = await revise_single_content(customer_brief, assignment, content_item, review, attempt, speculative_stats)
+        return {"content": content_item, "review": review, "attempt": attempt,
+                "seconds": time.perf_counter() - started}
+
+    async def run_article(assignment: Dict):
+        # 整篇链路结束才记日志；中断续跑时已完成的篇目直接取回
+        with tracing.span("article", {"article.id": assignment["id"]}) as span:
+            result = await journaled_article(state, "流水线", 0, assignment["id"], functools.partial(run_article_chain, assignment))
+            span.set_attribute("article.attempts", result["attempt"])
+        return result["content"], result["review"], result["attempt"], result["seconds"]
+
+    results = await asyncio.gather(*[run_article(a) for a in planner_brief["assignments"]])
+    wall_seconds = time.perf_counter() - started
+
+    results = sorted(results, key=lambda r: r[0]["id"])
+    state["contents"] = [content_item for content_item, _, _, _ in results]
+    state["review_results"] = [review for _, review, _, _ in results]
+    state["current_attempt"] = max((attempt for _, _, attempt, _ in results), default=1)
+    state["need_manual_review"] = [review["id"] for _, review, _, _ in results if not review["passed"]]
+    state.setdefault("metadata", {})["pipeline"] = {
+        "wall_seconds": round(wall_seconds, 3),
+        "article_seconds": {str(c["id"]): round(t, 3) for c, _, _, t in results},
+        "attempts": {str(c["id"]): attempt for c, _, attempt, _ in results},
+    }
+
+    passed_count = len(results) - len(state["need_manual_review"])
+    print(f"[流水线] 完成：{passed_count}/{len(results)} 篇通过，耗时 {wall_seconds:.2f}s，"
+          f"硬性规则拦截省下 {reviewer_stats.get('gated_items', 0)} 次 LLM 审核")
+    record_run_snapshots(state)
+    print_usage_summary(state, "流水线")
+
+    return state
+
+
+def would_exceed_budget(state: SharedContext, failed_count: int) -> bool:
+    """
+    预估再跑一轮修改（每篇 1 次重写 + 1 次复审）后是否会超出单次运行预算
+    """
+    metadata = state.setdefault("metadata", {})
+    budget = metadata.get("budget_yuan", config.RUN_BUDGET_YUAN)
+    if budget is None:
+        return False
+
+    ledger = UsageLedger(metadata)
+    rewrite_cost = ledger.average_cost("修改") or ledger.average_cost("Writer")
+    projected = ledger.total_cost + failed_count * (rewrite_cost + ledger.average_cost("审核者"))
+    if projected <= budget:
+        return False
+
+    print(f"[审核者] 预算告警：已花费 ¥{ledger.total_cost:.4f}，再修改一轮预计 ¥{projected:.4f}，"
+          f"超出上限 ¥{budget:.4f}，停止修改")
+    return True
+
+
 def route_after_review(state: SharedContext) -> str:
     """
     审核后的路由逻辑
@@ -1241,16 +1952,18 @@ def route_after_review(state: SharedContext) -> str:
         print(f"[路由] 全部通过，进入输出校订者")
         return "输出校订者"
 
-    # 超过3次 → 人工介入
+    # 预算耗尽 → 不再修改，直接人工介入（need_manual_review 已由审核者标记）
+    if state.get("metadata", {}).get("budget_exhausted"):
+        print(f"[路由] 预算已耗尽，{len(failed_items)}篇转人工介入")
+        return "输出校订者"
+
+    # 超过3次 → 人工介入（need_manual_review 已由审核者标记）
     if current_attempt >= 3:
         print(f"[路由] 已尝试{current_attempt}次，进入人工介入流程")
-        # 标记需要人工介入的内容
-        state["need_manual_review"] = [item["id"] for item in failed_items]
         return "输出校订者"
 
-    # 返回 Writer 修改
+    # 返回 Writer 修改（attempt 计数由 Writer 修改模式递增）
     print(f"[路由] 第{current_attempt}次尝试，{len(failed_items)}篇需要修改，返回 Writer")
-    state["current_attempt"] = current_attempt + 1
     return "Writer"
 
 
@@ -1268,8 +1981,10 @@ def 输出校订者(state: SharedContext) -> SharedContext:
     anti_ai_style = config.load_material("02-参考学习/05-输出校订者材料/Anti-AI-style特征库.md")
 
     # 生成 Excel 输出
+    record_run_snapshots(state)
     try:
-        output_path = generate_excel_output(state)
+        with tracing.span("excel.write"):
+            output_path = generate_excel_output(state)
         state["final_output"] = output_path
         print(f"[输出校订者] 已输出到：{output_path}")
     except Exception as e:
@@ -1301,6 +2016,9 @@ def 输出校订者(state: SharedContext) -> SharedContext:
     manual_count = len(need_manual_review)
     print(f"  - 通过：{passed_count}篇")
     print(f"  - 需要人工介入：{manual_count}篇")
+    speculative = format_speculative_summary(state)
+    if speculative:
+        print(f"  - 多候选：{speculative}")
 
     return state
 
@@ -1309,22 +2027,31 @@ def 输出校订者(state: SharedContext) -> SharedContext:
 # @main (Orchestrator) - 流程编排
 # ============================================================================
 
-def create_swarm() -> StateGraph:
-    """
-    创建 Agent Swarm 流程图
-    """
+def _build_swarm_graph():
+    """按当前 Config.PIPELINE_MODE 搭建（未编译的）Agent Swarm 流程图"""
+    from langgraph.graph import StateGraph, END
+
     workflow = StateGraph(SharedContext)
 
     # 添加业务角色节点
-    workflow.add_node("客户经理", 客户经理)
-    workflow.add_node("策划者", 策划者)
-    workflow.add_node("Writer", Writer)
-    workflow.add_node("审核者", 审核者)
-    workflow.add_node("输出校订者", 输出校订者)
+    workflow.add_node("客户经理", tracing.traced_node("客户经理", 客户经理))
+    workflow.add_node("策划者", tracing.traced_node("策划者", 策划者))
+    workflow.add_node("输出校订者", tracing.traced_node("输出校订者", 输出校订者))
 
     # 定义流程（@main 的调度逻辑）
     workflow.set_entry_point("客户经理")
     workflow.add_edge("客户经理", "策划者")
+    workflow.add_edge("输出校订者", END)
+
+    if config.PIPELINE_MODE:
+        # 逐篇流水线：写作 / 审核 / 修改在单篇内部循环，没有整批屏障
+        workflow.add_node("流水线", tracing.traced_node("流水线", 流水线))
+        workflow.add_edge("策划者", "流水线")
+        workflow.add_edge("流水线", "输出校订者")
+        return workflow
+
+    workflow.add_node("Writer", tracing.traced_node("Writer", Writer))
+    workflow.add_node("审核者", tracing.traced_node("审核者", 审核者))
     workflow.add_edge("策划者", "Writer")
     workflow.add_edge("Writer", "审核者")
 
@@ -1338,9 +2065,223 @@ def create_swarm() -> StateGraph:
         }
     )
 
-    workflow.add_edge("输出校订者", END)
+    return workflow
+
+
+# 编译好的流程图按 PIPELINE_MODE 缓存，一个进程只编译一次
+_compiled_swarms: Dict[bool, object] = {}
+_compiled_swarms_lock = threading.Lock()
+
+
+def create_swarm(checkpointer=None):
+    """
+    创建 Agent Swarm 流程图（编译结果进程内缓存）
+
+    Writer / 审核者 / 策划者 均为 async 节点，请使用 ainvoke / astream 驱动，
+    或直接调用 arun_swarm / astream_swarm / run_swarm_sync。
+
+    Args:
+        checkpointer: LangGraph 检查点存储（见 run_store.open_checkpointer），
+            挂上后以 thread_id = 运行编号 记录每个节点完成后的状态，可断点续跑。
+            检查点按运行打开（SQLite 连接随运行关闭），所以只缓存不挂检查点的编译结果，
+            每次返回挂上本次检查点的浅拷贝，不重新编译
+    """
+    key = bool(config.PIPELINE_MODE)
+    with _compiled_swarms_lock:
+        compiled = _compiled_swarms.get(key)
+        if compiled is None:
+            compiled = _compiled_swarms[key] = _build_swarm_graph().compile()
+    if checkpointer is None:
+        return compiled
+    return compiled.copy(update={"checkpointer": checkpointer})
+
+
+_warm_up_started = False
 
-    return workflow.compile()
+
+def warm_up_swarm(background: bool = True) -> None:
+    """
+    预热：提前导入 langgraph / aiohttp / openpyxl、编译流程图、加载场景库
+
+    进程只做一次。Web UI 首屏渲染完后在后台线程里调用，用户点“生成”时首次运行不必再等导入；
+    background=False 时同步执行（压测脚本在计时前调用）。
+    """
+    global _warm_up_started
+    if _warm_up_started:
+        return
+    _warm_up_started = True
+
+    def _warm_up():
+        import aiohttp  # noqa: F401
+        import openpyxl  # noqa: F401
+
+        create_swarm()
+        get_scene_retriever()
+
+    if background:
+        threading.Thread(target=_warm_up, name="swarm-warm-up", daemon=True).start()
+    else:
+        _warm_up()
+
+
+async def _stream_run(initial_state: Optional[SharedContext], run_id: Optional[str]):
+    """
+    挂检查点运行 / 续跑一次 Swarm，逐个产出 (节点名, 该节点完成后的状态)
+
+    initial_state 为 None 表示按 run_id 从检查点续跑：从最后一个完成的节点之后继续，
+    已完成的运行直接从 RunStore 的最终状态快照载入，不经过检查点。
+    运行状态同步写入 RunStore（running / finished / interrupted）。
+    """
+    if initial_state is None and not run_id:
+        raise ValueError("续跑需要指定运行编号")
+    store = get_run_store()
+    if initial_state is None and store is not None:
+        finished = store.load_final_state(run_id)
+        if finished is not None:
+            print(f"[检查点] 运行 {run_id} 已完成，直接载入结果")
+            yield "__end__", finished
+            return
+    if initial_state is not None:
+        run_id = run_id or new_run_id()
+    async with open_checkpointer(run_id) as checkpointer:
+        swarm = create_swarm(checkpointer)
+        if initial_state is not None:
+            initial_state = dict(initial_state, run_id=run_id)
+            run_metadata = initial_state.get("metadata", {})
+            if store is not None:
+                store.start_run(run_id, initial_state.get("user_input", {}))
+            print(f"[检查点] 运行编号：{run_id}")
+        else:
+            saved = (await swarm.aget_state({"configurable": {"thread_id": run_id}})).values if checkpointer is not None else None
+            if not saved:
+                raise ValueError(f"找不到运行 {run_id} 的检查点（未安装 langgraph-checkpoint-sqlite 时检查点不跨进程保存）")
+            run_metadata = saved.get("metadata", {})
+            print(f"[检查点] 从运行 {run_id} 的最后一个完成节点继续")
+
+        run_config = {"configurable": {"thread_id": run_id}} if checkpointer is not None else None
+        limiter = _get_api_limiter()
+        try:
+            # 本运行的所有 LLM 请求在全局限制器里按运行公平排队（交互式先于批量）
+            run_class = run_metadata.get("run_class", "interactive")
+            trace_attributes = {"run.class": run_class, "run.resumed": initial_state is None,
+                                "swarm.pipeline_mode": bool(config.PIPELINE_MODE)}
+            with run_flow_scope(run_id, run_class), tracing.trace_run(run_id, trace_attributes):
+                async for update in swarm.astream(initial_state, run_config, stream_mode="updates"):
+                    for node, node_state in update.items():
+                        if store is not None:
+                            store.record_node(run_id, node)
+                        yield node, node_state
+        except BaseException:
+            limiter.close_flow(run_id)
+            if store is not None:
+                store.set_status(run_id, "interrupted")
+            raise
+        queue_wait = limiter.close_flow(run_id)
+        if config.TRACE_ENABLED:
+            print(f"[追踪] 已写入 {tracing.trace_path(run_id)}（python tracing.py {run_id} 查看关键路径）")
+        if checkpointer is not None:
+            final_state = (await swarm.aget_state(run_config)).values
+            if queue_wait is not None:
+                final_state.setdefault("metadata", {})["queue_wait"] = queue_wait
+            if store is not None:
+                store.set_status(run_id, "finished", final_state.get("final_output", ""), final_state)
+            release_checkpoint(checkpointer, run_id)
+            yield "__end__", final_state
+
+
+async def arun_swarm(initial_state: Optional[SharedContext], close_client: bool = True, run_id: Optional[str] = None) -> SharedContext:
+    """
+    在当前事件循环上完整运行一次 Swarm（一个 loop、一个信号量、一个连接池贯穿全程）
+
+    Args:
+        initial_state: 初始 Shared Context；传 None 表示按 run_id 断点续跑
+        close_client: 运行结束后是否关闭共享连接池（常驻进程的后台 loop 传 False 以复用连接）
+        run_id: 运行编号（检查点 thread_id），新运行不传时自动生成
+    """
+    result = initial_state
+    try:
+        async for _, node_state in _stream_run(initial_state, run_id):
+            result = node_state
+        return result
+    finally:
+        if close_client:
+            await close_llm_client()
+
+
+async def astream_swarm(initial_state: Optional[SharedContext], close_client: bool = True, run_id: Optional[str] = None):
+    """
+    流式运行 Swarm，每完成一个节点产出一次 {节点名: 状态更新}
+    """
+    try:
+        async for node, node_state in _stream_run(initial_state, run_id):
+            if node != "__end__":
+                yield {node: node_state}
+    finally:
+        if close_client:
+            await close_llm_client()
+
+
+_background_loop = None
+_background_loop_lock = threading.Lock()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """
+    进程级后台事件循环（守护线程常驻），供 Streamlit 等同步调用方提交协程。
+    连接池与信号量都绑定在这个 loop 上，跨多次运行复用。
+    """
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="swarm-event-loop", daemon=True)
+            thread.start()
+            atexit.register(_shutdown_background_loop)
+            _background_loop = loop
+        return _background_loop
+
+
+def _shutdown_background_loop() -> None:
+    """进程退出时关闭连接池并停止后台 loop"""
+    loop = _background_loop
+    if loop is None or not loop.is_running():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(close_llm_client(), loop).result(timeout=5)
+    except Exception:
+        pass
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def run_swarm_sync(initial_state: Optional[SharedContext], run_id: Optional[str] = None) -> SharedContext:
+    """
+    同步入口：把运行提交到后台事件循环并阻塞等待结果。
+    无论调用线程里是否已有运行中的 loop（Streamlit / Jupyter），都不会出现嵌套 loop 错误。
+    initial_state 传 None 时按 run_id 断点续跑。
+    """
+    future = asyncio.run_coroutine_threadsafe(
+        arun_swarm(initial_state, close_client=False, run_id=run_id), _get_background_loop()
+    )
+    return future.result()
+
+
+def resume_swarm_sync(run_id: str) -> SharedContext:
+    """同步续跑：从运行 run_id 的最后一个完成节点继续（已完成的运行从 RunStore 载入最终状态）"""
+    return run_swarm_sync(None, run_id=run_id)
+
+
+def print_runs(limit: int = 20) -> None:
+    """打印最近的运行记录"""
+    store = get_run_store()
+    runs = store.list_runs(limit) if store is not None else []
+    if not runs:
+        print("暂无运行记录")
+        return
+    for run in runs:
+        user_input = run["user_input"]
+        updated = datetime.fromtimestamp(run["updated_at"]).strftime("%m-%d %H:%M")
+        print(f"{run['run_id']}  {run['status']:<11} 最后完成：{run['last_node'] or '-'}  {updated}  "
+              f"{user_input.get('车型', '')} / {user_input.get('平台', '')} / {user_input.get('数量', '')}篇")
 
 
 # ============================================================================
@@ -1351,6 +2292,15 @@ def main():
     """
     主程序入口
     """
+    parser = argparse.ArgumentParser(description="Agent Swarm 文案批量生成")
+    parser.add_argument("--list-runs", action="store_true", help="列出最近的运行记录")
+    parser.add_argument("--resume", metavar="RUN_ID", help="从指定运行的最后一个完成节点继续")
+    args = parser.parse_args()
+
+    if args.list_runs:
+        print_runs()
+        return
+
     print("=" * 60)
     print("Agent Swarm 原型 - Content Expansion (Deepseek API)")
     print("=" * 60)
@@ -1377,9 +2327,11 @@ def main():
         "metadata": {}
     }
 
-    # 创建并运行 Swarm
-    swarm = create_swarm()
-    result = swarm.invoke(initial_state)
+    # 创建并运行 Swarm（单事件循环）；--resume 时忽略上面的初始状态，按检查点续跑
+    if args.resume:
+        result = asyncio.run(arun_swarm(None, run_id=args.resume))
+    else:
+        result = asyncio.run(arun_swarm(initial_state))
 
     print("\n" + "=" * 60)
     print("执行完成！")
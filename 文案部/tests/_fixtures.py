@@ -0,0 +1,54 @@
+"""测试共用的状态工厂与假 LLM 响应（在各测试文件的依赖桩之后导入）"""
+
+import json
+from typing import Dict, List, Optional
+
+FILLER = "周末带爸妈去郊外转了一圈，后排坐得宽宽松松。" * 20
+
+
+def chat_reply(content: str) -> Dict:
+    """chat/completions 响应体"""
+    return {"choices": [{"message": {"content": content}}]}
+
+
+def verdict_reply(passed: bool, score: int, issues=(), suggestions=()) -> Dict:
+    """审核结论的 chat/completions 响应体"""
+    verdict = {"passed": passed, "score": score, "issues": list(issues), "suggestions": list(suggestions)}
+    return chat_reply(json.dumps(verdict, ensure_ascii=False))
+
+
+def draft(article_id: int, text: str, attempt: int = 1) -> Dict:
+    """一篇待审稿件：text 开头，FILLER 补足到 280 字"""
+    return {"id": article_id, "content": (text + FILLER)[:280], "persona": "宝妈", "selling_point": "空间", "attempt": attempt}
+
+
+def planned_state(count: int, run_id: Optional[str] = None) -> Dict:
+    """规划完成、尚未创作的运行状态（count 篇，人设1..count）"""
+    return {
+        "customer_brief": {"车型": "CR-V", "平台": "抖音", "方向": "春节返乡", "调性": "温和喜庆", "车型专属打底知识": "资料"},
+        "planner_brief": {"assignments": [
+            {"id": i, "persona": f"人设{i}", "selling_point": "空间", "scene": "春节返乡"}
+            for i in range(1, count + 1)
+        ]},
+        "contents": [],
+        "review_results": [],
+        "current_attempt": 1,
+        "need_manual_review": [],
+        "run_id": run_id,
+        "metadata": {},
+    }
+
+
+def review_state(contents: List[Dict], attempt: int = 1) -> Dict:
+    """已有稿件、等待审核的运行状态"""
+    return {
+        "customer_brief": {"平台": "抖音"},
+        "planner_brief": {"assignments": [
+            {"id": c["id"], "persona": "宝妈", "selling_point": "空间"} for c in contents
+        ]},
+        "contents": contents,
+        "review_results": [],
+        "current_attempt": attempt,
+        "need_manual_review": [],
+        "metadata": {},
+    }
@@ -1,6 +1,7 @@
 import asyncio
 import json
 import sys
+import time
 import types
 import unittest
 
@@ -24,7 +25,16 @@ langgraph_module.graph = graph_module
 sys.modules.setdefault("langgraph", langgraph_module)
 sys.modules.setdefault("langgraph.graph", graph_module)
 
+from aiohttp import web
+from tenacity import stop_after_attempt, wait_none
+
+import llm_cache
+import llm_client
 import swarm_with_llm as module
+from adaptive_limiter import AdaptiveLimiter, flow_scope, request_class_scope
+
+# 这些用例统计真实发出的请求，关闭响应缓存
+llm_cache.set_llm_cache(None)
 
 
 class _Counter:
@@ -34,6 +44,9 @@ class _Counter:
 
 
 class _FakeResponse:
+    status = 200
+    headers = {}
+
     def __init__(self, counter, payload):
         self._counter = counter
         self._payload = payload
@@ -59,26 +72,53 @@ class _FakeSession:
     def __init__(self, counter, payload):
         self._counter = counter
         self._payload = payload
+        self.closed = False
 
-    async def __aenter__(self):
-        return self
-
-    async def __aexit__(self, exc_type, exc, tb):
-        return None
+    async def close(self):
+        self.closed = True
 
     def post(self, *args, **kwargs):
         return _FakeResponse(self._counter, self._payload)
 
 
 class SemaphoreTests(unittest.TestCase):
+    def test_calls_share_one_pooled_session(self):
+        counter = _Counter()
+        payload = {"choices": [{"message": {"content": "ok"}}]}
+        sessions = []
+
+        def _factory():
+            session = _FakeSession(counter, payload)
+            sessions.append(session)
+            return session
+
+        async def _run():
+            module._api_limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+            client = llm_client.LLMClient(session_factory=_factory)
+            llm_client.set_llm_client(client)
+            tasks = [
+                module.call_deepseek_api_async("p", "k", "u")
+                for _ in range(8)
+            ]
+            await asyncio.gather(*tasks)
+            await llm_client.close_llm_client()
+
+        try:
+            asyncio.run(_run())
+        finally:
+            llm_client.set_llm_client(None)
+        self.assertEqual(len(sessions), 1)
+        self.assertTrue(sessions[0].closed)
+
     def test_call_api_is_bounded_by_semaphore(self):
         counter = _Counter()
         payload = {"choices": [{"message": {"content": "ok"}}]}
-        original_client_session = module.aiohttp.ClientSession
 
         async def _run():
-            module._api_semaphore = asyncio.Semaphore(2)
-            module.aiohttp.ClientSession = lambda: _FakeSession(counter, payload)
+            module._api_limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+            llm_client.set_llm_client(
+                llm_client.LLMClient(session_factory=lambda: _FakeSession(counter, payload))
+            )
             tasks = [
                 module.call_deepseek_api_async("p", "k", "u")
                 for _ in range(8)
@@ -88,18 +128,19 @@ class SemaphoreTests(unittest.TestCase):
         try:
             asyncio.run(_run())
         finally:
-            module.aiohttp.ClientSession = original_client_session
+            llm_client.set_llm_client(None)
         self.assertLessEqual(counter.max_in_flight, 2)
 
     def test_reviewer_api_is_bounded_by_semaphore(self):
         counter = _Counter()
         review_obj = {"passed": True, "score": 7, "issues": [], "suggestions": []}
         payload = {"choices": [{"message": {"content": json.dumps(review_obj)}}]}
-        original_client_session = module.aiohttp.ClientSession
 
         async def _run():
-            module._api_semaphore = asyncio.Semaphore(2)
-            module.aiohttp.ClientSession = lambda: _FakeSession(counter, payload)
+            module._api_limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+            llm_client.set_llm_client(
+                llm_client.LLMClient(session_factory=lambda: _FakeSession(counter, payload))
+            )
             tasks = [
                 module.evaluate_content_ai_flavor_async(
                     "文案", {"persona": "宝妈", "selling_point": "空间"}, "k", "u"
@@ -111,9 +152,298 @@ class SemaphoreTests(unittest.TestCase):
         try:
             asyncio.run(_run())
         finally:
-            module.aiohttp.ClientSession = original_client_session
+            llm_client.set_llm_client(None)
         self.assertLessEqual(counter.max_in_flight, 2)
 
+    def test_revision_round_is_concurrent_and_ordered(self):
+        counter = _Counter()
+        payload = {"choices": [{"message": {"content": "改写后"}}]}
+        assignments = [
+            {"id": i, "persona": "宝妈", "selling_point": "空间"} for i in range(1, 7)
+        ]
+        state = {
+            "customer_brief": {"平台": "抖音"},
+            "planner_brief": {"assignments": assignments},
+            "contents": [
+                {"id": a["id"], "content": "原文", "persona": "宝妈", "selling_point": "空间"}
+                for a in assignments
+            ],
+            "metadata": {},
+        }
+        failed = [
+            {"id": i, "passed": False, "issues": ["x"], "suggestions": ["y"]}
+            for i in (2, 3, 5, 6)
+        ]
+
+        async def _run():
+            module._api_limiter = AdaptiveLimiter(initial_limit=3, max_limit=3)
+            llm_client.set_llm_client(
+                llm_client.LLMClient(session_factory=lambda: _FakeSession(counter, payload))
+            )
+            return await module.revise_contents(state, failed, attempt=2)
+
+        try:
+            updated = asyncio.run(_run())
+        finally:
+            llm_client.set_llm_client(None)
+        self.assertEqual([item["id"] for item in updated], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(
+            [item["content"] for item in updated],
+            ["原文", "改写后", "改写后", "原文", "改写后", "改写后"],
+        )
+        self.assertEqual(counter.max_in_flight, 3)
+        self.assertEqual(state["metadata"]["revision_rounds"][0]["revised"], 4)
+
+
+async def _start_rate_capped_server(cap, latency=0.02, retry_after=None):
+    """本地替身服务：同时在途请求超过 cap 时返回 429"""
+    state = {"in_flight": 0, "max_in_flight": 0, "ok": 0, "throttled": 0}
+
+    async def handle(request):
+        await request.json()
+        if state["in_flight"] >= cap:
+            state["throttled"] += 1
+            headers = {"Retry-After": retry_after} if retry_after else {}
+            return web.json_response({"error": "rate limited"}, status=429, headers=headers)
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            state["in_flight"] -= 1
+        state["ok"] += 1
+        return web.json_response({"choices": [{"message": {"content": "ok"}}]})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, state, f"http://127.0.0.1:{port}/v1/chat/completions"
+
+
+class AdaptiveLimiterTests(unittest.TestCase):
+    def tearDown(self):
+        module._api_limiter = None
+        llm_client.set_llm_client(None)
+
+    def _drive(self, cap, requests_total, limiter, retry_after=None):
+        chat = module._chat_completion.retry_with(wait=wait_none(), stop=stop_after_attempt(50))
+        payload = {"model": "m", "messages": [{"role": "user", "content": "p"}]}
+        windows = []
+
+        async def _run():
+            runner, state, url = await _start_rate_capped_server(cap, retry_after=retry_after)
+            module._api_limiter = limiter
+            try:
+                async def one():
+                    await chat(payload, "k", url)
+                    windows.append(limiter.window)
+
+                await asyncio.gather(*(one() for _ in range(requests_total)))
+            finally:
+                await llm_client.close_llm_client()
+                await runner.cleanup()
+            return state
+
+        return asyncio.run(_run()), windows
+
+    def test_window_grows_when_server_has_headroom(self):
+        limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=8)
+        state, _ = self._drive(cap=100, requests_total=120, limiter=limiter)
+        self.assertEqual(state["throttled"], 0)
+        self.assertEqual(limiter.limit, 8)
+
+    def test_window_converges_to_server_rate_cap(self):
+        cap = 4
+        limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=32)
+        state, windows = self._drive(cap=cap, requests_total=400, limiter=limiter)
+        self.assertEqual(state["ok"], 400)
+        tail = windows[len(windows) // 2:]
+        self.assertLessEqual(max(tail), cap * 2)
+        self.assertGreaterEqual(sum(tail) / len(tail), cap / 2)
+        self.assertLess(state["throttled"] / 400, 0.25)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual(limiter.queue_depth, 0)
+
+    def test_retry_after_pauses_dispatch(self):
+        limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+
+        async def _run():
+            await limiter.acquire()
+            limiter.release(status=429, headers={"Retry-After": "0.2"})
+            started = time.monotonic()
+            await limiter.acquire()
+            waited = time.monotonic() - started
+            limiter.release(status=200)
+            return waited
+
+        waited = asyncio.run(_run())
+        self.assertGreaterEqual(waited, 0.18)
+        self.assertEqual(limiter.snapshot()["throttled"], 1)
+
+    def test_client_errors_leave_window_and_latency_alone(self):
+        limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=4)
+
+        async def _run():
+            for status in (400, 401, 413):
+                await limiter.acquire()
+                limiter.release(status=status, latency=0.5)
+
+        asyncio.run(_run())
+        self.assertEqual(limiter.window, 1.0)
+        self.assertEqual(limiter._latency_samples, 0)
+        self.assertEqual(limiter.stats["client_errors"], 3)
+        self.assertEqual(limiter.stats["decreases"], 0)
+
+    def test_only_rate_limits_and_server_errors_are_retried(self):
+        import aiohttp
+
+        def error(status):
+            return aiohttp.ClientResponseError(None, (), status=status)
+
+        self.assertTrue(module._is_transient_error(error(429)))
+        self.assertTrue(module._is_transient_error(error(503)))
+        self.assertTrue(module._is_transient_error(asyncio.TimeoutError()))
+        self.assertTrue(module._is_transient_error(aiohttp.ClientConnectionError()))
+        for status in (400, 401, 413):
+            self.assertFalse(module._is_transient_error(error(status)))
+
+    def test_rate_limit_headers_pause_dispatch(self):
+        limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+
+        async def _run():
+            await limiter.acquire()
+            limiter.release(
+                status=200,
+                headers={"X-RateLimit-Remaining-Requests": "0", "X-RateLimit-Reset-Requests": "150ms"},
+            )
+            self.assertEqual(limiter.snapshot()["queue_depth"], 0)
+            started = time.monotonic()
+            await limiter.acquire()
+            return time.monotonic() - started
+
+        self.assertGreaterEqual(asyncio.run(_run()), 0.13)
+
+
+class FairSchedulingTests(unittest.TestCase):
+    def _grant_order(self, limiter, flows):
+        """先占住唯一名额，让各流按 flows 顺序排满队，再放开，返回派发顺序"""
+        order = []
+
+        async def worker(flow_id, priority, weight):
+            with flow_scope(flow_id, priority=priority, weight=weight):
+                await limiter.acquire()
+            order.append(flow_id)
+            await asyncio.sleep(0)
+            limiter.release(status=200)
+
+        async def _run():
+            await limiter.acquire()
+            tasks = [
+                asyncio.ensure_future(worker(flow_id, priority, weight))
+                for flow_id, count, priority, weight in flows
+                for _ in range(count)
+            ]
+            await asyncio.sleep(0)
+            limiter.release(status=200)
+            await asyncio.gather(*tasks)
+
+        asyncio.run(_run())
+        return order
+
+    def test_burst_does_not_starve_later_run(self):
+        limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1)
+        order = self._grant_order(limiter, [("a", 20, 0, 1.0), ("b", 5, 0, 1.0)])
+        # 先排队的 20 个请求不会把后来的运行挤到最后：两个运行交替派发
+        self.assertEqual(order[:10], ["a", "b"] * 5)
+
+    def test_interactive_runs_go_ahead_of_batch(self):
+        limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1)
+        order = self._grant_order(limiter, [("batch", 10, 1, 1.0), ("web", 3, 0, 1.0)])
+        self.assertEqual(order[:3], ["web"] * 3)
+
+    def test_weights_split_capacity(self):
+        limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1)
+        order = self._grant_order(limiter, [("heavy", 20, 0, 2.0), ("light", 20, 0, 1.0)])
+        self.assertEqual(order[:12].count("heavy"), 8)
+
+    def test_queue_wait_metric_per_run(self):
+        limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1)
+        self._grant_order(limiter, [("a", 3, 0, 1.0), ("b", 3, 0, 1.0)])
+        stats = limiter.flow_snapshot("a")
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["queued"], 0)
+        self.assertGreater(stats["max_queue_wait_ms"], 0)
+        self.assertEqual(limiter.close_flow("a")["requests"], 3)
+        self.assertIsNone(limiter.flow_snapshot("a"))
+
+    def test_cancelled_waiter_leaves_queue(self):
+        limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1)
+
+        async def _run():
+            await limiter.acquire()
+            with flow_scope("a"):
+                waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            self.assertEqual(limiter.queue_depth, 1)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            self.assertEqual(limiter.queue_depth, 0)
+            limiter.release(status=200)
+            await limiter.acquire()
+            self.assertEqual(limiter.in_flight, 1)
+
+        asyncio.run(_run())
+
+
+
+class RequestPriorityTests(unittest.TestCase):
+    def _grant_order(self, limiter, batches, pause=0.0):
+        """占住唯一名额后按 batches 依次排队 [(类别, 个数)]，每批之间停 pause 秒，再放开，返回派发的类别顺序"""
+        order = []
+
+        async def worker(request_class):
+            with request_class_scope(request_class):
+                await limiter.acquire()
+            order.append(request_class)
+            await asyncio.sleep(0)
+            limiter.release(status=200)
+
+        async def _run():
+            await limiter.acquire()
+            tasks = []
+            for request_class, count in batches:
+                tasks += [asyncio.ensure_future(worker(request_class)) for _ in range(count)]
+                await asyncio.sleep(pause)
+            limiter.release(status=200)
+            await asyncio.gather(*tasks)
+
+        asyncio.run(_run())
+        return order
+
+    def test_reviews_and_revisions_go_before_new_drafts(self):
+        limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1, aging_seconds=60)
+        order = self._grant_order(limiter, [("draft", 4), ("revision", 2), ("review", 2)])
+        self.assertEqual(order, ["review"] * 2 + ["revision"] * 2 + ["draft"] * 4)
+        by_class = limiter.flow_snapshot("default")["by_class"]
+        self.assertEqual(by_class["draft"]["requests"], 4)
+        self.assertGreater(by_class["draft"]["avg_queue_wait_ms"], by_class["review"]["avg_queue_wait_ms"])
+
+    def test_long_waiting_drafts_are_promoted(self):
+        limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1, aging_seconds=0.02)
+        order = self._grant_order(limiter, [("draft", 2), ("review", 2)], pause=0.1)
+        self.assertEqual(order[:2], ["draft"] * 2)
+        self.assertGreater(limiter.snapshot()["aged_promotions"], 0)
+
+    def test_flat_priorities_keep_fifo(self):
+        limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1, request_priorities={})
+        order = self._grant_order(limiter, [("draft", 2), ("review", 2)])
+        self.assertEqual(order, ["draft", "draft", "review", "review"])
+
 
 if __name__ == "__main__":
     unittest.main()
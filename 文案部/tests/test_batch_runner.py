@@ -0,0 +1,142 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+# Stub optional runtime dependencies to keep unit tests isolated.
+dotenv_module = types.ModuleType("dotenv")
+dotenv_module.load_dotenv = lambda: None
+sys.modules.setdefault("dotenv", dotenv_module)
+
+langgraph_module = types.ModuleType("langgraph")
+graph_module = types.ModuleType("langgraph.graph")
+
+
+class DummyStateGraph:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+graph_module.StateGraph = DummyStateGraph
+graph_module.END = "END"
+langgraph_module.graph = graph_module
+sys.modules.setdefault("langgraph", langgraph_module)
+sys.modules.setdefault("langgraph.graph", graph_module)
+
+from openpyxl import Workbook
+
+import batch_runner
+import run_store
+
+
+class SheetTitleTests(unittest.TestCase):
+    def test_execution_sheet_titles(self):
+        cases = {
+            "0212-AIGC-HR-V【关联荣放】-50条-刘海龙": ("HRV", "抖音", 50, "关联荣放"),
+            "0211-头条稿件-CR-V【春节品质】-100篇-不二": ("CR-V", "今日头条", 100, "春节品质"),
+            "0209-AIGC-HR-V【对比荣放】-10+10条-刘海龙": ("HRV", "抖音", 20, "对比荣放"),
+            "英仕派【购车旺季】0129-AIGC脚本-40条-田萌": ("英仕派", "抖音", 40, "购车旺季"),
+            "0204-达人口播-CR-V【1月销量】-10条-肖坤": ("CR-V", "抖音", 10, "1月销量"),
+        }
+        for title, expected in cases.items():
+            job = batch_runner.parse_sheet_title(title)
+            self.assertEqual((job["车型"], job["平台"], job["数量"], job["方向"]), expected, title)
+        self.assertIsNone(batch_runner.parse_sheet_title("Sheet1"))
+
+
+class LoadJobsTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_csv_and_jsonl_rows(self):
+        with open(self._path("jobs.csv"), "w", encoding="utf-8") as f:
+            f.write("车型,平台,数量,方向\nCR-V,抖音,3,春节返乡\n品牌,抖音,2,安心\n,,,\nHR-V,今日头条,2,选车心路\n")
+        csv_jobs = batch_runner.load_jobs(self._path("jobs.csv"))
+        self.assertEqual([(j["车型"], j["数量"]) for j in csv_jobs], [("CR-V", 3), ("HRV", 2)])
+
+        # 行序调整后编号不变，进度仍能对上
+        with open(self._path("jobs.jsonl"), "w", encoding="utf-8") as f:
+            for row in ({"车型": "HRV", "平台": "今日头条", "数量": 2, "方向": "选车心路"},
+                        {"车型": "CR-V", "平台": "抖音", "数量": 3, "方向": "春节返乡"}):
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        jsonl_jobs = batch_runner.load_jobs(self._path("jobs.jsonl"))
+        self.assertEqual({j["编号"] for j in jsonl_jobs}, {j["编号"] for j in csv_jobs})
+
+    def test_duplicate_rows_get_distinct_ids(self):
+        with open(self._path("jobs.csv"), "w", encoding="utf-8") as f:
+            f.write("车型,平台,数量,方向\nCR-V,抖音,3,春节返乡\nCR-V,抖音,3,春节返乡\n")
+        jobs = batch_runner.load_jobs(self._path("jobs.csv"))
+        self.assertEqual(len({j["编号"] for j in jobs}), 2)
+
+    def test_xlsx_table_or_sheet_titles(self):
+        wb = Workbook()
+        wb.active.append(["车型", "平台", "数量", "方向"])
+        wb.active.append(["思域", "抖音", 4, "马年出行"])
+        wb.save(self._path("table.xlsx"))
+        self.assertEqual(batch_runner.load_jobs(self._path("table.xlsx"))[0]["车型"], "思域")
+
+        wb = Workbook()
+        wb.active.title = "0210-AIGC-思域【出行马年】-45条-刘正"
+        wb.create_sheet("0211-AIGC-品牌【安心东本-节前】-20条-何苏婷")
+        wb.save(self._path("execution.xlsx"))
+        jobs = batch_runner.load_jobs(self._path("execution.xlsx"))
+        self.assertEqual([(j["车型"], j["数量"], j["来源"]) for j in jobs],
+                         [("思域", 45, "0210-AIGC-思域【出行马年】-45条-刘正")])
+
+
+class RunBatchTests(unittest.TestCase):
+    def setUp(self):
+        run_store.set_run_store(run_store.RunStore(":memory:"))
+        self.addCleanup(run_store.set_run_store, None)
+        self.calls = []
+        self.fail = set()
+
+        async def fake_arun_swarm(initial_state, close_client=True, run_id=None):
+            self.calls.append(run_id)
+            if initial_state is None:
+                raise ValueError("no checkpoint")
+            if initial_state["user_input"]["车型"] in self.fail:
+                raise RuntimeError("boom")
+            return dict(initial_state, review_results=[{"id": 1, "passed": True}], final_output="out.xlsx")
+
+        patcher = mock.patch.object(batch_runner.swarm, "arun_swarm", fake_arun_swarm)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.jobs = batch_runner._assign_job_ids([
+            {"车型": "CR-V", "平台": "抖音", "数量": 1, "方向": "春节返乡"},
+            {"车型": "思域", "平台": "抖音", "数量": 1, "方向": "马年出行"},
+        ])
+
+    def _run(self):
+        return asyncio.run(batch_runner.run_batch(self.jobs, "batch", tempfile.gettempdir(), parallel=2))
+
+    def test_rerun_skips_finished_rows_and_retries_failed(self):
+        self.fail = {"思域"}
+        summaries = self._run()
+        self.assertEqual(summaries[0]["状态"], "完成")
+        self.assertTrue(summaries[1]["状态"].startswith("失败"))
+        self.assertEqual(len(self.calls), 2)
+
+        self.fail = set()
+        summaries = self._run()
+        self.assertEqual([s["状态"] for s in summaries], ["已完成（跳过）", "完成"])
+        # 失败行先尝试按原运行编号续跑，续不上再重新开始
+        self.assertEqual(self.calls[2], self.calls[1])
+        self.assertEqual(len(self.calls), 4)
+
+    def test_summary_workbook(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = batch_runner.write_batch_summary(self._run(), tmp)
+            self.assertTrue(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import sys
+import types
+import unittest
+from unittest import mock
+
+# Stub optional runtime dependencies to keep unit tests isolated.
+dotenv_module = types.ModuleType("dotenv")
+dotenv_module.load_dotenv = lambda: None
+sys.modules.setdefault("dotenv", dotenv_module)
+
+langgraph_module = types.ModuleType("langgraph")
+graph_module = types.ModuleType("langgraph.graph")
+
+
+class DummyStateGraph:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+graph_module.StateGraph = DummyStateGraph
+graph_module.END = "END"
+langgraph_module.graph = graph_module
+sys.modules.setdefault("langgraph", langgraph_module)
+sys.modules.setdefault("langgraph.graph", graph_module)
+
+import llm_cache
+import swarm_with_llm as module
+from llm_cache import LLMResponseCache
+
+
+class LLMResponseCacheTests(unittest.TestCase):
+    def _cache(self, **kwargs):
+        kwargs.setdefault("ttl_seconds", 3600)
+        kwargs.setdefault("max_entries", 100)
+        kwargs.setdefault("memory_entries", 8)
+        return LLMResponseCache(path=":memory:", **kwargs)
+
+    def test_key_depends_on_all_parameters(self):
+        base = LLMResponseCache.make_key("deepseek-chat", "p", 0.1, 512)
+        self.assertEqual(base, LLMResponseCache.make_key("deepseek-chat", "p", 0.1, 512))
+        self.assertNotEqual(base, LLMResponseCache.make_key("deepseek-chat", "p", 0.2, 512))
+        self.assertNotEqual(base, LLMResponseCache.make_key("deepseek-chat", "p", 0.1, 256))
+        self.assertNotEqual(base, LLMResponseCache.make_key("deepseek-chat", "q", 0.1, 512))
+        self.assertNotEqual(base, LLMResponseCache.make_key("other", "p", 0.1, 512))
+
+    def test_hit_and_miss_stats(self):
+        cache = self._cache()
+        self.assertIsNone(cache.get("k"))
+        cache.set("k", "v")
+        self.assertEqual(cache.get("k"), "v")
+        snapshot = cache.snapshot()
+        self.assertEqual(snapshot["hits"], 1)
+        self.assertEqual(snapshot["misses"], 1)
+        self.assertEqual(snapshot["hit_rate"], 0.5)
+
+    def test_ttl_expiry(self):
+        cache = self._cache(ttl_seconds=10, memory_entries=0)
+        with mock.patch("llm_cache.time.time", return_value=1000.0):
+            cache.set("k", "v")
+        with mock.patch("llm_cache.time.time", return_value=1005.0):
+            self.assertEqual(cache.get("k"), "v")
+        with mock.patch("llm_cache.time.time", return_value=1011.0):
+            self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats["expired"], 1)
+
+    def test_lru_eviction_keeps_recently_used(self):
+        cache = self._cache(max_entries=2, ttl_seconds=0)
+        clock = iter(range(1000, 2000))
+        with mock.patch("llm_cache.time.time", side_effect=lambda: float(next(clock))):
+            cache.set("a", "1")
+            cache.set("b", "2")
+            self.assertEqual(cache.get("a"), "1")
+            cache.set("c", "3")
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats["evictions"], 1)
+        cache._memory.clear()
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1")
+        self.assertEqual(cache.get("c"), "3")
+
+    def test_expired_rows_are_swept_periodically_not_on_every_write(self):
+        cache = self._cache(ttl_seconds=10, memory_entries=0, sweep_seconds=60)
+        with mock.patch("llm_cache.time.time", return_value=1000.0):
+            cache.set("old", "1")
+        # 过期了但还没到清扫时间：写入不扫表，条目数按增量计
+        with mock.patch("llm_cache.time.time", return_value=1020.0):
+            cache.set("new", "2")
+            cache.set("new", "3")
+        self.assertEqual(cache._count, 2)
+        self.assertEqual(cache.stats["expired"], 0)
+        with mock.patch("llm_cache.time.time", return_value=1061.0):
+            cache.set("later", "4")
+        self.assertEqual(cache.stats["expired"], 2)
+        self.assertEqual(cache._count, 1)
+        self.assertEqual(len(cache), 1)
+
+    def test_async_get_and_set(self):
+        cache = self._cache(memory_entries=0)
+
+        async def run():
+            self.assertIsNone(await cache.aget("k"))
+            await cache.aset("k", "v")
+            return await cache.aget("k")
+
+        self.assertEqual(asyncio.run(run()), "v")
+        self.assertEqual(cache.stats["writes"], 1)
+
+
+class ReviewerCacheTests(unittest.TestCase):
+    def setUp(self):
+        llm_cache.set_llm_cache(LLMResponseCache(path=":memory:"))
+
+    def tearDown(self):
+        llm_cache.set_llm_cache(None)
+
+    def test_reviewer_reuses_cached_verdict(self):
+        review_obj = {"passed": False, "score": 4, "issues": ["AI味"], "suggestions": ["改"]}
+        payload = {"choices": [{"message": {"content": json.dumps(review_obj)}}]}
+        calls = []
+
+        async def fake_completion(body, api_key, api_url):
+            calls.append(body)
+            return payload
+
+        assignment = {"persona": "宝妈", "selling_point": "空间"}
+
+        async def _run():
+            first = await module.evaluate_content_ai_flavor_async("文案", assignment, "k", "u")
+            second = await module.evaluate_content_ai_flavor_async("文案", assignment, "k", "u")
+            return first, second
+
+        with mock.patch.object(module, "_chat_completion", fake_completion):
+            first, second = asyncio.run(_run())
+        self.assertEqual(first, review_obj)
+        self.assertEqual(second, review_obj)
+        self.assertEqual(len(calls), 1)
+
+    def test_writer_can_opt_out(self):
+        payload = {"choices": [{"message": {"content": "正文"}}]}
+        calls = []
+
+        async def fake_completion(body, api_key, api_url):
+            calls.append(body)
+            return payload
+
+        async def _run():
+            for _ in range(2):
+                await module.call_deepseek_api_async("p", "k", "u", temperature=0.8, use_cache=False)
+            for _ in range(2):
+                await module.call_deepseek_api_async("p", "k", "u", temperature=0.8, use_cache=True)
+
+        with mock.patch.object(module, "_chat_completion", fake_completion):
+            asyncio.run(_run())
+        self.assertEqual(len(calls), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from markdown_sections import parse_markdown
+
+LIBRARY_MD = """# 口吻样本库
+
+## 一、宝妈口吻
+
+### 特征
+- **年龄**：25-40岁
+
+### 样本
+
+**开场切入**：
+- "带娃出门，最怕的就是..."
+
+**痛点描述**（不要太直白）：
+- "后备箱塞不下婴儿车"
+
+```
+## 代码块里的不是标题
+- "也不是样本"
+```
+
+## 二、孝子口吻
+
+**开场切入**：
+- "爸妈年纪大了"
+"""
+
+
+class MarkdownSectionsTests(unittest.TestCase):
+    def test_heading_tree_and_offsets(self):
+        document = parse_markdown(LIBRARY_MD)
+        self.assertEqual(
+            [(s.level, s.title) for s in document.sections],
+            [(1, "口吻样本库"), (2, "一、宝妈口吻"), (3, "特征"), (3, "样本"), (2, "二、孝子口吻")],
+        )
+        baoma = document.find("## 一、宝妈口吻")
+        self.assertEqual([child.title for child in baoma.children], ["特征", "样本"])
+        self.assertTrue(document.text(baoma).startswith("## 一、宝妈口吻\n"))
+        self.assertEqual(baoma.end, LIBRARY_MD.index("## 二、孝子口吻"))
+        self.assertEqual(LIBRARY_MD[baoma.body_start:baoma.body_start + 1], "\n")
+        self.assertEqual(document.find("## 二、孝子口吻").end, len(LIBRARY_MD))
+        self.assertIsNone(document.find("## 三、小夫妻口吻"))
+
+    def test_blocks_and_items_roll_up_to_enclosing_sections(self):
+        document = parse_markdown(LIBRARY_MD)
+        baoma = document.find("## 一、宝妈口吻")
+        self.assertEqual(baoma.blocks, {"开场切入": ["带娃出门，最怕的就是..."], "痛点描述": ["后备箱塞不下婴儿车"]})
+        self.assertEqual(document.find("### 样本").blocks["开场切入"], ["带娃出门，最怕的就是..."])
+        self.assertEqual(document.find("### 特征").items, [])
+        self.assertEqual(document.root.items, ["带娃出门，最怕的就是...", "后备箱塞不下婴儿车", "爸妈年纪大了"])
+        self.assertEqual(document.root.blocks["开场切入"], ["带娃出门，最怕的就是...", "爸妈年纪大了"])
+
+    def test_same_content_is_parsed_once(self):
+        self.assertIs(parse_markdown(LIBRARY_MD), parse_markdown(LIBRARY_MD))
+        crlf = parse_markdown(LIBRARY_MD.replace("\n", "\r\n"))
+        self.assertEqual(crlf.find("## 二、孝子口吻").blocks["开场切入"], ["爸妈年纪大了"])
+
+
+if __name__ == "__main__":
+    unittest.main()
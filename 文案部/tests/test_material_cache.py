@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sys
+import tempfile
+import types
+import unittest
+
+# Stub optional runtime dependencies to keep unit tests isolated.
+dotenv_module = types.ModuleType("dotenv")
+dotenv_module.load_dotenv = lambda: None
+sys.modules.setdefault("dotenv", dotenv_module)
+
+import material_cache
+from config import Config
+from material_cache import MaterialCache
+
+
+class MaterialCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def _write(self, name, text, bump=0):
+        path = os.path.join(self.root, name)
+        previous = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        if previous is not None:
+            # 同一时间片内的写入 mtime 可能不变，手动推后
+            mtime_ns = previous + (bump or 1) * 1_000_000_000
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def test_hit_then_reload_after_edit(self):
+        cache = MaterialCache()
+        path = self._write("CR-V.md", "旧资料")
+        self.assertEqual(cache.get(path), "旧资料")
+        self.assertEqual(cache.get(path), "旧资料")
+        self.assertEqual(cache.stats["hits"], 1)
+
+        self._write("CR-V.md", "新资料")
+        self.assertEqual(cache.get(path), "新资料")
+        self.assertEqual(cache.stats["reloads"], 1)
+
+    def test_touch_without_change_only_revalidates(self):
+        cache = MaterialCache()
+        path = self._write("HRV.md", "资料")
+        cache.get(path)
+        self._write("HRV.md", "资料")
+        self.assertEqual(cache.get(path), "资料")
+        self.assertEqual(cache.stats["revalidations"], 1)
+        self.assertEqual(cache.stats["reloads"], 0)
+
+    def test_missing_file_is_negative_cached_for_ttl(self):
+        cache = MaterialCache(negative_ttl_seconds=60)
+        path = os.path.join(self.root, "思域.md")
+        self.assertIsNone(cache.get(path))
+        self._write("思域.md", "后来才有的资料")
+        self.assertIsNone(cache.get(path))
+        self.assertEqual(cache.stats["negative_hits"], 1)
+
+        cache.invalidate(path)
+        self.assertEqual(cache.get(path), "后来才有的资料")
+
+        expiring = MaterialCache(negative_ttl_seconds=0)
+        missing = os.path.join(self.root, "英仕派.md")
+        self.assertIsNone(expiring.get(missing))
+        self._write("英仕派.md", "资料")
+        self.assertEqual(expiring.get(missing), "资料")
+
+    def test_missing_markers_are_bounded_and_swept(self):
+        cache = MaterialCache(max_entries=3, negative_ttl_seconds=60)
+        for index in range(10):
+            cache.get(os.path.join(self.root, f"缺失{index}.md"))
+        self.assertEqual(cache.snapshot()["missing"], 3)
+
+        expiring = MaterialCache(negative_ttl_seconds=0)
+        for index in range(10):
+            expiring.get(os.path.join(self.root, f"缺失{index}.md"))
+        # 记新标记时顺带清掉已过期的
+        self.assertEqual(expiring.snapshot()["missing"], 1)
+
+    def test_lru_bounds_by_entries_and_chars(self):
+        cache = MaterialCache(max_entries=2, max_chars=10)
+        a = self._write("a.md", "aaaa")
+        b = self._write("b.md", "bbbb")
+        c = self._write("c.md", "cccc")
+        cache.get(a)
+        cache.get(b)
+        cache.get(a)
+        cache.get(c)
+        snapshot = cache.snapshot()
+        self.assertEqual(snapshot["entries"], 2)
+        self.assertEqual(snapshot["evictions"], 1)
+        cache.get(a)
+        self.assertEqual(cache.stats["hits"], 2)
+
+        big = self._write("big.md", "x" * 11)
+        self.assertEqual(cache.get(big), "x" * 11)
+        self.assertEqual(cache.snapshot()["chars"], 8)
+
+    def test_async_read_and_config_wrapper(self):
+        cache = MaterialCache()
+        material_cache.set_material_cache(cache)
+        self.addCleanup(material_cache.set_material_cache, None)
+        path = self._write("模板.md", "模板正文")
+
+        self.assertEqual(asyncio.run(Config.aload_material(path)), "模板正文")
+        self.assertEqual(Config.load_material(path), "模板正文")
+        self.assertEqual((cache.stats["hits"], cache.stats["misses"]), (1, 1))
+
+        missing = os.path.join(self.root, "不存在.md")
+        self.assertEqual(Config.load_material(missing), f"材料文件未找到：{missing}")
+        self.assertEqual(cache.snapshot()["entries"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import sys
+import tempfile
+import types
+import unittest
+
+# Stub optional runtime dependencies to keep unit tests isolated.
+dotenv_module = types.ModuleType("dotenv")
+dotenv_module.load_dotenv = lambda: None
+sys.modules.setdefault("dotenv", dotenv_module)
+
+import material_cache
+import material_library
+from material_cache import MaterialCache
+from material_library import MaterialLibrary
+
+
+PERSONA_MD = """# 口吻样本库
+
+## 一、宝妈口吻
+
+**开场切入**：
+- "带娃出门，最怕的就是..."
+- "当妈的都懂"
+
+**痛点描述**：
+- "后备箱塞不下婴儿车"
+
+## 二、孝子口吻
+
+**开场切入**：
+- "爸妈年纪大了"
+"""
+
+SCENE_MD = """# 场景切入库
+
+## 一、春节返乡场景
+
+**时间触发**：
+- "又是一年春运"
+
+## 二、周末出游场景
+
+**时间触发**：
+- "周五下班就出发"
+"""
+
+
+class MaterialLibraryTests(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self._write(material_library.PERSONA_FILE, PERSONA_MD)
+        self._write(material_library.SCENE_FILE, SCENE_MD)
+        self.cache = MaterialCache()
+        material_cache.set_material_cache(self.cache)
+        self.addCleanup(material_cache.set_material_cache, None)
+        self.library = MaterialLibrary(self.root)
+
+    def _write(self, name, text, mtime=None):
+        path = os.path.join(self.root, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def test_persona_sections_are_indexed_once(self):
+        baoma = self.library.persona_samples("宝妈")
+        self.assertEqual(baoma["开场切入"], ["带娃出门，最怕的就是...", "当妈的都懂"])
+        self.assertEqual(baoma["痛点描述"], ["后备箱塞不下婴儿车"])
+        self.assertEqual(self.library.persona_samples("孝子")["开场切入"], ["爸妈年纪大了"])
+        self.assertEqual(self.library.persona_samples("路人")["开场切入"], [])
+        self.assertEqual(self.library.stats["parses"], 1)
+
+    def test_unknown_scene_falls_back_to_default(self):
+        self.assertEqual(self.library.scene_samples("周末出游")["时间触发"], ["周五下班就出发"])
+        self.assertEqual(self.library.scene_samples("太空旅行")["时间触发"], ["又是一年春运"])
+
+    def test_reloads_only_when_mtime_changes(self):
+        self.library.persona_samples("宝妈")
+        self.library.persona_samples("宝妈")
+        self.assertEqual(self.library.stats["parses"], 1)
+
+        self._write(material_library.PERSONA_FILE, PERSONA_MD.replace("当妈的都懂", "宝妈都懂"),
+                    mtime=os.path.getmtime(os.path.join(self.root, material_library.PERSONA_FILE)) + 10)
+        self.assertEqual(self.library.persona_samples("宝妈")["开场切入"][1], "宝妈都懂")
+        self.assertEqual(self.library.stats["parses"], 2)
+
+    def test_reads_go_through_shared_material_cache(self):
+        self.library.persona_samples("宝妈")
+        self.library.persona_samples("孝子")
+        self.assertEqual((self.cache.stats["misses"], self.cache.stats["hits"]), (1, 1))
+
+        # 原样保存（mtime 变、内容不变）：缓存只做一次校验，素材库不重新解析
+        path = os.path.join(self.root, material_library.PERSONA_FILE)
+        self._write(material_library.PERSONA_FILE, PERSONA_MD, mtime=os.path.getmtime(path) + 10)
+        self.library.persona_samples("宝妈")
+        self.assertEqual(self.cache.stats["revalidations"], 1)
+        self.assertEqual(self.library.stats["parses"], 1)
+
+        # 缓存失效后重新读取：内容变了才重新解析
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(PERSONA_MD.replace("爸妈年纪大了", "爸妈腿脚不便"))
+        os.utime(path, (os.path.getmtime(path) + 20,) * 2)
+        self.cache.invalidate(path)
+        self.assertEqual(self.library.persona_samples("孝子")["开场切入"], ["爸妈腿脚不便"])
+        self.assertEqual(self.library.stats["parses"], 2)
+
+    def test_missing_file_yields_empty_samples(self):
+        self.assertEqual(self.library.few_shot_samples("抖音"), [])
+        self.assertEqual(self.library.details(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import asyncio
+import sys
+import types
+import unittest
+from unittest import mock
+
+# Stub optional runtime dependencies to keep unit tests isolated.
+dotenv_module = types.ModuleType("dotenv")
+dotenv_module.load_dotenv = lambda: None
+sys.modules.setdefault("dotenv", dotenv_module)
+
+langgraph_module = types.ModuleType("langgraph")
+graph_module = types.ModuleType("langgraph.graph")
+
+
+class DummyStateGraph:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+graph_module.StateGraph = DummyStateGraph
+graph_module.END = "END"
+langgraph_module.graph = graph_module
+sys.modules.setdefault("langgraph", langgraph_module)
+sys.modules.setdefault("langgraph.graph", graph_module)
+
+import llm_cache
+import swarm_with_llm as module
+from _fixtures import FILLER, chat_reply, planned_state, verdict_reply
+
+
+class _FakeAPI:
+    """人设2 的首稿审核不通过；人设3 的首稿生成很慢"""
+
+    async def __call__(self, payload, api_key, api_url):
+        prompt = payload["messages"][0]["content"]
+        module.record_usage({"prompt_tokens": 10, "completion_tokens": 5})
+        if "反AI八股文" in prompt:
+            if "人设2" in prompt and "修改版" not in prompt:
+                return verdict_reply(False, 5, ["AI味重"], ["改"])
+            return verdict_reply(True, 8)
+        if "你之前针对" in prompt:
+            return chat_reply(("修改版人设2" + FILLER)[:280])
+        persona = next(p for p in ("人设1", "人设2", "人设3") if f"人设：{p}" in prompt)
+        if persona == "人设3":
+            await asyncio.sleep(0.2)
+        return chat_reply((persona + FILLER)[:280])
+
+
+class PipelineTests(unittest.TestCase):
+    def setUp(self):
+        llm_cache.set_llm_cache(None)
+        module._api_limiter = None
+
+    def _run(self, state):
+        api = _FakeAPI()
+        with mock.patch.object(module, "_chat_completion", api), \
+                mock.patch.object(module.config, "WRITER_STREAMING", False):
+            result = asyncio.run(module.流水线(state))
+        return result
+
+    def test_articles_revise_independently_and_assemble_in_order(self):
+        result = self._run(planned_state(3))
+        self.assertEqual([c["id"] for c in result["contents"]], [1, 2, 3])
+        self.assertEqual([r["id"] for r in result["review_results"]], [1, 2, 3])
+        self.assertTrue(all(r["passed"] for r in result["review_results"]))
+        self.assertEqual(result["contents"][1]["attempt"], 2)
+        self.assertTrue(result["contents"][1]["content"].startswith("修改版"))
+        self.assertEqual(result["current_attempt"], 2)
+        self.assertEqual(result["need_manual_review"], [])
+
+    def test_slow_draft_does_not_block_other_articles(self):
+        result = self._run(planned_state(3))
+        seconds = result["metadata"]["pipeline"]["article_seconds"]
+        # 篇2 的修改轮在慢稿（篇3）首稿完成之前就已经结束
+        self.assertLess(seconds["2"], seconds["3"])
+        self.assertLess(seconds["1"], 0.15)
+
+    def test_usage_attributed_to_stage(self):
+        result = self._run(planned_state(2))
+        by_node = result["metadata"]["token_usage"]["by_node"]
+        self.assertEqual(by_node["Writer"]["calls"], 2)
+        self.assertEqual(by_node["审核者"]["calls"], 3)
+        self.assertEqual(by_node["修改"]["calls"], 1)
+        self.assertEqual(result["metadata"]["token_usage"]["by_article"]["2"]["calls"], 4)
+        self.assertEqual(result["metadata"]["pipeline"]["attempts"], {"1": 1, "2": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import sys
+import types
+import unittest
+
+# Stub optional runtime dependencies to keep unit tests isolated.
+dotenv_module = types.ModuleType("dotenv")
+dotenv_module.load_dotenv = lambda: None
+sys.modules.setdefault("dotenv", dotenv_module)
+
+import prompts
+from usage_tracker import UsageLedger
+
+
+BRIEF = {
+    "车型": "CR-V",
+    "平台": "抖音",
+    "方向": "春节返乡",
+    "调性": "温和喜庆",
+    "车型专属打底知识": "1.5T地球梦发动机，193匹马力，2701mm轴距" * 50,
+}
+
+
+def _assignment(article_id, persona, scene):
+    return {"id": article_id, "persona": persona, "selling_point": f"卖点{article_id}", "scene": scene}
+
+
+def _common_prefix(a: str, b: str) -> int:
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+
+class WriterPromptTests(unittest.TestCase):
+    def _prompt(self, brief, assignment, details):
+        return prompts.build_writer_prompt(brief, assignment, ["开场"], ["痛点"], details, ["爆款"])
+
+    def test_articles_share_static_prefix(self):
+        first = self._prompt(BRIEF, _assignment(1, "宝妈", "接娃"), ["细节A"])
+        second = self._prompt(BRIEF, _assignment(2, "程序员", "加班"), ["细节B"])
+        prefix = prompts.writer_prompt_prefix("CR-V", "抖音", BRIEF["车型专属打底知识"])
+        self.assertTrue(first.startswith(prefix))
+        self.assertTrue(second.startswith(prefix))
+        self.assertGreaterEqual(_common_prefix(first, second), len(prefix))
+        # 车型资料必须在前缀里，人设 / 场景必须在前缀之后
+        self.assertIn(BRIEF["车型专属打底知识"], prefix)
+        self.assertNotIn("宝妈", prefix)
+        self.assertNotIn("春节返乡", prefix)
+
+    def test_prefix_differs_per_platform(self):
+        douyin = prompts.writer_prompt_prefix("CR-V", "抖音", "资料")
+        toutiao = prompts.writer_prompt_prefix("CR-V", "今日头条", "资料")
+        self.assertNotEqual(douyin, toutiao)
+        self.assertIs(douyin, prompts.writer_prompt_prefix("CR-V", "抖音", "资料"))
+
+
+class ReviewAndRevisionPromptTests(unittest.TestCase):
+    def test_review_prompt_puts_content_last(self):
+        prompt = prompts.build_review_prompt("正文内容", {"persona": "宝妈", "selling_point": "空间"})
+        self.assertTrue(prompt.startswith(prompts.REVIEW_PROMPT_PREFIX))
+        self.assertTrue(prompt.endswith("正文内容"))
+
+    def test_batch_review_prefix_independent_of_batch_size(self):
+        items = [
+            {"id": i, "content": f"正文{i}", "assignment": {"persona": "宝妈", "selling_point": "空间"}}
+            for i in range(1, 4)
+        ]
+        self.assertTrue(prompts.build_batch_review_prompt(items).startswith(prompts.BATCH_REVIEW_PROMPT_PREFIX))
+        self.assertTrue(prompts.build_batch_review_prompt(items[:1]).startswith(prompts.BATCH_REVIEW_PROMPT_PREFIX))
+
+    def test_revision_prompts_share_platform_prefix(self):
+        first = prompts.build_revision_prompt(BRIEF, _assignment(1, "宝妈", "接娃"), "原文一", ["问题一"], ["建议一"])
+        second = prompts.build_revision_prompt(BRIEF, _assignment(2, "程序员", "加班"), "原文二", ["问题二"], ["建议二"])
+        prefix = prompts.revision_prompt_prefix("抖音")
+        self.assertTrue(first.startswith(prefix))
+        self.assertTrue(second.startswith(prefix))
+        self.assertIn("原文一", first[len(prefix):])
+
+
+class PrefixCacheHitRateTests(unittest.TestCase):
+    def test_hit_rate_tracked_per_node(self):
+        ledger = UsageLedger({})
+        ledger.record({"prompt_tokens": 1000, "completion_tokens": 10, "prompt_cache_hit_tokens": 0}, node="Writer")
+        ledger.record({"prompt_tokens": 1000, "completion_tokens": 10, "prompt_cache_hit_tokens": 900}, node="Writer")
+        self.assertEqual(ledger.data["by_node"]["Writer"]["prompt_cache_hit_rate"], 0.45)
+        self.assertEqual(ledger.data["total"]["prompt_cache_hit_rate"], 0.45)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import asyncio
+import sys
+import types
+import unittest
+from unittest import mock
+
+# Stub optional runtime dependencies to keep unit tests isolated.
+dotenv_module = types.ModuleType("dotenv")
+dotenv_module.load_dotenv = lambda: None
+sys.modules.setdefault("dotenv", dotenv_module)
+
+langgraph_module = types.ModuleType("langgraph")
+graph_module = types.ModuleType("langgraph.graph")
+
+
+class DummyStateGraph:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+graph_module.StateGraph = DummyStateGraph
+graph_module.END = "END"
+langgraph_module.graph = graph_module
+sys.modules.setdefault("langgraph", langgraph_module)
+sys.modules.setdefault("langgraph.graph", graph_module)
+
+import llm_cache
+import swarm_with_llm as module
+from _fixtures import draft, review_state, verdict_reply
+
+
+class _FakeReviewer:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, payload, api_key, api_url):
+        self.calls += 1
+        return verdict_reply(False, 5, ["AI味重"], ["口语化"])
+
+
+class ReviewGateTests(unittest.TestCase):
+    def setUp(self):
+        llm_cache.set_llm_cache(None)
+        module._api_limiter = None
+        self.reviewer = _FakeReviewer()
+        for patcher in (
+            mock.patch.object(module, "_chat_completion", self.reviewer),
+            mock.patch.object(module.config, "REVIEW_BATCH_ENABLED", False),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _review(self, state, mode):
+        with mock.patch.object(module.config, "REVIEW_GATE_MODE", mode):
+            return asyncio.run(module.审核者(state))
+
+    def test_hard_failures_skip_llm_review(self):
+        # 篇2 含禁用词、篇3 字数不足：都不送 LLM
+        contents = [draft(1, "好"), draft(2, "说实话，"), {**draft(3, ""), "content": "太短了"}]
+        state = self._review(review_state(contents), "gate")
+        self.assertEqual(self.reviewer.calls, 1)
+        self.assertEqual(state["metadata"]["reviewer"]["gated_items"], 2)
+        self.assertEqual([r["passed"] for r in state["review_results"]], [False, False, False])
+        self.assertIn("AI味重", state["review_results"][0]["issues"])
+        self.assertTrue(any("禁用词" in issue for issue in state["review_results"][1]["issues"]))
+
+    def test_gated_item_still_gets_full_issue_list(self):
+        state = self._review(review_state([draft(1, "说实话，每到春节就归心似箭，")]), "gate")
+        result = state["review_results"][0]
+        self.assertTrue(any("禁用词" in issue for issue in result["issues"]))
+        self.assertTrue(any("套话" in issue for issue in result["issues"]))
+        self.assertTrue(any("配置数据" in issue for issue in result["issues"]))
+        self.assertTrue(result["suggestions"])
+
+    def test_off_mode_reviews_everything(self):
+        self._review(review_state([draft(1, "好"), draft(2, "说实话，")]), "off")
+        self.assertEqual(self.reviewer.calls, 2)
+
+    def test_lazy_mode_calls_llm_on_final_attempt(self):
+        self._review(review_state([draft(1, "说实话，")], attempt=2), "lazy")
+        self.assertEqual(self.reviewer.calls, 0)
+        state = self._review(review_state([draft(1, "说实话，")], attempt=3), "lazy")
+        self.assertEqual(self.reviewer.calls, 1)
+        self.assertIn("AI味重", state["review_results"][0]["issues"])
+
+
+if __name__ == "__main__":
+    unittest.main()
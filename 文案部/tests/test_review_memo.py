@@ -0,0 +1,96 @@
+import asyncio
+import sys
+import types
+import unittest
+from unittest import mock
+
+# Stub optional runtime dependencies to keep unit tests isolated.
+dotenv_module = types.ModuleType("dotenv")
+dotenv_module.load_dotenv = lambda: None
+sys.modules.setdefault("dotenv", dotenv_module)
+
+langgraph_module = types.ModuleType("langgraph")
+graph_module = types.ModuleType("langgraph.graph")
+
+
+class DummyStateGraph:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+graph_module.StateGraph = DummyStateGraph
+graph_module.END = "END"
+langgraph_module.graph = graph_module
+sys.modules.setdefault("langgraph", langgraph_module)
+sys.modules.setdefault("langgraph.graph", graph_module)
+
+import llm_cache
+import swarm_with_llm as module
+from _fixtures import draft, review_state, verdict_reply
+
+
+class _FakeReviewer:
+    """正文以“差”开头的判不通过；fail_api=True 时模拟 API 故障"""
+
+    def __init__(self):
+        self.calls = 0
+        self.fail_api = False
+
+    async def __call__(self, payload, api_key, api_url):
+        self.calls += 1
+        if self.fail_api:
+            raise RuntimeError("boom")
+        prompt = payload["messages"][0]["content"]
+        if "正文：\n差" in prompt:
+            return verdict_reply(False, 4, ["AI味"])
+        return verdict_reply(True, 8)
+
+
+class ReviewMemoTests(unittest.TestCase):
+    def setUp(self):
+        llm_cache.set_llm_cache(None)
+        module._api_limiter = None
+        self.reviewer = _FakeReviewer()
+        patcher = mock.patch.object(module, "_chat_completion", self.reviewer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        config_patcher = mock.patch.object(module.config, "REVIEW_BATCH_ENABLED", False)
+        config_patcher.start()
+        self.addCleanup(config_patcher.stop)
+
+    def _review(self, state):
+        return asyncio.run(module.审核者(state))
+
+    def test_only_rewritten_articles_are_re_reviewed(self):
+        state = self._review(review_state([draft(1, "好"), draft(2, "差"), draft(3, "差")]))
+        self.assertEqual(self.reviewer.calls, 3)
+        self.assertEqual([r["passed"] for r in state["review_results"]], [True, False, False])
+
+        # 修改轮：篇2 改写，篇1 通过原样保留，篇3 修改失败保留原文
+        state["contents"] = [draft(1, "好"), draft(2, "好，改过了"), draft(3, "差")]
+        state["current_attempt"] = 2
+        state = self._review(state)
+        self.assertEqual(self.reviewer.calls, 4)
+        self.assertEqual([r["passed"] for r in state["review_results"]], [True, True, False])
+        self.assertEqual(state["metadata"]["review_rounds"][-1], {
+            "attempt": 2, "reviewed": 1, "memo_hits": 2, "saved_review_calls": 2,
+        })
+
+    def test_rubric_change_invalidates_memo(self):
+        state = self._review(review_state([draft(1, "好")]))
+        with mock.patch.object(module, "_REVIEW_RUBRIC_FINGERPRINT", "new-rubric"):
+            self._review(state)
+        self.assertEqual(self.reviewer.calls, 2)
+
+    def test_fallback_verdict_is_not_memoized(self):
+        self.reviewer.fail_api = True
+        state = self._review(review_state([draft(1, "差")]))
+        self.assertTrue(state["review_results"][0]["passed"])
+        self.reviewer.fail_api = False
+        state = self._review(state)
+        self.assertEqual(self.reviewer.calls, 2)
+        self.assertFalse(state["review_results"][0]["passed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
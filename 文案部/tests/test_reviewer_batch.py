@@ -0,0 +1,131 @@
+import asyncio
+import json
+import sys
+import types
+import unittest
+from unittest import mock
+
+# Stub optional runtime dependencies to keep unit tests isolated.
+dotenv_module = types.ModuleType("dotenv")
+dotenv_module.load_dotenv = lambda: None
+sys.modules.setdefault("dotenv", dotenv_module)
+
+langgraph_module = types.ModuleType("langgraph")
+graph_module = types.ModuleType("langgraph.graph")
+
+
+class DummyStateGraph:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+graph_module.StateGraph = DummyStateGraph
+graph_module.END = "END"
+langgraph_module.graph = graph_module
+sys.modules.setdefault("langgraph", langgraph_module)
+sys.modules.setdefault("langgraph.graph", graph_module)
+
+import llm_cache
+import swarm_with_llm as module
+from llm_cache import LLMResponseCache
+
+
+def _items(count, length=200):
+    return [
+        {"id": i, "content": f"篇{i}" + "字" * length, "assignment": {"persona": "宝妈", "selling_point": "空间"}}
+        for i in range(1, count + 1)
+    ]
+
+
+def _verdict(article_id, passed=False):
+    return {"id": article_id, "passed": passed, "score": 8 if passed else 4, "issues": [] if passed else [f"篇{article_id}问题"], "suggestions": []}
+
+
+class _FakeReviewer:
+    """批量请求返回 batch_reply(ids)，单篇请求返回 passed=True"""
+
+    def __init__(self, batch_reply):
+        self.batch_reply = batch_reply
+        self.batch_calls = []
+        self.single_calls = 0
+
+    async def __call__(self, payload, api_key, api_url):
+        prompt = payload["messages"][0]["content"]
+        if "=== 篇" in prompt:
+            ids = [item["id"] for item in self.current if f"=== 篇{item['id']} ===" in prompt]
+            self.batch_calls.append(ids)
+            content = self.batch_reply(ids)
+        else:
+            self.single_calls += 1
+            content = json.dumps({"passed": True, "score": 9, "issues": [], "suggestions": []})
+        return {"choices": [{"message": {"content": content}}]}
+
+    def run(self, items, **config_overrides):
+        self.current = items
+        stats = {}
+        overrides = {"REVIEW_BATCH_ENABLED": True, "REVIEW_BATCH_SIZE": 10, "REVIEW_BATCH_MAX_PROMPT_TOKENS": 6000}
+        overrides.update(config_overrides)
+        with mock.patch.object(module, "_chat_completion", self), \
+                mock.patch.multiple(module.config, **overrides):
+            reviews = asyncio.run(module.evaluate_contents_ai_flavor_async(items, "k", "u", stats=stats))
+        return reviews, stats
+
+
+class BatchReviewTests(unittest.TestCase):
+    def setUp(self):
+        llm_cache.set_llm_cache(None)
+
+    def tearDown(self):
+        llm_cache.set_llm_cache(None)
+
+    def test_ten_articles_in_one_request(self):
+        reviewer = _FakeReviewer(lambda ids: json.dumps([_verdict(i) for i in ids]))
+        reviews, stats = reviewer.run(_items(10))
+        self.assertEqual(len(reviewer.batch_calls), 1)
+        self.assertEqual(reviewer.single_calls, 0)
+        self.assertEqual(sorted(reviews), list(range(1, 11)))
+        self.assertEqual(reviews[3]["issues"], ["篇3问题"])
+        self.assertEqual(stats["fallback_items"], 0)
+
+    def test_missing_id_falls_back_alone(self):
+        reviewer = _FakeReviewer(lambda ids: "```json\n" + json.dumps([_verdict(i) for i in ids if i != 4]) + "\n```")
+        reviews, stats = reviewer.run(_items(6))
+        self.assertEqual(reviewer.single_calls, 1)
+        self.assertTrue(reviews[4]["passed"])
+        self.assertFalse(reviews[5]["passed"])
+        self.assertEqual(stats["fallback_items"], 1)
+
+    def test_unparseable_reply_falls_back_per_item(self):
+        reviewer = _FakeReviewer(lambda ids: "抱歉，我无法完成")
+        reviews, stats = reviewer.run(_items(4))
+        self.assertEqual(reviewer.single_calls, 4)
+        self.assertEqual(len(reviews), 4)
+        self.assertEqual(stats["fallback_items"], 4)
+
+    def test_batches_respect_prompt_token_budget(self):
+        reviewer = _FakeReviewer(lambda ids: json.dumps([_verdict(i) for i in ids]))
+        reviews, _ = reviewer.run(_items(10, length=600), REVIEW_BATCH_MAX_PROMPT_TOKENS=2000)
+        self.assertGreater(len(reviewer.batch_calls), 1)
+        # 凑不满一批的尾巴直接走单篇请求
+        self.assertEqual(sum(len(batch) for batch in reviewer.batch_calls) + reviewer.single_calls, 10)
+        self.assertEqual(len(reviews), 10)
+
+    def test_batch_verdicts_reused_by_per_item_cache(self):
+        llm_cache.set_llm_cache(LLMResponseCache(path=":memory:"))
+        reviewer = _FakeReviewer(lambda ids: json.dumps([_verdict(i) for i in ids]))
+        items = _items(3)
+        reviewer.run(items)
+        reviews, _ = reviewer.run(items)
+        self.assertEqual(len(reviewer.batch_calls), 1)
+        self.assertEqual(reviewer.single_calls, 0)
+        self.assertFalse(reviews[2]["passed"])
+
+    def test_disabled_reviews_each_article(self):
+        reviewer = _FakeReviewer(lambda ids: "[]")
+        reviewer.run(_items(3), REVIEW_BATCH_ENABLED=False)
+        self.assertEqual(reviewer.batch_calls, [])
+        self.assertEqual(reviewer.single_calls, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+# Stub optional runtime dependencies to keep unit tests isolated.
+dotenv_module = types.ModuleType("dotenv")
+dotenv_module.load_dotenv = lambda: None
+sys.modules.setdefault("dotenv", dotenv_module)
+
+langgraph_module = types.ModuleType("langgraph")
+graph_module = types.ModuleType("langgraph.graph")
+
+
+class DummyStateGraph:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+graph_module.StateGraph = DummyStateGraph
+graph_module.END = "END"
+langgraph_module.graph = graph_module
+sys.modules.setdefault("langgraph", langgraph_module)
+sys.modules.setdefault("langgraph.graph", graph_module)
+
+import llm_cache
+import run_store
+import swarm_with_llm as module
+from _fixtures import FILLER, chat_reply, planned_state, verdict_reply
+
+
+class _FakeAPI:
+    """Writer 请求返回正文；fail_persona 指定的人设模拟创作失败"""
+
+    def __init__(self):
+        self.writer_calls = 0
+        self.fail_persona = None
+
+    async def __call__(self, payload, api_key, api_url):
+        prompt = payload["messages"][0]["content"]
+        if "反AI八股文" in prompt:
+            return verdict_reply(True, 8)
+        self.writer_calls += 1
+        if self.fail_persona and f"人设：{self.fail_persona}" in prompt:
+            raise RuntimeError("boom")
+        return chat_reply(FILLER[:280])
+
+
+class RunStoreTests(unittest.TestCase):
+    def test_run_lifecycle(self):
+        store = run_store.RunStore(":memory:")
+        store.start_run("a", {"车型": "CR-V", "数量": 3})
+        store.start_run("b", {"车型": "HRV", "数量": 1})
+        store.record_node("a", "Writer")
+        store.set_status("a", "finished", "04-产出仓库/a.xlsx")
+        store.set_status("a", "finished")
+
+        run = store.get_run("a")
+        self.assertEqual(run["status"], "finished")
+        self.assertEqual(run["last_node"], "Writer")
+        self.assertEqual(run["final_output"], "04-产出仓库/a.xlsx")
+        self.assertEqual(run["user_input"]["数量"], 3)
+        self.assertEqual([r["run_id"] for r in store.list_runs()], ["b", "a"])
+        self.assertIsNone(store.get_run("missing"))
+
+
+class FinishedRunTests(unittest.TestCase):
+    def setUp(self):
+        self.store = run_store.RunStore(":memory:")
+        run_store.set_run_store(self.store)
+        self.addCleanup(run_store.set_run_store, None)
+
+    def test_finished_run_loads_from_snapshot_without_checkpointer(self):
+        final_state = {"run_id": "a", "user_input": {"车型": "CR-V"}, "contents": [{"id": 1, "content": "正文"}]}
+        self.store.start_run("a", {"车型": "CR-V"})
+        self.store.set_status("a", "finished", "04-产出仓库/a.xlsx", final_state)
+        self.assertIsNone(self.store.load_final_state("missing"))
+
+        def no_checkpointer():
+            raise AssertionError("已完成的运行不应再打开检查点")
+
+        with mock.patch.object(module, "open_checkpointer", no_checkpointer):
+            result = asyncio.run(module.arun_swarm(None, close_client=False, run_id="a"))
+        self.assertEqual(result, final_state)
+
+    def test_old_database_gains_snapshot_column(self):
+        path = os.path.join(tempfile.mkdtemp(), "runs.sqlite3")
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE runs (run_id TEXT PRIMARY KEY, user_input TEXT NOT NULL, status TEXT NOT NULL,"
+            " last_node TEXT NOT NULL DEFAULT '', final_output TEXT NOT NULL DEFAULT '',"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("INSERT INTO runs VALUES ('old', '{}', 'finished', '', 'x.xlsx', 0, 0)")
+        conn.commit()
+        conn.close()
+
+        store = run_store.RunStore(path)
+        self.addCleanup(store.close)
+        self.assertIsNone(store.load_final_state("old"))
+        self.assertEqual(store.get_run("old")["final_output"], "x.xlsx")
+
+
+class _FakeMemorySaver:
+    """InMemorySaver 的最小替身：storage 按 thread_id 存检查点"""
+
+    def __init__(self, threads):
+        self.storage = {thread_id: {"checkpoint": thread_id} for thread_id in threads}
+
+    def delete_thread(self, thread_id):
+        self.storage.pop(thread_id, None)
+
+
+class MemoryCheckpointerTests(unittest.TestCase):
+    def setUp(self):
+        self.saver = _FakeMemorySaver(["r1", "r2", "r3"])
+        for patcher in (
+            mock.patch.object(run_store, "_memory_checkpointer", self.saver),
+            mock.patch.object(run_store.config, "CHECKPOINT_MEMORY_MAX_THREADS", 2),
+            mock.patch.object(run_store.config, "CHECKPOINT_ENABLED", True),
+            # 模拟未安装 langgraph-checkpoint-sqlite
+            mock.patch.dict(sys.modules, {"langgraph.checkpoint.sqlite.aio": None}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_finished_run_is_released_and_old_threads_are_pruned(self):
+        async def run():
+            async with run_store.open_checkpointer("r4") as checkpointer:
+                self.assertIs(checkpointer, self.saver)
+                # 中断未续的运行只保留最近的 2 个
+                self.assertEqual(list(self.saver.storage), ["r2", "r3"])
+                checkpointer.storage["r4"] = {}
+                run_store.release_checkpoint(checkpointer, "r4")
+
+        asyncio.run(run())
+        self.assertEqual(list(self.saver.storage), ["r2", "r3"])
+
+    def test_runs_in_flight_are_never_pruned(self):
+        async def one_run(run_id, started, release):
+            async with run_store.open_checkpointer(run_id) as checkpointer:
+                checkpointer.storage[run_id] = {}
+                started.set()
+                await release.wait()
+                return run_id in checkpointer.storage
+
+        async def run():
+            release = asyncio.Event()
+            runs = []
+            # 并发运行数超过上限：后进入的运行淘汰旧检查点时不能动前面还在跑的
+            for run_id in ("b1", "b2", "b3", "b4"):
+                started = asyncio.Event()
+                runs.append(asyncio.ensure_future(one_run(run_id, started, release)))
+                await started.wait()
+            self.assertEqual(list(self.saver.storage), ["r2", "r3", "b1", "b2", "b3", "b4"])
+            release.set()
+            return await asyncio.gather(*runs)
+
+        self.assertEqual(asyncio.run(run()), [True, True, True, True])
+        self.assertEqual(run_store._active_runs, set())
+
+    def test_persistent_checkpointer_is_left_alone(self):
+        other = _FakeMemorySaver(["r1"])
+        run_store.release_checkpoint(other, "r1")
+        run_store.release_checkpoint(None, "r1")
+        self.assertEqual(list(other.storage), ["r1"])
+
+
+class ArticleJournalTests(unittest.TestCase):
+    def setUp(self):
+        llm_cache.set_llm_cache(None)
+        module._api_limiter = None
+        run_store.set_run_store(run_store.RunStore(":memory:"))
+        self.addCleanup(run_store.set_run_store, None)
+        self.api = _FakeAPI()
+        for patcher in (
+            mock.patch.object(module, "_chat_completion", self.api),
+            mock.patch.object(module.config, "WRITER_STREAMING", False),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_writer_replay_only_redoes_unfinished_articles(self):
+        self.api.fail_persona = "人设2"
+        state = asyncio.run(module.Writer(planned_state(3, run_id="run-1")))
+        self.assertTrue(state["contents"][1]["content"].startswith("[创作失败"))
+        self.assertEqual(self.api.writer_calls, 3)
+
+        # 节点重放（续跑）：篇1 / 篇3 从日志取回，只重写失败的篇2
+        self.api.fail_persona = None
+        state = asyncio.run(module.Writer(planned_state(3, run_id="run-1")))
+        self.assertEqual(self.api.writer_calls, 4)
+        self.assertEqual(state["metadata"]["resumed_articles"], 2)
+        self.assertFalse(any(c["content"].startswith("[创作失败") for c in state["contents"]))
+
+    def test_pipeline_replay_skips_finished_articles(self):
+        asyncio.run(module.流水线(planned_state(2, run_id="run-1")))
+        calls = self.api.writer_calls
+        result = asyncio.run(module.流水线(planned_state(2, run_id="run-1")))
+        self.assertEqual(self.api.writer_calls, calls)
+        self.assertEqual([c["id"] for c in result["contents"]], [1, 2])
+        self.assertTrue(all(r["passed"] for r in result["review_results"]))
+
+    def test_finished_run_leaves_no_journal_rows(self):
+        store = run_store.get_run_store()
+        store.start_run("run-1", {})
+        store.start_run("run-2", {})
+        asyncio.run(module.流水线(planned_state(2, run_id="run-1")))
+        asyncio.run(module.Writer(planned_state(2, run_id="run-2")))
+        self.assertGreater(store.count_articles("run-1"), 0)
+
+        store.set_status("run-1", "interrupted")
+        self.assertGreater(store.count_articles("run-1"), 0)
+        store.set_status("run-1", "finished", "04-产出仓库/run-1.xlsx")
+        self.assertEqual(store.count_articles("run-1"), 0)
+        self.assertEqual(store.count_articles("run-2"), 2)
+        self.assertEqual(store.get_run("run-1")["final_output"], "04-产出仓库/run-1.xlsx")
+
+    def test_journal_is_scoped_to_run(self):
+        asyncio.run(module.Writer(planned_state(2, run_id="run-1")))
+        asyncio.run(module.Writer(planned_state(2, run_id="run-2")))
+        self.assertEqual(self.api.writer_calls, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,27 @@
+import os
+import tempfile
 import unittest
 
-from scene_rag import SceneRetriever
+from scene_rag import SceneRetriever, _load_numpy
+
+_SYNTHETIC_LIBRARY = """# 场景库
+
+## 一、海边露营场景
+
+沙滩搭帐篷，听着海浪入睡，后备厢装满渔具和烧烤架。
+
+## 二、雪山自驾场景
+
+盘山公路积雪结冰，四驱和座椅加热让人安心。
+
+## 三、深夜加班场景
+
+写字楼灯火通明，下班已是凌晨，一个人开车回家。
+
+## 四、使用原则
+
+海边、雪山、加班都只是示例。
+"""
 
 
 class SceneRagTests(unittest.TestCase):
@@ -42,6 +63,67 @@ class SceneRagTests(unittest.TestCase):
         self.assertTrue(result["fallback_used"])
         self.assertEqual(result["scene_type"], "春节返乡")
 
+    def test_index_matches_nested_substring_scan(self):
+        retriever = SceneRetriever(
+            scene_library_path="02-参考学习/03-Writer材料/内容变量库/场景切入库.md",
+            top_k=3,
+            min_score=0.15,
+            default_scene="春节返乡",
+        )
+        for query in ["过年回家满载而归", "周末带娃去郊外露营 SUV", "早高峰通勤堵车", "接爸妈回老家过年过年"]:
+            query_terms = retriever.engine.extract_terms(query)
+            expected = {}
+            for scene_name, scene_terms in retriever.engine._scene_terms.items():
+                expected[scene_name] = [
+                    next(st for st in scene_terms if q in st or st in q)
+                    for q in query_terms
+                    if any(q in st or st in q for st in scene_terms)
+                ]
+            self.assertEqual(retriever.engine._match_terms(query_terms), expected, query)
+
+
+
+class BM25SceneEngineTests(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".md")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(_SYNTHETIC_LIBRARY)
+        self.addCleanup(os.remove, self.path)
+
+    def _retriever(self, **options):
+        return SceneRetriever(self.path, top_k=2, min_score=0.15, default_scene="海边露营", engine="bm25", **options)
+
+    def test_retrieves_section_by_ngrams(self):
+        retriever = self._retriever()
+        result = retriever.retrieve("周末想去海边搭帐篷")
+        self.assertEqual(set(result), {"scene_type", "keywords", "evidence", "score", "fallback_used"})
+        self.assertEqual(result["scene_type"], "海边露营")
+        self.assertFalse(result["fallback_used"])
+        self.assertIn("搭帐篷", result["keywords"])
+        self.assertEqual(retriever.retrieve("凌晨下班开车回家")["scene_type"], "深夜加班")
+        # "## 四、使用原则" 不是场景标题，BM25 建索引时也截在它之前
+        self.assertEqual(list(retriever.engine.sections), ["海边露营", "雪山自驾", "深夜加班"])
+        self.assertTrue(retriever.retrieve("火星基地能源补给站")["fallback_used"])
+
+    def test_batch_matches_single_queries(self):
+        retriever = self._retriever(batch_size=2)
+        queries = ["雪山四驱", "", "海浪", "？？", "加班到凌晨", "盘山公路积雪"]
+        self.assertEqual(retriever.retrieve_many(queries), [retriever.retrieve(q) for q in queries])
+        self.assertEqual(retriever.retrieve("？？")["evidence"][0], "query_unusable")
+
+    def test_pure_python_path_matches_sparse_path(self):
+        if _load_numpy()[0] is None:
+            self.skipTest("numpy / scipy not installed")
+        queries = ["雪山四驱", "海浪烧烤", "加班到凌晨开车", "座椅加热"]
+        self.assertEqual(
+            self._retriever().retrieve_many(queries),
+            self._retriever(use_numpy=False).retrieve_many(queries),
+        )
+
+    def test_unknown_engine_rejected(self):
+        with self.assertRaises(ValueError):
+            SceneRetriever(self.path, engine="faiss")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,128 @@
+import asyncio
+import sys
+import types
+import unittest
+from unittest import mock
+
+# Stub optional runtime dependencies to keep unit tests isolated.
+dotenv_module = types.ModuleType("dotenv")
+dotenv_module.load_dotenv = lambda: None
+sys.modules.setdefault("dotenv", dotenv_module)
+
+langgraph_module = types.ModuleType("langgraph")
+graph_module = types.ModuleType("langgraph.graph")
+
+
+class DummyStateGraph:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+graph_module.StateGraph = DummyStateGraph
+graph_module.END = "END"
+langgraph_module.graph = graph_module
+sys.modules.setdefault("langgraph", langgraph_module)
+sys.modules.setdefault("langgraph.graph", graph_module)
+
+import swarm_with_llm as module
+from _fixtures import FILLER
+
+
+GOOD = FILLER[:280]
+TOO_SHORT = FILLER[:120]
+BANNED = ("说实话，" + FILLER)[:280]
+
+
+class _FakeWriter:
+    """按温度返回预设正文，可给每个温度设定延迟"""
+
+    def __init__(self, texts, delays=None):
+        self.texts = texts
+        self.delays = delays or {}
+        self.temperatures = []
+        self.finished = []
+
+    async def __call__(self, prompt, platform, article_id, temperature=0.7, max_tokens=512):
+        self.temperatures.append(temperature)
+        await asyncio.sleep(self.delays.get(temperature, 0))
+        self.finished.append(temperature)
+        return {"content": self.texts[temperature], "truncated": False}
+
+
+class SpeculativeDraftTests(unittest.TestCase):
+    def _generate(self, writer, k, early_accept, stats=None):
+        with mock.patch.object(module, "generate_writer_text_async", writer), \
+                mock.patch.object(module.config, "WRITER_CANDIDATES", k), \
+                mock.patch.object(module.config, "WRITER_CANDIDATE_TEMPERATURE_RANGE", (0.6, 1.0)), \
+                mock.patch.object(module.config, "WRITER_CANDIDATE_EARLY_ACCEPT", early_accept):
+            return asyncio.run(module.generate_writer_candidates_async("prompt", "抖音", 1, stats=stats))
+
+    def test_single_candidate_keeps_caller_temperature(self):
+        writer = _FakeWriter({0.7: GOOD})
+        result = self._generate(writer, 1, True)
+        self.assertEqual(writer.temperatures, [0.7])
+        self.assertEqual(result["content"], GOOD)
+
+    def test_ranking_picks_in_range_candidate_without_banned_words(self):
+        writer = _FakeWriter({0.6: TOO_SHORT, 0.8: BANNED, 1.0: GOOD})
+        stats = {}
+        result = self._generate(writer, 3, False, stats)
+        self.assertEqual(sorted(writer.temperatures), [0.6, 0.8, 1.0])
+        self.assertEqual(result["content"], GOOD)
+        self.assertEqual(result["temperature"], 1.0)
+        self.assertEqual(stats["candidates"], 3)
+        self.assertEqual(stats["discarded"], 2)
+        self.assertGreater(stats["discarded_tokens"], 0)
+        self.assertEqual(stats["rescued"], 1)
+
+    def test_early_accept_cancels_slower_candidates(self):
+        writer = _FakeWriter({0.6: GOOD, 0.8: GOOD, 1.0: GOOD}, delays={0.8: 1.0, 1.0: 1.0})
+        stats = {}
+        result = self._generate(writer, 3, True, stats)
+        self.assertEqual(result["temperature"], 0.6)
+        self.assertEqual(writer.finished, [0.6])
+        self.assertEqual(stats["cancelled"], 2)
+        self.assertEqual(stats["discarded"], 0)
+
+    def test_losing_candidates_have_exited_when_call_returns(self):
+        tasks = []
+        released = []
+
+        async def holding_slot(prompt, platform, article_id, temperature=0.7, max_tokens=512):
+            tasks.append(asyncio.current_task())
+            try:
+                await asyncio.sleep(0 if temperature == 0.6 else 1.0)
+                return {"content": GOOD, "truncated": False}
+            finally:
+                # 模拟释放限制器名额 / 关闭流式连接
+                released.append(temperature)
+
+        async def run():
+            stats = {}
+            with mock.patch.object(module, "generate_writer_text_async", holding_slot), \
+                    mock.patch.object(module.config, "WRITER_CANDIDATES", 3), \
+                    mock.patch.object(module.config, "WRITER_CANDIDATE_TEMPERATURE_RANGE", (0.6, 1.0)), \
+                    mock.patch.object(module.config, "WRITER_CANDIDATE_EARLY_ACCEPT", True):
+                await module.generate_writer_candidates_async("prompt", "抖音", 1, stats=stats)
+            self.assertTrue(all(task.done() for task in tasks))
+            self.assertEqual(sorted(released), [0.6, 0.8, 1.0])
+            self.assertEqual(stats["cancelled"], 2)
+
+        asyncio.run(run())
+
+    def test_failed_candidates_fall_back_to_survivors(self):
+        writer = _FakeWriter({0.6: GOOD})
+
+        async def flaky(prompt, platform, article_id, temperature=0.7, max_tokens=512):
+            if temperature != 0.6:
+                raise RuntimeError("upstream error")
+            return await writer(prompt, platform, article_id, temperature, max_tokens)
+
+        stats = {}
+        result = self._generate(flaky, 2, False, stats)
+        self.assertEqual(result["content"], GOOD)
+        self.assertEqual(stats["failed"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 其他测试会往 sys.modules 里塞 langgraph 替身，这里必须在干净的子进程里检查
+_PROBE = """
+import json, sys
+import swarm_with_llm as module
+
+report = {"eager": sorted(m for m in ("langgraph", "aiohttp", "openpyxl", "tenacity") if m in sys.modules),
+          "retriever_loaded": module._scene_retriever is not None}
+module.get_scene_retriever()
+report["retriever_loaded_after_use"] = module._scene_retriever is not None
+
+first = module.create_swarm()
+report["cached"] = module.create_swarm() is first
+
+from langgraph.checkpoint.memory import InMemorySaver
+saver = InMemorySaver()
+attached = module.create_swarm(saver)
+report["checkpointer_attached"] = attached.checkpointer is saver
+report["shared_graph_untouched"] = first.checkpointer is None
+print(json.dumps(report))
+"""
+
+
+class LazyStartupTests(unittest.TestCase):
+    def test_heavy_imports_are_deferred_and_graph_is_cached(self):
+        result = subprocess.run([sys.executable, "-c", _PROBE], cwd=ROOT, capture_output=True, text=True)
+        if "No module named 'langgraph" in result.stderr:
+            self.skipTest("langgraph 未安装")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        self.assertEqual(report["eager"], [])
+        self.assertFalse(report["retriever_loaded"])
+        self.assertTrue(report["retriever_loaded_after_use"])
+        self.assertTrue(report["cached"])
+        self.assertTrue(report["checkpointer_attached"])
+        self.assertTrue(report["shared_graph_untouched"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import sys
+import types
+import unittest
+
+# Stub optional runtime dependencies to keep unit tests isolated.
+dotenv_module = types.ModuleType("dotenv")
+dotenv_module.load_dotenv = lambda: None
+sys.modules.setdefault("dotenv", dotenv_module)
+
+langgraph_module = types.ModuleType("langgraph")
+graph_module = types.ModuleType("langgraph.graph")
+
+
+class DummyStateGraph:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+graph_module.StateGraph = DummyStateGraph
+graph_module.END = "END"
+langgraph_module.graph = graph_module
+sys.modules.setdefault("langgraph", langgraph_module)
+sys.modules.setdefault("langgraph.graph", graph_module)
+
+from aiohttp import web
+
+import llm_cache
+import llm_client
+import swarm_with_llm as module
+
+llm_cache.set_llm_cache(None)
+
+
+async def _start_sse_server(chunks, delay=0.005):
+    sent = {"chunks": 0}
+
+    async def handle(request):
+        body = await request.json()
+        assert body["stream"] is True
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        try:
+            for chunk in chunks:
+                event = {"choices": [{"delta": {"content": chunk}}]}
+                await response.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                sent["chunks"] += 1
+                await asyncio.sleep(delay)
+            await response.write(b"data: [DONE]\n\n")
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, sent, f"http://127.0.0.1:{port}/v1/chat/completions"
+
+
+class StreamingTests(unittest.TestCase):
+    def setUp(self):
+        module._api_limiter = None
+        llm_client.set_llm_client(None)
+
+    def _run(self, chunks, **kwargs):
+        async def _inner():
+            runner, sent, url = await _start_sse_server(chunks)
+            tokens = []
+            try:
+                result = await module.call_deepseek_api_stream_async(
+                    "p", "k", url, on_token=lambda delta, text: tokens.append(delta), **kwargs
+                )
+                await asyncio.sleep(0.05)
+            finally:
+                await llm_client.close_llm_client()
+                await runner.cleanup()
+            return result, tokens, sent["chunks"]
+
+        return asyncio.run(_inner())
+
+    def test_stream_collects_all_tokens(self):
+        result, tokens, _ = self._run(["你好", "，", "世界"])
+        self.assertEqual(result, {"content": "你好，世界", "truncated": False})
+        self.assertEqual(tokens, ["你好", "，", "世界"])
+
+    def test_stream_aborts_after_length_overrun(self):
+        chunks = ["字" * 5] * 200
+        result, tokens, sent = self._run(chunks, max_chars=50)
+        self.assertTrue(result["truncated"])
+        self.assertEqual(len(result["content"]), 55)
+        self.assertEqual(len(tokens), 11)
+        self.assertLess(sent, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import types
+import unittest
+from unittest import mock
+
+# Stub optional runtime dependencies to keep unit tests isolated.
+dotenv_module = types.ModuleType("dotenv")
+dotenv_module.load_dotenv = lambda: None
+sys.modules.setdefault("dotenv", dotenv_module)
+
+langgraph_module = types.ModuleType("langgraph")
+graph_module = types.ModuleType("langgraph.graph")
+
+
+class DummyStateGraph:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+graph_module.StateGraph = DummyStateGraph
+graph_module.END = "END"
+langgraph_module.graph = graph_module
+sys.modules.setdefault("langgraph", langgraph_module)
+sys.modules.setdefault("langgraph.graph", graph_module)
+
+import aiohttp
+from tenacity import wait_none
+
+import llm_client
+import swarm_with_llm as module
+import tracing
+from adaptive_limiter import AdaptiveLimiter
+
+
+def _span(span_id, name, start, end, parent=""):
+    return {"span_id": span_id, "parent_span_id": parent, "name": name, "start_ms": start, "end_ms": end,
+            "duration_ms": end - start, "attributes": {}, "error": False}
+
+
+class _FlakyResponse:
+    status = 200
+    headers = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return None
+
+    def raise_for_status(self):
+        return None
+
+    async def json(self):
+        return {"choices": [{"message": {"content": "ok"}}]}
+
+
+class _FlakySession:
+    """第一次请求连接失败，之后正常返回"""
+
+    closed = False
+
+    def __init__(self):
+        self.calls = 0
+
+    async def close(self):
+        self.closed = True
+
+    def post(self, *args, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            raise aiohttp.ClientConnectionError("reset")
+        return _FlakyResponse()
+
+
+class TracingTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.object(tracing.config, "TRACE_DIR", self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _spans(self, run_id):
+        return {s["name"]: s for s in tracing.load_spans(tracing.trace_path(run_id))}
+
+    def test_spans_nest_and_record_errors(self):
+        with tracing.trace_run("run-1", {"run.class": "batch"}):
+            with tracing.span("node.Writer"):
+                with tracing.span("article.write", {"article.id": 3, "skipped": None}) as span:
+                    span.add("llm.retries", 1)
+            with self.assertRaises(RuntimeError):
+                with tracing.span("excel.write"):
+                    raise RuntimeError("disk full")
+
+        spans = self._spans("run-1")
+        self.assertEqual(spans["node.Writer"]["parent_span_id"], spans["run"]["span_id"])
+        self.assertEqual(spans["article.write"]["parent_span_id"], spans["node.Writer"]["span_id"])
+        self.assertEqual(spans["article.write"]["attributes"], {"article.id": 3, "llm.retries": 1})
+        self.assertEqual(spans["run"]["attributes"]["run.class"], "batch")
+        self.assertTrue(spans["excel.write"]["error"])
+        self.assertFalse(spans["run"]["error"])
+
+    def test_spans_are_written_when_the_node_ends(self):
+        path = tracing.trace_path("run-buf")
+        with tracing.trace_run("run-buf"):
+            with tracing.span("node.Writer"):
+                with tracing.span("article.write"):
+                    pass
+                # 节点还没结束：span 还在内存里
+                self.assertEqual(os.path.getsize(path), 0)
+            self.assertEqual(len(tracing.load_spans(path)), 2)
+        self.assertEqual(len(tracing.load_spans(path)), 3)
+
+    def test_old_trace_files_are_pruned(self):
+        now = time.time()
+        for index in range(4):
+            path = tracing.trace_path(f"old-{index}")
+            open(path, "w").close()
+            os.utime(path, (now - index * 60, now - index * 60))
+        stale = tracing.trace_path("stale")
+        open(stale, "w").close()
+        os.utime(stale, (now - 30 * 86400, now - 30 * 86400))
+
+        with mock.patch.object(tracing.config, "TRACE_MAX_FILES", 3), \
+                mock.patch.object(tracing.config, "TRACE_MAX_AGE_DAYS", 7):
+            with tracing.trace_run("new"):
+                pass
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["new.jsonl", "old-0.jsonl", "old-1.jsonl"])
+
+    def test_span_is_noop_outside_a_run(self):
+        with tracing.span("llm.call") as span:
+            span.set_attribute("llm.purpose", "review")
+        self.assertIs(span, tracing.NOOP_SPAN)
+        self.assertIs(tracing.current_span(), tracing.NOOP_SPAN)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_llm_attempts_record_retries_and_timings(self):
+        session = _FlakySession()
+        chat = module._chat_completion.retry_with(wait=wait_none())
+
+        async def _run():
+            module._api_limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+            llm_client.set_llm_client(llm_client.LLMClient(session_factory=lambda: session))
+            try:
+                with tracing.trace_run("run-2"), tracing.span("llm.call"):
+                    await chat({"messages": []}, "k", "u")
+            finally:
+                module._api_limiter = None
+                llm_client.set_llm_client(None)
+
+        asyncio.run(_run())
+        spans = tracing.load_spans(tracing.trace_path("run-2"))
+        call = next(s for s in spans if s["name"] == "llm.call")
+        attempts = sorted((s for s in spans if s["name"] == "llm.attempt"), key=lambda s: s["start_ms"])
+        self.assertEqual(call["attributes"]["llm.retries"], 1)
+        self.assertEqual([a["attributes"]["llm.attempt"] for a in attempts], [1, 2])
+        self.assertTrue(attempts[0]["error"])
+        self.assertEqual(attempts[1]["attributes"]["http.status_code"], 200)
+        for key in ("llm.queue_wait_ms", "llm.ttfb_ms", "llm.body_ms"):
+            self.assertIn(key, attempts[1]["attributes"])
+
+    def test_critical_path_keeps_sequential_nodes_and_slowest_parallel_child(self):
+        spans = [
+            _span("r", "run", 0, 100),
+            _span("a", "node.客户经理", 0, 10, "r"),
+            _span("b", "node.Writer", 10, 90, "r"),
+            _span("b1", "article.write", 11, 40, "b"),
+            _span("b2", "article.write", 11, 88, "b"),
+            _span("c", "node.输出校订者", 90, 100, "r"),
+        ]
+        path = [(s["span_id"], s["depth"]) for s in tracing.critical_path(spans)]
+        self.assertEqual(path, [("r", 0), ("a", 1), ("b", 1), ("b2", 2), ("c", 1)])
+
+    def test_percentile_interpolates(self):
+        self.assertEqual(tracing.percentile([1, 2, 3, 4], 50), 2.5)
+        self.assertEqual(tracing.percentile([5], 95), 5)
+        self.assertEqual(tracing.percentile([], 50), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
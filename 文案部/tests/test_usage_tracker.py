@@ -0,0 +1,151 @@
+import asyncio
+import sys
+import types
+import unittest
+from unittest import mock
+
+# Stub optional runtime dependencies to keep unit tests isolated.
+dotenv_module = types.ModuleType("dotenv")
+dotenv_module.load_dotenv = lambda: None
+sys.modules.setdefault("dotenv", dotenv_module)
+
+langgraph_module = types.ModuleType("langgraph")
+graph_module = types.ModuleType("langgraph.graph")
+
+
+class DummyStateGraph:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+graph_module.StateGraph = DummyStateGraph
+graph_module.END = "END"
+langgraph_module.graph = graph_module
+sys.modules.setdefault("langgraph", langgraph_module)
+sys.modules.setdefault("langgraph.graph", graph_module)
+
+import llm_cache
+import swarm_with_llm as module
+from llm_cache import LLMResponseCache
+from usage_tracker import UsageLedger, track_usage, usage_cost, usage_scope
+
+
+def _usage(prompt=100, completion=50, hit=0):
+    return {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "prompt_cache_hit_tokens": hit,
+        "prompt_cache_miss_tokens": prompt - hit,
+    }
+
+
+class UsageCostTests(unittest.TestCase):
+    def test_cache_hit_tokens_are_cheaper(self):
+        prices = {"prompt_cache_hit": 0.5, "prompt_cache_miss": 2.0, "completion": 8.0}
+        with mock.patch.object(module.config, "TOKEN_PRICES", prices):
+            cold = usage_cost(_usage(prompt=1_000_000, completion=0))
+            warm = usage_cost(_usage(prompt=1_000_000, completion=0, hit=1_000_000))
+            completion = usage_cost(_usage(prompt=0, completion=1_000_000))
+        self.assertAlmostEqual(cold, 2.0)
+        self.assertAlmostEqual(warm, 0.5)
+        self.assertAlmostEqual(completion, 8.0)
+
+    def test_missing_miss_field_is_derived(self):
+        ledger = UsageLedger({})
+        ledger.record({"prompt_tokens": 80, "completion_tokens": 20, "prompt_cache_hit_tokens": 30})
+        self.assertEqual(ledger.data["total"]["prompt_cache_miss_tokens"], 50)
+
+
+class UsageAttributionTests(unittest.TestCase):
+    def setUp(self):
+        llm_cache.set_llm_cache(None)
+
+    def tearDown(self):
+        llm_cache.set_llm_cache(None)
+
+    def test_gathered_calls_attributed_per_node_and_article(self):
+        async def fake_completion(body, api_key, api_url):
+            await asyncio.sleep(0)
+            module.record_usage(_usage())
+            return {"choices": [{"message": {"content": "ok"}}]}
+
+        state = {"metadata": {}}
+
+        async def _one(article_id):
+            with usage_scope(article_id=article_id):
+                await module.call_deepseek_api_async("p", "k", "u", use_cache=False)
+
+        async def _run():
+            with track_usage(state, "Writer"):
+                await asyncio.gather(*[_one(i) for i in (1, 2, 3)])
+            with track_usage(state, "审核者"):
+                await _one(2)
+
+        with mock.patch.object(module, "_chat_completion", fake_completion):
+            asyncio.run(_run())
+
+        token_usage = state["metadata"]["token_usage"]
+        self.assertEqual(token_usage["total"]["calls"], 4)
+        self.assertEqual(token_usage["total"]["prompt_tokens"], 400)
+        self.assertEqual(token_usage["by_node"]["Writer"]["calls"], 3)
+        self.assertEqual(token_usage["by_node"]["审核者"]["calls"], 1)
+        self.assertEqual(token_usage["by_article"]["2"]["calls"], 2)
+        self.assertEqual(token_usage["by_article"]["1"]["completion_tokens"], 50)
+
+    def test_local_cache_hit_costs_nothing(self):
+        llm_cache.set_llm_cache(LLMResponseCache(path=":memory:"))
+        review = '{"passed": true, "score": 9, "issues": [], "suggestions": []}'
+
+        async def fake_completion(body, api_key, api_url):
+            module.record_usage(_usage())
+            return {"choices": [{"message": {"content": review}}]}
+
+        state = {"metadata": {}}
+
+        async def _run():
+            with track_usage(state, "审核者"):
+                for _ in range(3):
+                    await module.evaluate_content_ai_flavor_async("文案", {"persona": "a", "selling_point": "b"}, "k", "u")
+
+        with mock.patch.object(module, "_chat_completion", fake_completion):
+            asyncio.run(_run())
+
+        total = state["metadata"]["token_usage"]["total"]
+        self.assertEqual(total["calls"], 1)
+        self.assertEqual(total["local_cache_hits"], 2)
+
+
+class BudgetCapTests(unittest.TestCase):
+    def _state(self, budget):
+        metadata = {"budget_yuan": budget}
+        ledger = UsageLedger(metadata)
+        prices = {"prompt_cache_hit": 0.0, "prompt_cache_miss": 0.0, "completion": 1_000_000.0}
+        with mock.patch.object(module.config, "TOKEN_PRICES", prices):
+            # 每次 Writer / 审核者调用 1 元，已花 6 元
+            for node in ("Writer", "审核者"):
+                for _ in range(3):
+                    ledger.record(_usage(prompt=0, completion=1), node=node)
+        return {
+            "metadata": metadata,
+            "current_attempt": 1,
+            "review_results": [{"id": i, "passed": False} for i in (1, 2, 3)],
+        }
+
+    def test_no_budget_never_stops(self):
+        with mock.patch.object(module.config, "RUN_BUDGET_YUAN", None):
+            self.assertFalse(module.would_exceed_budget({"metadata": {}}, 10))
+
+    def test_stops_when_next_round_would_overrun(self):
+        # 再修改 3 篇预计 +6 元 → 12 元
+        self.assertFalse(module.would_exceed_budget(self._state(12.0), 3))
+        self.assertTrue(module.would_exceed_budget(self._state(11.0), 3))
+
+    def test_route_goes_to_output_once_budget_exhausted(self):
+        state = self._state(1.0)
+        self.assertEqual(module.route_after_review(state), "Writer")
+        state["metadata"]["budget_exhausted"] = True
+        self.assertEqual(module.route_after_review(state), "输出校订者")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,469 @@
+"""
+结构化追踪（span）
+
+每次运行对应一个 trace（trace_id 由运行编号派生，断点续跑追加到同一个 trace），
+LangGraph 节点 / 单篇任务 / 一次逻辑 LLM 调用（含重试）/ 单次 HTTP 尝试各记一个 span，
+逐行写入 Config.TRACE_DIR/<运行编号>.jsonl（先攒在内存，节点或运行结束时成批写盘）。每行沿用 OTLP/JSON 的 Span 字段
+（traceId / spanId / parentSpanId / startTimeUnixNano / endTimeUnixNano / attributes / status），
+可以直接转给 OpenTelemetry Collector 等兼容工具。
+开始新运行时按 TRACE_MAX_FILES / TRACE_MAX_AGE_DAYS 清理旧的 trace 文件。
+
+LLM 相关属性（毫秒）：
+- llm.call：llm.purpose、llm.retries、llm.backoff_ms（tenacity 退避）、llm.parse_ms、llm.cache_hit
+- llm.attempt：llm.queue_wait_ms（并发限制器排队）、llm.ttfb_ms（首字节）、llm.body_ms（读完响应）、
+  llm.first_token_ms（流式首段）、http.status_code
+
+父子关系通过 contextvars 传递，asyncio.gather 创建的任务会继承；
+不在 trace_run 内（或 Config.TRACE_ENABLED 关闭）时 span() 是空操作。
+
+汇总（关键路径 + 各阶段耗时分位数）：
+    python tracing.py <运行编号 | trace 文件>
+"""
+
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterator, List, Optional
+
+from config import config
+
+
+_KINDS = {"INTERNAL": "SPAN_KIND_INTERNAL", "CLIENT": "SPAN_KIND_CLIENT"}
+
+
+def _otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # OTLP/JSON 里 int64 以字符串编码
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def _plain_value(value: Dict):
+    if "intValue" in value:
+        return int(value["intValue"])
+    if "arrayValue" in value:
+        return [_plain_value(v) for v in value["arrayValue"].get("values", [])]
+    for key in ("stringValue", "doubleValue", "boolValue"):
+        if key in value:
+            return value[key]
+    return None
+
+
+def _otlp_attributes(attributes: Dict) -> List[Dict]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class Span:
+    """一个进行中的 span；属性值为 None 时不记录"""
+
+    def __init__(self, trace_id: str, name: str, kind: str, parent: Optional["Span"], attributes: Optional[Dict]):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent is not None else ""
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = {k: v for k, v in (attributes or {}).items() if v is not None}
+        self.events: List[Dict] = []
+        self.status_code = "STATUS_CODE_UNSET"
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def add(self, key: str, amount: float) -> None:
+        """累加型属性（重试次数、退避时长）"""
+        self.attributes[key] = round(self.attributes.get(key, 0) + amount, 3)
+
+    def get(self, key: str, default=None):
+        return self.attributes.get(key, default)
+
+    def add_event(self, name: str, attributes: Optional[Dict] = None) -> None:
+        self.events.append({
+            "timeUnixNano": str(time.time_ns()),
+            "name": name,
+            "attributes": _otlp_attributes(attributes or {}),
+        })
+
+    def record_error(self, exc: BaseException) -> None:
+        self.status_code = "STATUS_CODE_ERROR"
+        self.status_message = f"{type(exc).__name__}: {exc}"
+        self.add_event("exception", {"exception.type": type(exc).__name__, "exception.message": str(exc)})
+
+    def to_otlp(self) -> Dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "name": self.name,
+            "kind": _KINDS.get(self.kind, "SPAN_KIND_INTERNAL"),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status_code},
+        }
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        if self.events:
+            span["events"] = self.events
+        return span
+
+
+class _NoopSpan:
+    """未绑定 trace 时的占位 span，所有操作都是空操作"""
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def add(self, key: str, amount: float) -> None:
+        pass
+
+    def get(self, key: str, default=None):
+        return default
+
+    def add_event(self, name: str, attributes: Optional[Dict] = None) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """把结束的 span 追加到 JSONL 文件（多线程安全；攒够 buffer_spans 条或调用 flush 时成批写盘）"""
+
+    def __init__(self, path: str, trace_id: str, buffer_spans: int = config.TRACE_BUFFER_SPANS):
+        self.path = path
+        self.trace_id = trace_id
+        self.buffer_spans = max(1, int(buffer_spans))
+        self._lock = threading.Lock()
+        self._pending: List[str] = []
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_otlp(), ensure_ascii=False)
+        with self._lock:
+            self._pending.append(line)
+            if len(self._pending) >= self.buffer_spans:
+                self._write()
+
+    def _write(self) -> None:
+        if self._pending and not self._file.closed:
+            self._file.write("\n".join(self._pending) + "\n")
+            self._file.flush()
+        self._pending.clear()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._write()
+
+    def close(self) -> None:
+        with self._lock:
+            self._write()
+            self._file.close()
+
+
+_current_tracer: contextvars.ContextVar = contextvars.ContextVar("tracer", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("trace_span", default=None)
+
+
+def trace_id_for(run_id: str) -> str:
+    """同一运行编号总是得到同一个 trace_id（32 位十六进制）"""
+    return hashlib.sha256(run_id.encode("utf-8")).hexdigest()[:32]
+
+
+def trace_path(run_id: str) -> str:
+    return os.path.join(config.TRACE_DIR, f"{run_id}.jsonl")
+
+
+def prune_traces(keep: Optional[str] = None) -> int:
+    """按 Config.TRACE_MAX_FILES / TRACE_MAX_AGE_DAYS 删除旧的 trace 文件（keep 指定的不删），返回删除数"""
+    try:
+        names = [name for name in os.listdir(config.TRACE_DIR) if name.endswith(".jsonl")]
+    except FileNotFoundError:
+        return 0
+    files = []
+    for name in names:
+        path = os.path.join(config.TRACE_DIR, name)
+        if keep is not None and os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        try:
+            files.append((os.stat(path).st_mtime, path))
+        except FileNotFoundError:
+            continue
+    # 新的在前：超出数量上限或超过保留天数的都删
+    files.sort(reverse=True)
+    cutoff = time.time() - config.TRACE_MAX_AGE_DAYS * 86400 if config.TRACE_MAX_AGE_DAYS > 0 else None
+    limit = max(config.TRACE_MAX_FILES - (keep is not None), 0) if config.TRACE_MAX_FILES > 0 else None
+    removed = 0
+    for index, (mtime, path) in enumerate(files):
+        if (limit is not None and index >= limit) or (cutoff is not None and mtime < cutoff):
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+@contextlib.contextmanager
+def span(name: str, attributes: Optional[Dict] = None, kind: str = "INTERNAL") -> Iterator:
+    """在当前 span 下开一个子 span；异常时记 ERROR 状态后继续抛出"""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield NOOP_SPAN
+        return
+    current = Span(tracer.trace_id, name, kind, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.record_error(exc)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        tracer.export(current)
+        if name.startswith("node."):
+            tracer.flush()
+
+
+@contextlib.contextmanager
+def trace_run(run_id: str, attributes: Optional[Dict] = None) -> Iterator:
+    """绑定一次运行的 trace，产出根 span（名为 run）；Config.TRACE_ENABLED 关闭时产出空 span"""
+    if not config.TRACE_ENABLED:
+        yield NOOP_SPAN
+        return
+    path = trace_path(run_id)
+    prune_traces(keep=path)
+    tracer = Tracer(path, trace_id_for(run_id))
+    tracer_token = _current_tracer.set(tracer)
+    try:
+        with span("run", {"run.id": run_id, **(attributes or {})}) as root:
+            yield root
+    finally:
+        _current_tracer.reset(tracer_token)
+        tracer.close()
+
+
+def current_span():
+    """当前上下文里的 span（没有时返回空 span，调用方不用判空）"""
+    current = _current_span.get()
+    return current if current is not None and _current_tracer.get() is not None else NOOP_SPAN
+
+
+def traced_node(name: str, fn):
+    """LangGraph 节点包装：整个节点记一个 node.<name> span（同步 / 异步节点都支持）"""
+    def attributes(state: Dict) -> Dict:
+        return {"langgraph.node": name, "swarm.attempt": state.get("current_attempt")}
+
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(state: Dict) -> Dict:
+            with span(f"node.{name}", attributes(state)):
+                return await fn(state)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(state: Dict) -> Dict:
+        with span(f"node.{name}", attributes(state)):
+            return fn(state)
+    return wrapper
+
+
+# ============================================================================
+# 汇总：关键路径 + 各阶段分位数
+# ============================================================================
+
+def load_spans(path: str) -> List[Dict]:
+    """读取 trace 文件，转成便于统计的扁平结构（时间单位：毫秒）"""
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            raw = json.loads(line)
+            start, end = int(raw["startTimeUnixNano"]), int(raw["endTimeUnixNano"])
+            spans.append({
+                "span_id": raw["spanId"],
+                "parent_span_id": raw.get("parentSpanId", ""),
+                "name": raw["name"],
+                "start_ms": start / 1e6,
+                "end_ms": end / 1e6,
+                "duration_ms": (end - start) / 1e6,
+                "attributes": {a["key"]: _plain_value(a["value"]) for a in raw.get("attributes", [])},
+                "error": raw.get("status", {}).get("code") == "STATUS_CODE_ERROR",
+            })
+    return spans
+
+
+def percentile(values: List[float], q: float) -> float:
+    """线性插值分位数，q 取 0-100"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _distribution(values: List[float]) -> Dict:
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50), 1),
+        "p95": round(percentile(values, 95), 1),
+        "max": round(max(values), 1) if values else 0.0,
+        "total": round(sum(values), 1),
+    }
+
+
+# llm.attempt / llm.call 上要单独统计分布的毫秒属性
+_LLM_METRICS = (
+    ("llm.attempt", "llm.queue_wait_ms", "排队等待"),
+    ("llm.attempt", "llm.ttfb_ms", "首字节"),
+    ("llm.attempt", "llm.body_ms", "读取响应"),
+    ("llm.attempt", "llm.first_token_ms", "流式首段"),
+    ("llm.call", "llm.backoff_ms", "重试退避"),
+    ("llm.call", "llm.parse_ms", "解析输出"),
+)
+
+
+def _critical_children(parent: Dict, kids: List[Dict]) -> List[Dict]:
+    """
+    从父 span 结束时刻往回走：每次取在游标之前最晚结束的子 span，游标移到它的开始时刻。
+    顺序执行的子 span（各节点）全部入选；并行的（同一批篇目）只留拖到最后的那个。
+    """
+    chain = []
+    cursor = parent["end_ms"]
+    remaining = sorted(kids, key=lambda k: k["end_ms"], reverse=True)
+    while remaining:
+        candidates = [k for k in remaining if k["end_ms"] <= cursor + 0.5]
+        if not candidates:
+            break
+        chosen = candidates[0]
+        chain.append(chosen)
+        cursor = chosen["start_ms"]
+        remaining = [k for k in remaining if k is not chosen and k["end_ms"] <= cursor + 0.5]
+    return list(reversed(chain))
+
+
+def critical_path(spans: List[Dict]) -> List[Dict]:
+    """
+    关键路径：决定整次运行结束时间的 span 链，按树形展开（depth 为缩进层级）。
+    self_ms 为父 span 中不被关键子 span 覆盖的时间（本地计算、未单独打点的等待）。
+    续跑的运行有多个根（每段一个 run span），按时间先后排列。
+    """
+    children: Dict[str, List[Dict]] = {}
+    ids = {s["span_id"] for s in spans}
+    roots = []
+    for s in spans:
+        if s["parent_span_id"] and s["parent_span_id"] in ids:
+            children.setdefault(s["parent_span_id"], []).append(s)
+        else:
+            roots.append(s)
+
+    path = []
+
+    def walk(node: Dict, depth: int) -> None:
+        chain = _critical_children(node, children.get(node["span_id"], []))
+        covered = sum(k["duration_ms"] for k in chain)
+        path.append(dict(node, depth=depth, self_ms=max(node["duration_ms"] - covered, 0.0)))
+        for kid in chain:
+            walk(kid, depth + 1)
+
+    for root in sorted(roots, key=lambda s: s["start_ms"]):
+        walk(root, 0)
+    return path
+
+
+def summarize(spans: List[Dict]) -> Dict:
+    by_name: Dict[str, List[float]] = {}
+    for s in spans:
+        by_name.setdefault(s["name"], []).append(s["duration_ms"])
+    llm = {}
+    for span_name, key, label in _LLM_METRICS:
+        values = [s["attributes"][key] for s in spans if s["name"] == span_name and key in s["attributes"]]
+        if values:
+            llm[label] = _distribution(values)
+    calls = [s for s in spans if s["name"] == "llm.call"]
+    return {
+        "stages": {name: _distribution(values) for name, values in by_name.items()},
+        "llm": llm,
+        "llm_calls": len(calls),
+        "llm_retries": int(sum(s["attributes"].get("llm.retries", 0) for s in calls)),
+        "llm_cache_hits": sum(1 for s in calls if s["attributes"].get("llm.cache_hit")),
+        "errors": sum(1 for s in spans if s["error"]),
+        "critical_path": critical_path(spans),
+    }
+
+
+def _describe(span: Dict) -> str:
+    attributes = span["attributes"]
+    parts = []
+    for key, label in (("article.id", "篇"), ("article.attempt", "轮"), ("swarm.attempt", "轮"),
+                       ("llm.purpose", ""), ("llm.retries", "重试"), ("llm.backoff_ms", "退避ms"), ("llm.queue_wait_ms", "排队ms"),
+                       ("llm.ttfb_ms", "首字节ms"), ("llm.body_ms", "读取ms")):
+        if key in attributes:
+            parts.append(f"{label}{attributes[key]}" if label else str(attributes[key]))
+    return f"（{' '.join(parts)}）" if parts else ""
+
+
+def _pad(text: str, width: int) -> str:
+    """按终端显示宽度左对齐（中文占两格）"""
+    shown = sum(2 if unicodedata.east_asian_width(ch) in ("W", "F") else 1 for ch in text)
+    return text + " " * max(width - shown, 0)
+
+
+def format_summary(summary: Dict) -> str:
+    lines = ["关键路径："]
+    for s in summary["critical_path"]:
+        self_part = f"  自身 {s['self_ms']:.1f}ms" if s["self_ms"] >= 0.1 else ""
+        lines.append(f"  {'  ' * s['depth']}{s['name']} {s['duration_ms']:.1f}ms{self_part}{_describe(s)}")
+
+    lines.append("")
+    lines.append(f"{_pad('阶段', 24)}{'次数':>6}{'p50ms':>10}{'p95ms':>10}{'maxms':>10}{'合计ms':>12}")
+    for name, dist in sorted(summary["stages"].items(), key=lambda kv: -kv[1]["total"]):
+        lines.append(f"{_pad(name, 24)}{dist['count']:>6}{dist['p50']:>10.1f}{dist['p95']:>10.1f}{dist['max']:>10.1f}{dist['total']:>12.1f}")
+
+    if summary["llm"]:
+        lines.append("")
+        lines.append(f"LLM 调用 {summary['llm_calls']} 次（重试 {summary['llm_retries']} 次，"
+                     f"本地缓存命中 {summary['llm_cache_hits']} 次），耗时拆分：")
+        for label, dist in summary["llm"].items():
+            lines.append(f"  {_pad(label, 22)}{dist['count']:>6}{dist['p50']:>10.1f}{dist['p95']:>10.1f}{dist['max']:>10.1f}{dist['total']:>12.1f}")
+    if summary["errors"]:
+        lines.append(f"\n出错的 span：{summary['errors']} 个（含重试后成功的失败尝试）")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="汇总一次运行的 trace：关键路径 + 各阶段耗时分位数")
+    parser.add_argument("target", help="运行编号，或 trace 文件路径")
+    args = parser.parse_args(argv)
+    path = args.target if os.path.exists(args.target) else trace_path(args.target)
+    if not os.path.exists(path):
+        parser.error(f"找不到 trace 文件：{path}")
+    print(f"trace：{path}\n")
+    print(format_summary(summarize(load_spans(path))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Token 与费用记账
+
+每次 LLM 调用读取响应里的 usage（prompt / completion / prompt_cache_hit / prompt_cache_miss），
+按节点（Writer / 审核者 / 修改）和篇号累计进 SharedContext["metadata"]["token_usage"]。
+
+归属信息通过 contextvars 传递：节点用 track_usage(state, node) 绑定账本，
+单篇任务用 usage_scope(article_id=...) 标注篇号；asyncio.gather 创建的任务会继承上下文。
+"""
+
+import contextlib
+import contextvars
+import functools
+from typing import Dict, Optional
+
+from config import config
+
+
+_USAGE_FIELDS = (
+    "prompt_tokens",
+    "completion_tokens",
+    "prompt_cache_hit_tokens",
+    "prompt_cache_miss_tokens",
+)
+
+
+def _empty_bucket() -> Dict:
+    bucket = {"calls": 0, "local_cache_hits": 0, "estimated_calls": 0}
+    bucket.update({field: 0 for field in _USAGE_FIELDS})
+    bucket["cost"] = 0.0
+    # DeepSeek 前缀缓存命中率 = prompt_cache_hit_tokens / (hit + miss)
+    bucket["prompt_cache_hit_rate"] = 0.0
+    return bucket
+
+
+def usage_cost(usage: Dict) -> float:
+    """按 Config.TOKEN_PRICES（元 / 百万 tokens）计算单次调用费用"""
+    prices = config.TOKEN_PRICES
+    prompt_tokens = usage.get("prompt_tokens", 0) or 0
+    hit = usage.get("prompt_cache_hit_tokens", 0) or 0
+    miss = usage.get("prompt_cache_miss_tokens")
+    if miss is None:
+        miss = max(prompt_tokens - hit, 0)
+    completion = usage.get("completion_tokens", 0) or 0
+    return (
+        hit * prices["prompt_cache_hit"]
+        + miss * prices["prompt_cache_miss"]
+        + completion * prices["completion"]
+    ) / 1_000_000
+
+
+def estimate_usage(prompt: str, completion_chars: int) -> Dict:
+    """流式中途中止时拿不到 usage，按字符数估算"""
+    prompt_tokens = int(len(prompt) * config.TOKENS_PER_CHAR)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": int(completion_chars * config.TOKENS_PER_CHAR),
+        "prompt_cache_hit_tokens": 0,
+        "prompt_cache_miss_tokens": prompt_tokens,
+    }
+
+
+class UsageLedger:
+    """写入 metadata["token_usage"] 的账本：total / by_node / by_article 三个维度"""
+
+    def __init__(self, metadata: Dict):
+        self.data = metadata.setdefault("token_usage", {})
+        self.data.setdefault("total", _empty_bucket())
+        self.data.setdefault("by_node", {})
+        self.data.setdefault("by_article", {})
+
+    def _buckets(self, node: Optional[str], article_id) -> list:
+        buckets = [self.data["total"]]
+        if node:
+            buckets.append(self.data["by_node"].setdefault(node, _empty_bucket()))
+        if article_id is not None:
+            buckets.append(self.data["by_article"].setdefault(str(article_id), _empty_bucket()))
+        return buckets
+
+    def record(self, usage: Optional[Dict], node: Optional[str] = None, article_id=None, estimated: bool = False) -> None:
+        usage = usage or {}
+        hit = usage.get("prompt_cache_hit_tokens", 0) or 0
+        miss = usage.get("prompt_cache_miss_tokens")
+        if miss is None:
+            miss = max((usage.get("prompt_tokens", 0) or 0) - hit, 0)
+        normalized = {
+            "prompt_tokens": usage.get("prompt_tokens", 0) or 0,
+            "completion_tokens": usage.get("completion_tokens", 0) or 0,
+            "prompt_cache_hit_tokens": hit,
+            "prompt_cache_miss_tokens": miss,
+        }
+        cost = usage_cost(normalized)
+        for bucket in self._buckets(node, article_id):
+            bucket["calls"] += 1
+            if estimated:
+                bucket["estimated_calls"] += 1
+            for field in _USAGE_FIELDS:
+                bucket[field] += normalized[field]
+            bucket["cost"] = round(bucket["cost"] + cost, 6)
+            prompt_total = bucket["prompt_cache_hit_tokens"] + bucket["prompt_cache_miss_tokens"]
+            if prompt_total:
+                bucket["prompt_cache_hit_rate"] = round(bucket["prompt_cache_hit_tokens"] / prompt_total, 4)
+
+    def record_local_cache_hit(self, node: Optional[str] = None, article_id=None) -> None:
+        for bucket in self._buckets(node, article_id):
+            bucket["local_cache_hits"] += 1
+
+    @property
+    def total_cost(self) -> float:
+        return self.data["total"]["cost"]
+
+    def average_cost(self, node: str) -> float:
+        bucket = self.data["by_node"].get(node)
+        if not bucket or not bucket["calls"]:
+            return 0.0
+        return bucket["cost"] / bucket["calls"]
+
+
+_current_ledger: contextvars.ContextVar = contextvars.ContextVar("usage_ledger", default=None)
+_current_scope: contextvars.ContextVar = contextvars.ContextVar("usage_scope", default={})
+
+
+@contextlib.contextmanager
+def track_usage(state: Dict, node: str):
+    """在节点内绑定账本（写入 state["metadata"]）并标注节点名"""
+    ledger = UsageLedger(state.setdefault("metadata", {}))
+    ledger_token = _current_ledger.set(ledger)
+    scope_token = _current_scope.set({**_current_scope.get(), "node": node})
+    try:
+        yield ledger
+    finally:
+        _current_scope.reset(scope_token)
+        _current_ledger.reset(ledger_token)
+
+
+def tracks_usage(node: str):
+    """节点装饰器：整个 async 节点的 LLM 调用都记到 node 名下"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(state: Dict) -> Dict:
+            with track_usage(state, node):
+                return await fn(state)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def usage_scope(**fields):
+    """为当前任务补充归属信息，如 usage_scope(article_id=3) / usage_scope(node="修改")"""
+    token = _current_scope.set({**_current_scope.get(), **fields})
+    try:
+        yield
+    finally:
+        _current_scope.reset(token)
+
+
+def current_scope() -> Dict:
+    return dict(_current_scope.get())
+
+
+def record_usage(usage: Optional[Dict], estimated: bool = False) -> None:
+    """记一次真实 API 调用（没有绑定账本时静默忽略）"""
+    ledger = _current_ledger.get()
+    if ledger is None:
+        return
+    scope = _current_scope.get()
+    ledger.record(usage, scope.get("node"), scope.get("article_id"), estimated=estimated)
+
+
+def record_local_cache_hit() -> None:
+    """记一次本地响应缓存命中（没有产生 API 费用）"""
+    ledger = _current_ledger.get()
+    if ledger is None:
+        return
+    scope = _current_scope.get()
+    ledger.record_local_cache_hit(scope.get("node"), scope.get("article_id"))
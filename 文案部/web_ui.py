@@ -1,11 +1,11 @@
 import streamlit as st
 import asyncio
-from swarm_with_llm import create_swarm
+from run_store import get_run_store
+from swarm_with_llm import resume_swarm_sync, run_swarm_sync, warm_up_swarm
 import sys
 import io
-import pandas as pd
-import PyPDF2
-import docx
+
+# pandas / PyPDF2 / python-docx 只在用到时导入，首屏不必等它们加载
 
 def parse_uploaded_file(uploaded_file):
     name = uploaded_file.name.lower()
@@ -14,12 +14,16 @@ def parse_uploaded_file(uploaded_file):
         if name.endswith('.txt') or name.endswith('.md'):
             content = uploaded_file.read().decode("utf-8")
         elif name.endswith('.pdf'):
+            import PyPDF2
+
             reader = PyPDF2.PdfReader(uploaded_file)
             for page in reader.pages:
                 text = page.extract_text()
                 if text:
                     content += text + "\n"
         elif name.endswith('.docx'):
+            import docx
+
             doc = docx.Document(uploaded_file)
             for para in doc.paragraphs:
                 content += para.text + "\n"
@@ -61,12 +65,30 @@ with st.sidebar:
         platform = st.selectbox("投放平台", ["抖音", "今日头条", "小红书"])
         post_count = st.number_input("生成篇数", min_value=1, max_value=10, value=3)
         direction = st.text_input("附加场景方向", value="过年回家满载而归")
+        budget_yuan = st.number_input("本次预算上限（元，0 表示沿用默认配置）", min_value=0.0, value=0.0, step=0.5)
         
         start_btn = st.button("🚀 开始生成", type="primary", use_container_width=True)
     else:
         st.info("上传文档后解锁参数配置...")
         start_btn = False
 
+    st.divider()
+    # 断点续跑：中断（崩溃 / 页面刷新）的运行从最后一个完成的节点继续，已完成的运行直接载入结果
+    st.header("⏯️ 历史运行")
+    run_store = get_run_store()
+    recent_runs = run_store.list_runs(limit=20) if run_store is not None else []
+    resume_btn = False
+    if recent_runs:
+        run_labels = {
+            run["run_id"]: f"{run['run_id']}｜{run['status']}｜{run['user_input'].get('车型', '')} {run['user_input'].get('平台', '')} {run['user_input'].get('数量', '')}篇"
+            for run in recent_runs
+        }
+        resume_run_id = st.selectbox("选择运行", list(run_labels), format_func=run_labels.get)
+        resume_btn = st.button("▶️ 续跑 / 载入结果", use_container_width=True)
+    else:
+        st.caption("暂无运行记录")
+
+result = None
 if start_btn:
     initial_state = {
         "user_input": {
@@ -84,18 +106,54 @@ if start_btn:
         "current_attempt": 1,
         "need_manual_review": [],
         "skip_confirmations": True,  # Web端默认跳过交互式命令行
-        "metadata": {}
+        "metadata": {"budget_yuan": budget_yuan} if budget_yuan else {}
     }
     
     st.info("系统正在全力创作中。包含多重 Agent 节点协作（Writer 并发创作 + LLM 重复审查修订），大约需要 1-3 分钟，请耐心等待...")
     
     with st.spinner("Agent Swarm 多智能体团队正在执行任务...(可在后台终端查看详细编排日志)"):
-        # 运行 swarm
-        swarm = create_swarm()
-        result = swarm.invoke(initial_state)
-    
-    st.success("🎉 生成与审核完毕！")
-    
+        # 运行 swarm（提交到进程级后台事件循环，连接池跨多次点击复用）
+        result = run_swarm_sync(initial_state)
+elif resume_btn:
+    with st.spinner(f"正在从运行 {resume_run_id} 的断点继续..."):
+        try:
+            result = resume_swarm_sync(resume_run_id)
+        except ValueError as e:
+            st.error(str(e))
+
+if result is not None:
+    import pandas as pd
+
+    car_model = result["user_input"].get("车型", "")
+    platform = result["user_input"].get("平台", "")
+    post_count = result["user_input"].get("数量", len(result.get("contents", [])))
+
+    st.success(f"🎉 生成与审核完毕！（运行编号：{result.get('run_id', '-')}）")
+
+    # Token / 费用统计
+    token_usage = result.get("metadata", {}).get("token_usage", {})
+    total_usage = token_usage.get("total")
+    if total_usage:
+        col_calls, col_tokens, col_cost, col_hit = st.columns(4)
+        col_calls.metric("LLM 调用次数", total_usage["calls"], help=f"本地缓存命中 {total_usage['local_cache_hits']} 次")
+        col_tokens.metric("消耗 tokens", total_usage["prompt_tokens"] + total_usage["completion_tokens"])
+        col_cost.metric("预估费用", f"¥{total_usage['cost']:.4f}")
+        col_hit.metric("前缀缓存命中率", f"{total_usage.get('prompt_cache_hit_rate', 0.0):.1%}",
+                       help=f"命中 {total_usage['prompt_cache_hit_tokens']} / 未命中 {total_usage['prompt_cache_miss_tokens']} tokens")
+        queue_wait = result.get("metadata", {}).get("queue_wait")
+        if queue_wait and queue_wait["queue_wait_seconds"]:
+            st.caption(f"⏳ 与其他运行共享 LLM 并发：本次累计排队 {queue_wait['queue_wait_seconds']}s，"
+                       f"平均 {queue_wait['avg_queue_wait_ms']}ms / 次，最长 {queue_wait['max_queue_wait_ms']}ms")
+        if result.get("metadata", {}).get("budget_exhausted"):
+            st.warning("⚠️ 已触达本次运行预算上限，未通过的篇目已转人工介入。")
+        with st.expander("按篇 token 明细"):
+            st.dataframe(pd.DataFrame([
+                {"篇号": int(article_id), "调用次数": bucket["calls"],
+                 "输入tokens": bucket["prompt_tokens"], "输出tokens": bucket["completion_tokens"],
+                 "费用(元)": round(bucket["cost"], 4)}
+                for article_id, bucket in sorted(token_usage.get("by_article", {}).items(), key=lambda kv: int(kv[0]))
+            ]))
+
     # 构建 Download Excel 数据容器
     if result.get("review_results"):
         passed_count = sum(1 for r in result.get("review_results", []) if r["passed"])
@@ -145,3 +203,6 @@ if start_btn:
                     st.caption(f"- **第 {rev['attempt']} 次被拒原因**: {', '.join(rev['issues'])}")
             else:
                 st.caption("✨ 一遍过！")
+
+# 首屏渲染完成后在后台预热（导入 langgraph、编译流程图），不阻塞页面
+warm_up_swarm()